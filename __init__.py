@@ -1,27 +1,31 @@
 from collections import OrderedDict
 import contextlib
 import datetime as dt
+import functools
+import io
 import logging
 import time
 import serial
+import threading
 import warnings
+import zipfile
 
-from flatland import Integer, Float, Form, Enum, Boolean
+from flatland import Integer, Float, Form, Enum, Boolean, String
 from flatland.validation import ValueAtLeast, ValueAtMost
 from microdrop.app_context import get_app
 from microdrop.plugin_helpers import AppDataController, StepOptionsController
 from microdrop.plugin_manager import (IPlugin, Plugin, implements, emit_signal,
                                       get_service_instance_by_name,
                                       PluginGlobals, ScheduleRequest)
-from mr_box_peripheral_board.max11210_adc_ui import MAX11210_begin
 from mr_box_peripheral_board.ui.gtk.pump_ui import PumpControl
+from openpyxl.xml.constants import SHEET_MAIN_NS
 from pygtkhelpers.gthreads import gtk_threadsafe
 from pygtkhelpers.ui.extra_dialogs import yesno, FormViewDialog
 from pygtkhelpers.ui.objectlist import PropertyMapper
 from pygtkhelpers.utils import dict_to_form
-from scipy.optimize import curve_fit
 import gobject
 import gtk
+import lxml.etree
 import microdrop_utility as utility
 import mr_box_peripheral_board as mrbox
 import mr_box_peripheral_board.ui.gtk.measure_dialog
@@ -32,6 +36,25 @@ import pandas as pd
 import path_helpers as ph
 import trollius as asyncio
 
+from . import plan, pmt_data, report_skeleton
+from .acquisition import AcquisitionEngine
+from .board_io import BoardIO, SerializedProxy, log_exception
+from .board_state import BoardState
+from .calibration_store import (STORE_FILENAME, CalibrationStore,
+                                calibration_key)
+from .capacitance import CapacitanceMonitor, CapacitanceSampler
+from .fill_level import ReservoirCalibration
+from .fill_model import LinearFillModel
+from .fill_telemetry import FillTelemetry
+from .comparison_report import write_comparison
+from .html_report import write_html_results
+from .live_view import LiveView
+from .pmt_filter import FilteredDataFunc
+from .pump_control import PIPumpController
+from .pump_timing import PumpTimer
+from .reservoir import ReservoirActuator
+from .ring_buffer import RingBuffer
+from .run_store import RecordWriter, RunStore
 from ._version import get_versions
 __version__ = get_versions()['version']
 del get_versions
@@ -48,13 +71,28 @@ PluginGlobals.push_env('microdrop.managed')
 TEMPLATE_PATH = (ph.path(r'templates')
                  .joinpath('DRC Data Collection-named_ranges.xlsx'))
 
+# Number of recent PMT samples shown by headless acquisition live view.
+LIVE_VIEW_CAPACITY = 4096
+# Interval between checks of continuously sampled capacitance (seconds).
+CAPACITANCE_POLL_S = .01
+# Number of continuously sampled capacitance readings kept (see
+# `_auto_pump()`).
+CAPACITANCE_MONITOR_CAPACITY = 16384
+# Maximum number of capacitance samples of pump fill telemetry in step log.
+FILL_LOG_SAMPLES = 200
 
-def _write_results(template_path, output_path, data_files):
+
+def _write_results(template_path, output_path, data_files, formulas=False):
     '''
     Write results as Excel spreadsheet to output path based on template.
 
     .. versionadded:: 0.19
 
+    .. versionchanged:: 0.26
+        Write computed PMT mean values to the results table instead of
+        ``AVERAGE`` formulas (which have no value until evaluated by Excel).
+        Add ``formulas`` parameter.
+
     Parameters
     ----------
     template_path : str
@@ -68,6 +106,10 @@ def _write_results(template_path, output_path, data_files):
         Each new-line delimited JSON file corresponds to protocol step, and
         each line in each file corresponds to measured PMT data from a single
         measurement run.
+    formulas : bool, optional
+        If ``True``, write an ``AVERAGE`` formula over the full data column
+        of each run (with the computed mean as the cached formula value)
+        instead of only the value.
 
     Returns
     -------
@@ -155,72 +197,57 @@ def _write_results(template_path, output_path, data_files):
                 # table.
                 pmt_results_row = pmt_ids_boundaries[1]
 
+                # Cached values of `Assay Info` formula cells, keyed by cell
+                # coordinate.
+                cached_values = {}
+
                 # Write the data from each PMT measurement run to a separate:
                 #  1. **worksheet**; and
                 #  2. **row** in the PMT results information table in the
                 #     `Assay Info` worksheet.
-                for data_file_i in data_files:
-                    # Each line in each [new-line delimited JSON file][1]
-                    # corresponds to measured PMT data from a single
-                    # measurement run.
-                    #
-                    # [1]: http://ndjson.org/
-                    for j, data_json_ij in enumerate(data_file_i.lines()):
-                        try:
-                            # Try reading JSON data with `split` orientation,
-                            # which preserves the name of the Pandas series.
-                            s_data_ij = pd.read_json(data_json_ij,
-                                                     typ='series',
-                                                     orient='split')
-                        except ValueError:
-                            logging.debug('Decode legacy series')
-                            # JSON data was not encoded in `split` orientation.
-                            s_data_ij = pd.read_json(data_json_ij,
-                                                     typ='series')
-
-                        if not s_data_ij.name:
-                            # No name was encoded in the JSON data.  Interpret
-                            # data series name from filename.
-                            s_data_ij.name = '%s-%02d' % (data_file_i.namebase
-                                                          .split('-')[-1], j)
-
-                        # Add column indicating time of each sample relative to
-                        # time of first sample point for easier comparison
-                        # between worksheets.
-                        relative_time_s_i = (pd.Series(s_data_ij.index -
-                                                       s_data_ij.index[0])
-                                             .dt.total_seconds())
-                        df_data_ij = s_data_ij.to_frame()
-                        df_data_ij.insert(0, 'relative_time_s',
-                                          relative_time_s_i.values)
-
-                        # Write measurement data to worksheet.
-                        df_data_ij.to_excel(output_writer,
-                                            sheet_name=s_data_ij.name,
-                                            header=True)
-
-                        # Write name of measurement run to the PMT results
-                        # information table in the `Assay Info` worksheet.
-                        id_cell_ij = worksheet.cell(row=pmt_results_row,
-                                                    column=pmt_ids_column)
-                        id_cell_ij.value = s_data_ij.name
-
-                        # Write formula for the average measurement value to
-                        # the PMT results information table in the `Assay Info`
-                        # worksheet.
-                        mean_cell_ij = worksheet.cell(row=pmt_results_row,
-                                                      column=pmt_mean_column)
-
-                        sheetname_ij = ox.utils.quote_sheetname(s_data_ij.name)
-                        mean_formula_ij = ('=AVERAGE({sheetname}!C2, '
-                                           '{sheetname}!C{end_row})'
-                                           .format(sheetname=sheetname_ij,
-                                                   end_row=2 + len(s_data_ij)))
-                        mean_cell_ij.value = mean_formula_ij
-
-                        # Set output row index to the next row of the PMT
-                        # results table.
-                        pmt_results_row += 1
+                for s_data_ij in pmt_data.iter_runs(data_files):
+                    # Add column indicating time of each sample relative to
+                    # time of first sample point for easier comparison
+                    # between worksheets.
+                    df_data_ij = s_data_ij.to_frame()
+                    df_data_ij.insert(0, 'relative_time_s',
+                                      pmt_data.relative_time_s(s_data_ij))
+
+                    # Write measurement data to worksheet.
+                    df_data_ij.to_excel(output_writer,
+                                        sheet_name=s_data_ij.name,
+                                        header=True)
+
+                    # Write name of measurement run to the PMT results
+                    # information table in the `Assay Info` worksheet.
+                    id_cell_ij = worksheet.cell(row=pmt_results_row,
+                                                column=pmt_ids_column)
+                    id_cell_ij.value = s_data_ij.name
+
+                    # Write the average measurement value to the PMT
+                    # results information table in the `Assay Info`
+                    # worksheet.
+                    mean_cell_ij = worksheet.cell(row=pmt_results_row,
+                                                  column=pmt_mean_column)
+                    mean_ij = pmt_data.run_statistics(s_data_ij)['mean']
+
+                    if formulas:
+                        # Average over the full data column (header is in
+                        # row 1).  The computed mean is written as the cached
+                        # value of the formula after the workbook is saved.
+                        sheetname_ij = ox.utils.quote_sheetname(s_data_ij
+                                                                .name)
+                        mean_cell_ij.value = \
+                            ('=AVERAGE({sheetname}!C2:C{end_row})'
+                             .format(sheetname=sheetname_ij,
+                                     end_row=1 + len(s_data_ij)))
+                        cached_values[mean_cell_ij.coordinate] = mean_ij
+                    elif np.isfinite(mean_ij):
+                        mean_cell_ij.value = float(mean_ij)
+
+                    # Set output row index to the next row of the PMT
+                    # results table.
+                    pmt_results_row += 1
 
                 # Create mapping of the name of each worksheet containing PMT
                 # measurement data to the corresponding worksheet.
@@ -302,9 +329,80 @@ def _write_results(template_path, output_path, data_files):
     with output_path.open('wb') as output:
         output.write(updated_xlsx)
 
+    if cached_values:
+        # `Assay Info` is the first worksheet in the workbook.
+        updated_xlsx = _update_cached_values(output_path,
+                                             'xl/worksheets/sheet1.xml',
+                                             cached_values)
+        with output_path.open('wb') as output:
+            output.write(updated_xlsx)
+
     return output_path
 
 
+def _update_cached_values(xlsx_path, worksheet_path, cached_values):
+    '''
+    Set cached values of formula cells in an Excel spreadsheet.
+
+    ``openpyxl`` writes formula cells without a value, so applications that
+    do not evaluate formulas (e.g., ``pandas.read_excel``) read them as
+    empty.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    xlsx_path : str
+        Path to Excel ``xlsx`` file.
+    worksheet_path : str
+        Path of worksheet XML file within Excel ZIP file, e.g.,
+        ``xl/worksheets/sheet1.xml``.
+    cached_values : dict
+        Mapping from cell coordinate (e.g., ``E11``) to numeric value.
+        Formula cells with a non-finite value (e.g., ``nan``) are left
+        without a cached value.
+
+    Returns
+    -------
+    str
+        Updated Excel ZIP file binary contents.
+    '''
+    ns = SHEET_MAIN_NS
+    output = io.BytesIO()
+
+    with zipfile.ZipFile(xlsx_path, mode='r') as input_:
+        with zipfile.ZipFile(output, mode='w',
+                             compression=zipfile.ZIP_DEFLATED) as output_zip:
+            for zip_info_i in input_.infolist():
+                data_i = input_.read(zip_info_i)
+                if zip_info_i.filename == worksheet_path:
+                    root = lxml.etree.fromstring(data_i)
+                    for cell_j in root.iter('{%s}c' % ns):
+                        coordinate_j = cell_j.get('r')
+                        if (coordinate_j not in cached_values or
+                                cell_j.find('{%s}f' % ns) is None):
+                            continue
+                        value_j = cell_j.find('{%s}v' % ns)
+                        cached_j = float(cached_values[coordinate_j])
+                        if not np.isfinite(cached_j):
+                            # Non-finite values are not valid in a cell, so
+                            # leave formula without a cached value.
+                            if value_j is not None:
+                                cell_j.remove(value_j)
+                            continue
+                        if value_j is None:
+                            value_j = lxml.etree.SubElement(cell_j,
+                                                            '{%s}v' % ns)
+                        # Numeric cell type is the default.
+                        cell_j.attrib.pop('t', None)
+                        value_j.text = repr(cached_j)
+                    data_i = lxml.etree.tostring(root, xml_declaration=True,
+                                                 encoding='UTF-8',
+                                                 standalone=True)
+                output_zip.writestr(zip_info_i, data_i)
+    return output.getvalue()
+
+
 class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
                                  Plugin):
     '''
@@ -332,6 +430,13 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
                         .using(default=False, optional=True),
                         Boolean.named('Show Report')
                         .using(default=False, optional=True),
+                        Enum.named('Report format')
+                        .valued('Excel', 'HTML')
+                        .using(default='Excel', optional=True),
+                        Boolean.named('Write PMT mean formulas')
+                        .using(default=False, optional=True),
+                        Boolean.named('Use compiled report template')
+                        .using(default=True, optional=True),
                         Boolean.named('Use auto pump')
                         .using(default=False, optional=True),
                         Float.named('Auto pump timeout')
@@ -341,7 +446,96 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
                         Integer.named('Auto pump frequency')
                         .using(default=8000, optional=True,
                                validators=[ValueAtLeast(minimum=100),
-                                           ValueAtMost(maximum=10000)]))
+                                           ValueAtMost(maximum=10000)]),
+                        Enum.named('Prime ramp shape')
+                        .valued('Linear', 'Exponential', 'Custom')
+                        .using(default='Linear', optional=True),
+                        Integer.named('Prime ramp levels')
+                        .using(default=plan.PRIME_LEVEL_COUNT, optional=True,
+                               validators=[ValueAtLeast(minimum=1),
+                                           ValueAtMost(maximum=100)]),
+                        Float.named('Prime ramp start (Hz)')
+                        .using(default=plan.PRIME_START_HZ, optional=True,
+                               validators=[ValueAtLeast(minimum=1),
+                                           ValueAtMost(maximum=10000)]),
+                        Float.named('Prime ramp end (Hz)')
+                        .using(default=plan.PRIME_END_HZ, optional=True,
+                               validators=[ValueAtLeast(minimum=1),
+                                           ValueAtMost(maximum=10000)]),
+                        String.named('Prime ramp custom frequencies (Hz)')
+                        .using(default='', optional=True),
+                        Integer.named('Reservoir channel')
+                        .using(default=24, optional=True,
+                               validators=[ValueAtLeast(minimum=0)]),
+                        Float.named('Reservoir voltage')
+                        .using(default=100, optional=True,
+                               validators=[ValueAtLeast(minimum=0),
+                                           ValueAtMost(maximum=150)]),
+                        # Volume of filled pump reservoir (0: unknown).
+                        Float.named('Reservoir volume (uL)')
+                        .using(default=0, optional=True,
+                               validators=[ValueAtLeast(minimum=0)]),
+                        # Fill fraction auto pump stops at.
+                        Float.named('Auto pump target fill')
+                        .using(default=1., optional=True,
+                               validators=[ValueAtLeast(minimum=.05),
+                                           ValueAtMost(maximum=1)]),
+                        Enum.named('Auto pump control')
+                        .valued('Fixed pulses', 'PI', 'Continuous')
+                        .using(default='Fixed pulses', optional=True),
+                        Float.named('Auto pump Kp')
+                        .using(default=0.7, optional=True,
+                               validators=[ValueAtLeast(minimum=0),
+                                           ValueAtMost(maximum=1)]),
+                        Float.named('Auto pump Ki')
+                        .using(default=0.05, optional=True,
+                               validators=[ValueAtLeast(minimum=0),
+                                           ValueAtMost(maximum=1)]),
+                        Boolean.named('Reuse reservoir calibration')
+                        .using(default=True, optional=True),
+                        Float.named('Reservoir calibration max age (h)')
+                        .using(default=24, optional=True,
+                               validators=[ValueAtLeast(minimum=0)]),
+                        Float.named('Reservoir calibration drift tolerance')
+                        .using(default=0.02, optional=True,
+                               validators=[ValueAtLeast(minimum=0),
+                                           ValueAtMost(maximum=1)]),
+                        Integer.named('Capacitance reference samples')
+                        .using(default=100, optional=True,
+                               validators=[ValueAtLeast(minimum=1),
+                                           ValueAtMost(maximum=1000)]),
+                        Integer.named('Capacitance samples per pulse')
+                        .using(default=10, optional=True,
+                               validators=[ValueAtLeast(minimum=1),
+                                           ValueAtMost(maximum=100)]),
+                        Float.named('Capacitance sample interval (s)')
+                        .using(default=0, optional=True,
+                               validators=[ValueAtLeast(minimum=0),
+                                           ValueAtMost(maximum=1)]),
+                        Boolean.named('Adaptive capacitance sampling')
+                        .using(default=True, optional=True),
+                        Integer.named('Capacitance minimum samples')
+                        .using(default=3, optional=True,
+                               validators=[ValueAtLeast(minimum=1),
+                                           ValueAtMost(maximum=100)]),
+                        Float.named('Capacitance relative error')
+                        .using(default=0.002, optional=True,
+                               validators=[ValueAtLeast(minimum=0),
+                                           ValueAtMost(maximum=1)]),
+                        Boolean.named('Filter PMT outliers')
+                        .using(default=False, optional=True),
+                        Integer.named('PMT filter window')
+                        .using(default=7, optional=True,
+                               validators=[ValueAtLeast(minimum=3),
+                                           ValueAtMost(maximum=101)]),
+                        Float.named('PMT filter threshold')
+                        .using(default=3, optional=True,
+                               validators=[ValueAtLeast(minimum=1)]),
+                        Enum.named('PMT acquisition')
+                        .valued('Dialog', 'Headless')
+                        .using(default='Dialog', optional=True),
+                        Boolean.named('PMT live view')
+                        .using(default=True, optional=True))
     StepFields = Form.of(Boolean.named('Magnet')
                          .using(default=False, optional=True),
                          # PMT Fields
@@ -388,6 +582,10 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
     def __init__(self):
         super(MrBoxPeripheralBoardPlugin, self).__init__()
         self.board = None
+        # Single thread which executes all requests to `self.board`.
+        self.board_io = BoardIO()
+        # Last acknowledged value of settable `self.board` parameters.
+        self.board_state = None
         # XXX `name` attribute is required in addition to `plugin_name`
         #
         # The `name` attribute is required in addition to the `plugin_name`
@@ -401,10 +599,42 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
 
         # `dropbot.SerialProxy` instance
         self.dropbot_remote = None
+        # Reservoir channel settings applied to DropBot (see
+        # `_actuate_reservoir()`).
+        self.reservoir_actuator = None
 
         # Latch to, e.g., config menus, only once
         self.initialized = False
 
+        # Hardware plan of running protocol (see `compile_protocol_plan()`).
+        self.protocol_plan = None
+        # Linear fit of reservoir capacitance during latest auto pump prepare
+        # routine (see `_prepare_auto_pump()`).
+        self.fill_model = None
+        # Capacitance of empty and filled pump reservoir (see
+        # `_set_reservoir_calibration()`).
+        self.reservoir_calibration = None
+        # Magnet move in progress (see `apply_step_options()`).
+        self._magnet_move = None
+        # Magnet position applied by latest completed move (`None` if
+        # unknown; see `_apply_magnet()`).
+        self._magnet_state = None
+        # PMT measurement of next step prepared during current step (see
+        # `_start_pmt_lookahead()`).
+        self._pmt_lookahead = None
+        # Number of readings taken by each capacitance measurement of current
+        # pump routine (see `_sample_capacitance()`).
+        self._capacitance_sample_counts = []
+        # Telemetry of current auto pump fill (see `_apply_pump()`).
+        self._fill_telemetry = None
+        # Task applying options of current step (see `on_step_run()`), and
+        # `True` if it was cancelled by `cancel_step()`.
+        self._step_task = None
+        self._step_cancelled = False
+        # Event loop running step task (cancellation requests from other
+        # threads are scheduled on it).
+        self._step_loop = None
+
         self.adc_gain_calibration = None
         self.adc_offset_calibration = None
         self.off_cal_val = None
@@ -412,6 +642,9 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
     def reset_board_state(self):
         '''
         Reset MR-Box peripheral board to default state.
+
+        .. versionchanged:: 0.26
+            Execute board requests in board I/O thread.
         '''
         # Reset user warned state (i.e., warn user next time board settings
         # are applied when board is not connected).
@@ -420,6 +653,20 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
         if self.board is None:
             return
 
+        self._cancel_pmt_lookahead()
+        self._magnet_state = None
+        self.board_io.call(self._reset_board_state)
+
+    def _reset_board_state(self):
+        '''
+        Reset MR-Box peripheral board to default state **(blocking; call in
+        board I/O thread)**.
+
+        .. versionadded:: 0.26
+        '''
+        # Board state is unknown until reset.
+        self.board_state.invalidate()
+
         # Home the magnet z-stage.
         self.board.zstage.home()
 
@@ -429,15 +676,15 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
         # Deactivate the pump.
         self.board.pump_deactivate()
         # Set pump frequency to zero.
-        self.board.pump_frequency_set(0)
+        self.board_state.pump_frequency_set(0)
         # Set the pmt shutter pin to output
         self.board.pin_mode(9, 1)
         # Close the PMT shutter.
         self.board.pmt_close_shutter()
         # Set PMT control voltage to zero.
-        self.board.pmt_set_pot(0)
+        self.board_state.pmt_set_pot(0)
         # Start the ADC and Perform ADC Calibration
-        MAX11210_begin(self.board)
+        self.board_state.MAX11210_begin()
 
         self.update_leds()
 
@@ -445,6 +692,76 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
         self.board.led1.on = True
         self.board.led2.on = True
 
+    def _in_executor(self, func, *args, **kwargs):
+        '''
+        Call blocking function (e.g., serial request to DropBot) in an
+        executor thread.
+
+        .. versionadded:: 0.26
+
+        .. versionchanged:: 0.26
+            MR-Box requests must use :meth:`_board_call` instead.
+
+        Returns
+        -------
+        asyncio.Future
+            Result of function call.
+        '''
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(None, functools.partial(func, *args,
+                                                            **kwargs))
+
+    def _board_call(self, func, *args, **kwargs):
+        '''
+        Call function which makes requests to the MR-Box peripheral board in
+        the board I/O thread (see :class:`board_io.BoardIO`).
+
+        .. versionadded:: 0.26
+
+        Returns
+        -------
+        asyncio.Future
+            Result of function call.
+        '''
+        return self.board_io.call_async(func, *args, **kwargs)
+
+    def _gtk_call(self, func, *args, **kwargs):
+        '''
+        Call function (e.g., which displays a dialog) in the main GTK thread.
+
+        If called from the main GTK thread, the function is called directly
+        (i.e., blocks).
+
+        .. versionadded:: 0.26
+
+        Returns
+        -------
+        asyncio.Future
+            Result of function call.
+        '''
+        loop = asyncio.get_event_loop()
+        future = asyncio.Future(loop=loop)
+
+        if isinstance(threading.current_thread(), threading._MainThread):
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as exception:
+                future.set_exception(exception)
+            return future
+
+        def _call():
+            try:
+                result = func(*args, **kwargs)
+            except Exception as exception:
+                loop.call_soon_threadsafe(future.set_exception, exception)
+            else:
+                loop.call_soon_threadsafe(future.set_result, result)
+            return False
+
+        gobject.idle_add(_call)
+        return future
+
+    @asyncio.coroutine
     def apply_step_options(self, step_options):
         '''
         Apply the specified step options.
@@ -456,6 +773,31 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
             Write JSON PMT data with ``split`` orientation, which preserves the
             name of the Pandas series.
 
+        .. versionchanged:: 0.26
+            Optionally reject outliers from PMT data using a streaming Hampel
+            filter (see :class:`pmt_filter.FilteredDataFunc`).  Raw data is
+            streamed to the experiment log PMT cache (see
+            :meth:`run_store.RunStore.raw_path`).
+
+        .. versionchanged:: 0.26
+            Convert to coroutine.  Waits no longer block the event loop and
+            blocking serial requests run in an executor thread, so step
+            handlers of other plugins may run concurrently.
+
+        .. versionchanged:: 0.26
+            Execute actions of step from protocol plan compiled when the
+            protocol started (see :meth:`compile_protocol_plan`).
+
+        .. versionchanged:: 0.26
+            Move magnet concurrently with environment logging and pump/PMT
+            preparation.
+
+        .. versionchanged:: 0.26
+            Cancel each action which exceeds its time budget (see
+            :func:`plan.action_timeout`).  If an action fails, times out or
+            the step is cancelled (see :meth:`cancel_step`), turn the pump off
+            and close the PMT shutter.
+
         Parameters
         ----------
         step_options : dict
@@ -468,346 +810,123 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
         if self.board:
             step_log = {}
 
-            # log environmental data
-            try:
-                env = self.dropbot_remote.get_environment_state()
-                step_log['environment'] = env.to_dict()
-                logger.info('temp=%.1fC, Rel. humidity=%.1f%%' %
-                            (env['temperature_celsius'],
-                             100 * env['relative_humidity']))
-            except Exception:
-                logger.debug('[%s] Failed to get environment data.', __name__,
-                             exc_info=True)
+            step_label = self._step_label()
+            step_plan = self._step_plan(step_options, step_label, app_values)
+            step_log['actions'] = [action_i for action_i, _ in
+                                   step_plan['actions']]
 
             # Save state of LEDs
-            led1_on = self.board.led1.on
-            led2_on = self.board.led2.on
-
-            services_by_name = {service_i.name: service_i
-                                for service_i in
-                                PluginGlobals
-                                .env('microdrop.managed').services}
-
-            step_label = None
-            if 'step_label_plugin' in services_by_name:
-                # Step label is set for current step
-                step_label_plugin = (services_by_name
-                                     .get('step_label_plugin'))
-                step_label = (step_label_plugin.get_step_options()
-                              or {}).get('label')
-
-            # Apply board hardware options.
+            led1_on = yield asyncio.From(self._board_call(getattr,
+                                                          self.board.led1,
+                                                          'on'))
+            led2_on = yield asyncio.From(self._board_call(getattr,
+                                                          self.board.led2,
+                                                          'on'))
+
+            # Apply board hardware actions.
+            cancelled = False
             try:
-                # Magnet z-stage
-                # --------------
-                if step_options.get('Magnet'):
-                    # Send board request to move magnet to position (if it is
-                    # already engaged, this function does nothing).
-                    self.board.zstage.up()
+                for action_i, value_i in step_plan['actions']:
+                    timeout_i = plan.action_timeout(action_i, value_i)
+                    if action_i == 'magnet':
+                        # Magnet z-stage
+                        # --------------
+                        # Start moving magnet without waiting.  Actions which
+                        # require the magnet in place wait for the move to
+                        # complete (see `_join_magnet()`).
+                        magnet_move = asyncio.wait_for(self._apply_magnet
+                                                       (value_i), timeout_i)
+                        self._magnet_move = asyncio.ensure_future(magnet_move)
+                        # log environmental data while magnet moves
+                        yield asyncio.From(self._log_environment(step_log))
+                    elif action_i == 'pump':
+                        # Pump
+                        # ----
+                        pump_routine = self._apply_pump(value_i, app_values,
+                                                        step_log)
+                        yield asyncio.From(asyncio.wait_for(pump_routine,
+                                                            timeout_i))
+                    elif action_i == 'leds':
+                        yield asyncio.From(self._board_call(setattr,
+                                                            self.board.led1,
+                                                            'on', value_i))
+                        yield asyncio.From(self._board_call(setattr,
+                                                            self.board.led2,
+                                                            'on', value_i))
+                    elif action_i == 'pmt':
+                        # PMT/ADC
+                        # -------
+                        if app_values.get('PMT acquisition') != 'Headless':
+                            # Measurement dialog is closed by the user.
+                            timeout_i = None
+                        measurement = self._measure_pmt(value_i, step_label,
+                                                        app_values, step_log)
+                        yield asyncio.From(asyncio.wait_for(measurement,
+                                                            timeout_i))
+                if 'magnet' not in step_log['actions']:
+                    # log environmental data
+                    yield asyncio.From(self._log_environment(step_log))
+                # Step is complete once magnet is in place.
+                yield asyncio.From(self._join_magnet())
+            except asyncio.CancelledError:
+                cancelled = True
+                step_log['cancelled'] = True
+                logger.warning('[%s] Step cancelled.', __name__)
+                self.protocol_plan = None
+                # Do not wait for requests in progress (e.g., a magnet move).
+                # Safe state requests are queued after the current request.
+                magnet_move = self._magnet_move
+                self._magnet_move = None
+                if magnet_move is not None:
+                    magnet_move.cancel()
+                (self.board_io.submit(self._make_safe)
+                 .add_done_callback(log_exception))
+                raise
+            except Exception, exception:
+                if isinstance(exception, asyncio.TimeoutError):
+                    step_log['timed out'] = True
+                    logger.error('[%s] Step action timed out.', __name__)
                 else:
-                    # Send board request to move magnet to down position (if
-                    # it is already engaged, this function does nothing).
-                    # Move to low position and then home
-                    # used to save time and avoid magnet going beyong the
-                    # endstop and loosing steps
-                    if not self.board.zstage.is_down:
-                        self.board.zstage.move_to(1)
-                        self.board.zstage.home()
-
-                # Pump
-                # ----
-                if step_options.get('Pump'):
-                    if app_values.get('Use auto pump'):
-                        # Routine to purge the pump
-                        if (step_label.lower() == 'purge' or
-                            step_label.lower() == 'prime'):
-                            duration_s = step_options.get('Pump_duration_(s)')
-                            for i in range(1,100,10):
-                                self.board.pump_frequency_set(10*i)
-                                self.board.pump_activate()
-                                time.sleep(duration_s)
-                            self.board.pump_deactivate()
-                            logger.info('Pump Primed!')
-                        # Routine to initialize automatic pump
-                        elif step_label.lower() == 'prepare':
-                        # Connect Dropbot to receive capacitance measurements
-                            self.initialize_connection_with_dropbot()
-                        # Turn on Channel 24 (Pump reservoir)
-                            self.dropbot_remote.hv_output_enabled = True
-                            self.dropbot_remote.hv_output_selected = True
-                            self.dropbot_remote.voltage = 100
-                            state = np.zeros(
-                                        self.dropbot_remote.number_of_channels)
-                            state[24] = 1
-                            self.dropbot_remote.state_of_channels = state
-
-                            x = []
-                            for i in range(0,100):
-                                cap = self.dropbot_remote.measure_capacitance()
-                                x.append(cap)
-                            cap = sum(x)/len(x)
-                            logger.info('Capacitance of empty reservoir: %s' %
-                                        cap)
-
-                            def func(x, a, b):
-                                return a * x + b
-
-                            # self.board.pump_frequency_set(10000)
-                            auto_pump_frequency = (app_values
-                                                  .get('Auto pump frequency'))
-                            self.board.pump_frequency_set(auto_pump_frequency)
-                            c = []
-                            sdt = []
-                            start_time = time.time()
-                            end_time = time.time()
-                            pump_time = end_time - start_time
-
-                            self.popt = 0
-                            while (pump_time<15):
-                                self.board.pump_activate()
-                                time.sleep(0.25)
-                                self.board.pump_deactivate()
-
-                                x = []
-                                for i in range(0,10):
-                                    cap = (self.dropbot_remote
-                                           .measure_capacitance())
-                                    x.append(cap)
-                                cap = sum(x)/len(x)
-                                c.append(cap)
-
-                                end_time = time.time()
-                                pump_time = end_time - start_time
-                                sdt.append(pump_time)
-
-                                if (len(c) > 3):
-                                    cdt = np.array(pump_time)
-                                    y_calc = func(cdt, *self.popt)
-                                    res = cap - y_calc
-                                    r_val = (abs(res) / c[0])
-
-                                    if (r_val>= 1.0):
-                                        logger.info('Filling reservoir '
-                                                    + 'stopped!')
-                                        break
-                                if (len(c) > 2):
-                                    x_val = np.array(sdt)
-                                    y_val = np.array(c)
-                                    self.popt, _ = curve_fit(func,
-                                                            x_val, y_val)
-                            x = []
-                            for i in range(0,100):
-                                cap = self.dropbot_remote.measure_capacitance()
-                                x.append(cap)
-                            cap = sum(x)/len(x)
-                            self.max_capacitance = cap
-                            logger.info('Capacitance of filled reservoir: %s' %
-                                        self.max_capacitance)
-
-                        else:
-                        # Routine if auto pump is enabled and initialized
-                            if (self.max_capacitance != 0):
-                                auto_pump_timeout = (app_values
-                                            .get('Auto pump timeout'))
-                                auto_pump_frequency = (app_values
-                                            .get('Auto pump frequency'))
-
-                                self.dropbot_remote.hv_output_enabled = True
-                                self.dropbot_remote.hv_output_selected = True
-                                self.dropbot_remote.voltage = 100
-
-                                self.board.pump_frequency_set(auto_pump_frequency)
-                                state = np.zeros(self.dropbot_remote
-                                                 .number_of_channels)
-                                state[24] = 1
-                                self.dropbot_remote.state_of_channels = state
-                                cap = self.dropbot_remote.measure_capacitance()
-                                max_cp = round(self.max_capacitance, 12)
-                                start_time = time.time()
-                                end_time = start_time
-                                pump_time = end_time - start_time
-                                while ((cap < max_cp) and
-                                       (pump_time < auto_pump_timeout)):
-                                    self.board.pump_activate()
-                                    time.sleep(0.2)
-                                    self.board.pump_deactivate()
-                                    x = []
-                                    for i in range(0, 10):
-                                        x.append(self.dropbot_remote
-                                                 .measure_capacitance())
-                                    # self.board.pump_deactivate()
-                                    cap = sum(x) / len(x)
-                                    end_time = time.time()
-                                    pump_time = end_time - start_time
-                                logger.info('Capacitance of filled'
-                                            + 'reservoir: %s' % cap)
-                    else:
-                        # Launch pump control dialog.
-                        frequency_hz = step_options.get('Pump_frequency_(hz)')
-                        duration_s = step_options.get('Pump_duration_(s)')
-
-                        # Disable pump dialog
-                        #
-                        # XXX Still not sure what the best interface is for the
-                        # pump, but for now we will use a simple time/frequency
-                        # step option.
-                        use_pump_dialog = False
-                        if use_pump_dialog:
-                            self.pump_control_dialog(frequency_hz, duration_s)
-                        else:
-                            self.board.pump_frequency_set(frequency_hz)
-                            self.board.pump_activate()
-                            time.sleep(duration_s)
-                            self.board.pump_deactivate()
-
-                # PMT/ADC
-                # -------
-                if step_options.get('Measure_PMT'):
-                    # Turn off LEDs
-                    self.board.led1.on = False
-                    self.board.led2.on = False
-
-                    # Start the ADC and Perform ADC Calibration
-                    MAX11210_begin(self.board)
-
-                    if step_label.lower() == 'background':
-                        ''' Set PMT control voltage via digipot.'''
-                        # Divide the control voltage by the maximum 1100 mV and
-                        # convert it to digipot steps
-                        pmt_digipot = int((self.board.config
-                                           .pmt_control_voltage / 1100.) * 255)
-                        self.board.pmt_set_pot(pmt_digipot)
-
-                        '''
-                        Perform certain calibration steps only for the
-                        background measurement.
-
-                        Read from the 24bit Registries (SCGC, SCOC)
-                        and store their values for the rest of the
-                        measurements.
-                        '''
-                        self.board.pmt_open_shutter()
-                        self.adc_gain_calibration = self.board.MAX11210_getSelfCalGain()
-                        self.adc_offset_calibration = self.board.MAX11210_getSelfCalOffset()
-                        self.board.MAX11210_setSysOffsetCal(0x00)
-                        self.board.MAX11210_send_command(0b10001000)
-                        reading_i = []
-                        for i in range(0,20):
-                            self.board.MAX11210_setRate(120)
-                            reading_i.append(self.board.MAX11210_getData())
-                        reading_avg = ((sum(reading_i)* 1.0) /
-                                       (len(reading_i) * 1.0))
-                        # Calibration settings for 30kOhm and 300kOhm Resistor
-                        if app_values.get('30K PMT Resistor'):
-                            self.off_cal_val = int(reading_avg) - 100
-                        else:
-                            self.off_cal_val = int(reading_avg) - 1677
-                        self.board.pmt_close_shutter()
-                    else:
-                        if not self.adc_gain_calibration:
-                            logger.warning('Missing ADC Calibration Values! '
-                                           'Please perform a Background '
-                                           'measurement')
-                        else:
-                            _adc_gain = self.adc_gain_calibration
-                            self.board.MAX11210_setSelfCalGain(_adc_gain)
-                            _adc_offset = self.adc_offset_calibration
-                            self.board.MAX11210_setSelfCalOffset(_adc_offset)
-                    if (self.board.config.pmt_sys_offset_cal != 0):
-                        _sys_offset = self.board.config.pmt_sys_offset_cal
-                        self.board.MAX11210_setSysOffsetCal(_sys_offset)
-                    else:
-                        self.board.MAX11210_setSysOffsetCal(self.off_cal_val)
-                    _sys_gain = self.board.config.pmt_sys_gain_cal
-                    self.board.MAX11210_setSysGainCal(_sys_gain)
-                    self.board.MAX11210_send_command(0b10001000)
-
-                    adc_calibration = (self.board.get_adc_calibration()
-                                       .to_dict())
-                    logger.info('ADC calibration:\n%s', adc_calibration)
-                    step_log['ADC calibration'] = adc_calibration
-
-                    temp_pmt_control_voltage = []
-                    for i in range(0,20):
-                         _reference_voltage = self.board.pmt_reference_voltage()
-                         temp_pmt_control_voltage.append(_reference_voltage)
-                    step_pmt_control_voltage = (sum(temp_pmt_control_voltage)/
-                                                len(temp_pmt_control_voltage))
-                    step_pmt_control_voltage = int(step_pmt_control_voltage*
-                                                    1000.0)
-                    logger.info('PMT control voltge: %s'
-                                %step_pmt_control_voltage)
-                    step_log['PMT control voltge'] = step_pmt_control_voltage
-                    _control_voltage = self.board.config.pmt_control_voltage
-                    if step_pmt_control_voltage < (_control_voltage - 150):
-                        logger.warning('PMT Control Voltage Error!\n'
-                                       'Failed to reach the specified control '
-                                       'voltage!\nVoltage read: %s',
-                                       step_pmt_control_voltage)
-
-                    # Launch PMT measure dialog.
-                    delta_t = dt.timedelta(seconds=1)
-
-                    # Set sampling reset_board_state
-                    adc_rate = self.board.config.pmt_sampling_rate
-
-                    # Set Resistor state
-                    resistor_val = app_values.get('30K PMT Resistor')
-                    # Construct a function compatible with `measure_dialog` to
-                    # read from MAX11210 ADC.
-
-                    data_func = (mrbox.ui.gtk.measure_dialog
-                                 .adc_data_func_factory(proxy=self.board,
-                                                        delta_t=delta_t,
-                                                        adc_rate=adc_rate,
-                                                        resistor_val=resistor_val))
-
-                    # Use constructed function to launch measurement dialog for
-                    # the duration specified by the step options.
-                    duration_s = (step_options.get('Measurement_duration_(s)')
-                                  + 1)
-                    use_si_prefixes = app_values.get('Use PMT y-axis SI '
-                                                     'prefixes')
-                    data = (mrbox.ui.gtk.measure_dialog
-                            .measure_dialog(data_func, duration_s=duration_s,
-                                            auto_start=True, auto_close=False,
-                                            si_units=use_si_prefixes))
-                    if data is not None:
-                        # Append measured data as JSON line to [new-line
-                        # delimited JSON][1] file for step.
-                        #
-                        # Each line of results can be loaded using
-                        # `pandas.read_json(..., orient='split')`.
-                        #
-                        # [1]: http://ndjson.org/
-                        filename = ph.path('PMT_readings-step%04d.ndjson' %
-                                           app.protocol.current_step_number)
-                        log_dir = app.experiment_log.get_log_path()
-                        log_dir.makedirs_p()
-
-                        data.name = filename.namebase
-
-                        if step_label:
-                            # Set name of data series based on step label.
-                            data.name = step_label
-
-                        with log_dir.joinpath(filename).open('a') as output:
-                            # Write JSON data with `split` orientation, which
-                            # preserves the name of the Pandas series.
-                            data.to_json(output, orient='split')
-                            output.write('\n')
-
-                        step_log['data'] = data.to_dict()
-
-                        self.update_excel_results()
-            except Exception:
-                logger.error('[%s] Error applying step options.', __name__,
-                             exc_info=True)
+                    logger.error('[%s] Error applying step options.',
+                                 __name__, exc_info=True)
+                # Hardware state is unknown.  Apply all actions of remaining
+                # steps.
+                self.protocol_plan = None
+                try:
+                    yield asyncio.From(self._board_call(self._make_safe))
+                except Exception:
+                    logger.error('[%s] Error turning pump off/closing PMT '
+                                 'shutter.', __name__, exc_info=True)
             finally:
-                self.board.led1.on = led1_on
-                self.board.led2.on = led2_on
+                try:
+                    if not cancelled:
+                        try:
+                            yield asyncio.From(self._join_magnet())
+                        except asyncio.CancelledError:
+                            cancelled = True
+                            step_log['cancelled'] = True
+                            logger.warning('[%s] Step cancelled.', __name__)
+                            self.protocol_plan = None
+                            raise
+                        except Exception:
+                            logger.error('[%s] Error moving magnet.',
+                                         __name__, exc_info=True)
+                            self.protocol_plan = None
+                finally:
+                    if cancelled:
+                        for led_i, on_i in ((self.board.led1, led1_on),
+                                            (self.board.led2, led2_on)):
+                            (self.board_io.submit(setattr, led_i, 'on', on_i)
+                             .add_done_callback(log_exception))
+                    else:
+                        yield asyncio.From(self._board_call(setattr,
+                                                            self.board.led1,
+                                                            'on', led1_on))
+                        yield asyncio.From(self._board_call(setattr,
+                                                            self.board.led2,
+                                                            'on', led2_on))
 
-                app.experiment_log.add_data(step_log, self.name)
+                    app.experiment_log.add_data(step_log, self.name)
 
         elif not self._user_warned:
             logger.warning('[%s] Cannot apply board settings since board is '
@@ -815,38 +934,1415 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
             # Do not warn user again until after the next connection attempt.
             self._user_warned = True
 
+    def _make_safe(self):
+        '''
+        Turn pump off and close PMT shutter.
+
+        Makes requests to the MR-Box peripheral board, so must be called in
+        the board I/O thread (see :meth:`_board_call`).
+
+        .. versionadded:: 0.26
+        '''
+        self.board.pump_deactivate()
+        self.board.pmt_close_shutter()
+
+    def cancel_step(self):
+        '''
+        Cancel step in progress (if any).
+
+        Cancellation is scheduled on the event loop running the step, so
+        this may be called from any thread (e.g., the GTK thread).  The step
+        coroutine is interrupted at its next wait, and the pump is turned off
+        and the PMT shutter is closed (see :meth:`apply_step_options`).
+
+        .. versionadded:: 0.26
+
+        Returns
+        -------
+        bool
+            ``True`` if cancellation of a step in progress was requested.
+        '''
+        step_task = self._step_task
+        loop = self._step_loop
+        if step_task is None or loop is None or step_task.done():
+            return False
+
+        def _cancel():
+            # Runs in event loop thread.
+            if not step_task.done():
+                self._step_cancelled = True
+                step_task.cancel()
+
+        loop.call_soon_threadsafe(_cancel)
+        return True
+
+    @asyncio.coroutine
+    def _log_environment(self, step_log):
+        '''
+        Log DropBot environmental data (temperature, humidity).
+
+        .. versionadded:: 0.26
+        '''
+        try:
+            get_environment_state = self.dropbot_remote.get_environment_state
+            env = yield asyncio.From(self._in_executor(get_environment_state))
+            step_log['environment'] = env.to_dict()
+            logger.info('temp=%.1fC, Rel. humidity=%.1f%%' %
+                        (env['temperature_celsius'],
+                         100 * env['relative_humidity']))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.debug('[%s] Failed to get environment data.', __name__,
+                         exc_info=True)
+
+    @asyncio.coroutine
+    def _join_magnet(self):
+        '''
+        Wait for magnet move started by :meth:`apply_step_options` (if any)
+        to complete.
+
+        .. versionadded:: 0.26
+        '''
+        magnet_move = self._magnet_move
+        if magnet_move is not None:
+            try:
+                yield asyncio.From(magnet_move)
+            finally:
+                self._magnet_move = None
+
+    def _step_label(self, step_number=None):
+        '''
+        .. versionadded:: 0.26
+
+        Parameters
+        ----------
+        step_number : int, optional
+            Step number.  By default, use current step.
+
+        Returns
+        -------
+        str
+            Label of step (or ``None`` if step label plugin is not enabled or
+            no label is set).
+        '''
+        services_by_name = {service_i.name: service_i
+                            for service_i in
+                            PluginGlobals
+                            .env('microdrop.managed').services}
+
+        if 'step_label_plugin' in services_by_name:
+            # Step label is set for current step
+            step_label_plugin = services_by_name.get('step_label_plugin')
+            return (step_label_plugin.get_step_options(step_number)
+                    or {}).get('label')
+        return None
+
+    def compile_protocol_plan(self):
+        '''
+        Compile hardware plan of each step in protocol, validate plan and
+        estimate duration (see :mod:`plan`).
+
+        .. versionadded:: 0.26
+
+        Returns
+        -------
+        list
+            Protocol plan (see :func:`plan.compile_protocol`).
+        '''
+        app = get_app()
+        app_values = self.get_app_values()
+        steps = [(self.get_step_options(i) or {}, self._step_label(i))
+                 for i in xrange(len(app.protocol.steps))]
+        protocol_plan = plan.compile_protocol(steps, app_values)
+
+        calibrated = bool(self.adc_gain_calibration)
+        pump_prepared = self.reservoir_calibration is not None
+        for warning_i in plan.validate_plan(protocol_plan,
+                                            calibrated=calibrated,
+                                            pump_prepared=pump_prepared):
+            logger.warning(warning_i)
+        duration_s = sum(plan.estimate_duration(step_i)
+                         for step_i in protocol_plan)
+        logger.info('Compiled MR-Box plan for %d steps (%d actions, estimated'
+                    ' duration: %.1f s).', len(protocol_plan),
+                    sum(len(step_i['actions']) for step_i in protocol_plan),
+                    duration_s)
+        return protocol_plan
+
+    def _step_plan(self, step_options, step_label, app_values):
+        '''
+        Look up plan of current step in protocol plan.
+
+        If the protocol is not running, or if the step options no longer
+        match the protocol plan (e.g., step was edited), compile the step
+        plan.
+
+        The magnet is only moved if the applied magnet position (see
+        :meth:`_apply_magnet`) differs from the position of the step, since
+        the protocol may start or resume at any step.
+
+        .. versionadded:: 0.26
+
+        .. versionchanged:: 0.26
+            Compare magnet position of step against the applied magnet
+            position instead of the position of the preceding step in the
+            protocol plan.
+
+        Returns
+        -------
+        dict
+            Step plan (see :func:`plan.compile_protocol`).
+        '''
+        app = get_app()
+        step_number = app.protocol.current_step_number
+        protocol_plan = self.protocol_plan
+        step_plan = None
+        if (app.running and protocol_plan is not None and
+                step_number < len(protocol_plan)):
+            step_plan = protocol_plan[step_number]
+            if (step_plan['options'] != step_options or
+                    step_plan['label'] != step_label):
+                logger.info('Step %d differs from protocol plan; recompile '
+                            'step.', step_number + 1)
+                self.protocol_plan = None
+                step_plan = None
+        if step_plan is None:
+            state = plan.step_state(step_options, step_label, app_values)
+            step_plan = {'step_number': step_number, 'label': step_label,
+                         'options': dict(step_options), 'state': state}
+        previous_state = (None if self._magnet_state is None
+                          else {'magnet': self._magnet_state})
+        step_plan = dict(step_plan)
+        step_plan['actions'] = plan.step_actions(step_plan['state'],
+                                                 previous_state)
+        return step_plan
+
+    @asyncio.coroutine
+    def _apply_magnet(self, magnet):
+        '''
+        Move magnet z-stage to engaged (up) or disengaged (down) position.
+
+        The z-stage state is polled until the magnet is reported up (when
+        engaging) or down (when disengaging).
+
+        The applied position is recorded (see :meth:`_step_plan`) once the
+        move completes.
+
+        .. versionadded:: 0.26
+
+        Parameters
+        ----------
+        magnet : bool
+            If ``True``, engage magnet.  Otherwise, disengage magnet.
+        '''
+        # Position is unknown until move completes.
+        self._magnet_state = None
+        zstage = self.board.zstage
+        if magnet:
+            # Send board request to move magnet to position (if it is already
+            # engaged, this function does nothing).
+            yield asyncio.From(self._board_call(zstage.up))
+            verified = yield asyncio.From(self._wait_zstage('is_up'))
+            if not verified:
+                logger.warning('Unable to verify z-stage is in engaged '
+                               'position.')
+                raise asyncio.Return()
+        else:
+            # Send board request to move magnet to down position (if it is
+            # already disengaged, this function does nothing).
+            # Move to low position and then home used to save time and avoid
+            # magnet going beyong the endstop and loosing steps
+            is_down = yield asyncio.From(self._board_call(getattr, zstage,
+                                                          'is_down'))
+            if not is_down:
+                yield asyncio.From(self._board_call(zstage.move_to, 1))
+                yield asyncio.From(self._board_call(zstage.home))
+                verified = yield asyncio.From(self._wait_zstage('is_down'))
+                if not verified:
+                    logger.warning('Unable to verify z-stage is in homed '
+                                   'position.')
+                    raise asyncio.Return()
+        self._magnet_state = magnet
+
+    @asyncio.coroutine
+    def _wait_zstage(self, state):
+        '''
+        Poll z-stage state until it is reported, for at most twice the
+        expected magnet move duration.
+
+        .. versionadded:: 0.26
+
+        Parameters
+        ----------
+        state : str
+            Z-stage state attribute, e.g., ``'is_up'`` or ``'is_down'``.
+
+        Returns
+        -------
+        bool
+            ``True`` if z-stage state was reported before time out.
+        '''
+        zstage = self.board.zstage
+        start = time.time()
+        while not (yield asyncio.From(self._board_call(getattr, zstage,
+                                                       state))):
+            if time.time() - start > 2 * plan.MAGNET_MOVE_S:
+                raise asyncio.Return(False)
+            yield asyncio.From(asyncio.sleep(.1))
+        raise asyncio.Return(True)
+
+    @asyncio.coroutine
+    def _apply_pump(self, pump, app_values, step_log):
+        '''
+        Run pump routine.
+
+        Pump pulses are timed by a :class:`pump_timing.PumpTimer`; intended
+        and actual pulse widths are recorded in the step log.
+
+        Pumping starts once a PMT measurement prepared ahead of time (see
+        :meth:`_start_pmt_lookahead`) is ready, since queued ADC requests
+        would delay pump deactivation.
+
+        .. versionadded:: 0.26
+
+        Parameters
+        ----------
+        pump : dict
+            Pump routine of step plan (see :func:`plan.step_state`).  If auto
+            pump is enabled, the ``purge``, ``prime`` and ``prepare`` step
+            labels select special pump routines.
+        app_values : dict
+            Plugin app option values.
+        step_log : dict
+            Step log, updated in-place with pump timing, number of
+            capacitance readings taken and auto pump fill telemetry (see
+            :class:`fill_telemetry.FillTelemetry`).  Complete fill telemetry
+            is written to the run store (see
+            :meth:`run_store.RunStore.save_fill`).
+        '''
+        timer = PumpTimer(functools.partial(self._board_call,
+                                            self.board.pump_activate),
+                          functools.partial(self._board_call,
+                                            self.board.pump_deactivate))
+        self._capacitance_sample_counts = []
+        self._fill_telemetry = None
+        lookahead = self._pmt_lookahead
+        if lookahead is not None:
+            yield asyncio.From(asyncio.wait([lookahead['future']]))
+        try:
+            yield asyncio.From(self._run_pump(pump, app_values, timer,
+                                              step_log))
+        finally:
+            step_log['pump timing'] = timer.summary()
+            sample_counts = self._capacitance_sample_counts
+            if sample_counts:
+                step_log['capacitance samples'] = \
+                    {'count': len(sample_counts),
+                     'total_samples': sum(sample_counts),
+                     'samples': sample_counts}
+            telemetry = self._fill_telemetry
+            self._fill_telemetry = None
+            if telemetry is not None:
+                step_log['fill telemetry'] = \
+                    telemetry.to_dict(max_samples=FILL_LOG_SAMPLES)
+                self._save_fill(telemetry, step_log)
+
+    def _save_fill(self, telemetry, step_log):
+        '''
+        Write auto pump fill telemetry to the run store of the experiment
+        log directory.
+
+        .. versionadded:: 0.26
+        '''
+        app = get_app()
+        try:
+            store = RunStore(app.experiment_log.get_log_path())
+            path = store.save_fill(app.protocol.current_step_number,
+                                   telemetry.to_dict())
+            step_log['fill telemetry']['path'] = path.name
+        except Exception:
+            logger.warning('Could not save pump fill telemetry.',
+                           exc_info=True)
+
+    @asyncio.coroutine
+    def _run_pump(self, pump, app_values, timer, step_log):
+        '''
+        Run pump routine (see :meth:`_apply_pump`).
+
+        .. versionadded:: 0.26
+        '''
+        mode = pump['mode']
+        if mode == 'prime':
+            # Routine to purge the pump
+            yield asyncio.From(self._prime_pump(pump['schedule'], timer,
+                                                step_log))
+        elif mode == 'prepare':
+            # Routine to initialize automatic pump
+            yield asyncio.From(self._prepare_auto_pump(app_values, timer,
+                                                       step_log))
+        elif mode == 'auto':
+            if self.reservoir_calibration is not None:
+                # Routine if auto pump is enabled and initialized
+                yield asyncio.From(self._auto_pump(app_values, timer,
+                                                   step_log))
+        else:
+            # Launch pump control dialog.
+            frequency_hz = pump['frequency_hz']
+            duration_s = pump['duration_s']
+
+            # Disable pump dialog
+            #
+            # XXX Still not sure what the best interface is for the pump, but
+            # for now we will use a simple time/frequency step option.
+            use_pump_dialog = False
+            if use_pump_dialog:
+                yield asyncio.From(self._join_magnet())
+                yield asyncio.From(self._gtk_call(self.pump_control_dialog,
+                                                  frequency_hz, duration_s))
+            else:
+                yield asyncio.From(self._board_call(self.board_state
+                                                    .pump_frequency_set,
+                                                    frequency_hz))
+                # Wait for magnet before pumping.
+                yield asyncio.From(self._join_magnet())
+                on_time = yield asyncio.From(timer.start())
+                off_deadline = on_time + duration_s
+                if (duration_s >= plan.PMT_PREPARE_S +
+                        plan.PUMP_LOOKAHEAD_GUARD_S):
+                    # Board is idle while pumping; prepare PMT measurement of
+                    # next step (if any).
+                    lookahead = self._start_pmt_lookahead(app_values)
+                    if lookahead is not None:
+                        # Queued ADC requests would delay pump deactivation,
+                        # so look-ahead must finish before the guard time.
+                        timeout_s = max(0, off_deadline - timer.now() -
+                                        plan.PUMP_LOOKAHEAD_GUARD_S)
+                        done, _ = yield asyncio.From(asyncio
+                                                     .wait([lookahead],
+                                                           timeout=timeout_s))
+                        if not done:
+                            logger.info('PMT look-ahead did not finish '
+                                        'during pump pulse; retry after '
+                                        'pulse.')
+                            self._cancel_pmt_lookahead()
+                yield asyncio.From(timer.stop_at(on_time, off_deadline))
+                # Prepare PMT measurement of next step (if not already
+                # prepared) once the pump is off.
+                self._start_pmt_lookahead(app_values)
+
+    @asyncio.coroutine
+    def _prime_pump(self, schedule, timer, step_log):
+        '''
+        Purge/prime pump by stepping up pump frequency.
+
+        Each frequency level starts at an absolute deadline relative to the
+        pump activation, so request latency does not accumulate.
+
+        .. versionadded:: 0.26
+
+        .. versionchanged:: 0.26
+            Run frequency levels from schedule (see
+            :func:`plan.prime_schedule`) and record timing of each level.
+
+        Parameters
+        ----------
+        schedule : list
+            List of ``(frequency_hz, duration_s)`` levels.
+        timer : pump_timing.PumpTimer
+            Pump timer.
+        step_log : dict
+            Step log, updated in-place with intended and actual start time
+            and duration of each level (relative to pump activation).
+        '''
+        # Wait for magnet before pumping.
+        yield asyncio.From(self._join_magnet())
+        on_time = None
+        end_s = None
+        start_s = 0.
+        levels = []
+        try:
+            for k, (frequency_hz, duration_s) in enumerate(schedule):
+                yield asyncio.From(self._board_call(self.board_state
+                                                    .pump_frequency_set,
+                                                    frequency_hz))
+                if on_time is None:
+                    on_time = yield asyncio.From(timer.start())
+                else:
+                    yield asyncio.From(self._board_call(self.board
+                                                        .pump_activate))
+                levels.append({'frequency_hz': frequency_hz,
+                               'intended_start_s': start_s,
+                               'actual_start_s': timer.now() - on_time,
+                               'intended_duration_s': duration_s})
+                start_s += duration_s
+                if k < len(schedule) - 1:
+                    yield asyncio.From(timer.wait_until(on_time + start_s))
+            end_s = yield asyncio.From(timer.stop_at(on_time,
+                                                     on_time + start_s))
+        finally:
+            # Actual duration of each level lasts until start of next level
+            # (or end of pulse).
+            ends_s = [level_i['actual_start_s'] for level_i in levels[1:]]
+            ends_s.append(end_s)
+            for level_i, end_i in zip(levels, ends_s):
+                level_i['actual_duration_s'] = \
+                    (None if end_i is None
+                     else end_i - level_i['actual_start_s'])
+            step_log['prime ramp'] = levels
+        logger.info('Pump Primed!')
+
+    def _actuate_reservoir(self, app_values):
+        '''
+        Turn on DropBot high voltage output and actuate pump reservoir
+        channel **(blocking)**.
+
+        High voltage output settings already in effect are not resent;
+        voltage and channel states are always resent since the DropBot
+        plugin applies its own during each step (see
+        :class:`reservoir.ReservoirActuator`).
+
+        .. versionadded:: 0.26
+
+        .. versionchanged:: 0.26
+            Use ``Reservoir channel`` and ``Reservoir voltage`` app options
+            (previously, channel 24 at 100 V).
+        '''
+        actuator = self.reservoir_actuator
+        if actuator is None or actuator.proxy is not self.dropbot_remote:
+            actuator = ReservoirActuator(self.dropbot_remote)
+            self.reservoir_actuator = actuator
+        actuator.actuate(app_values.get('Reservoir channel'),
+                         app_values.get('Reservoir voltage'))
+
+    def _set_reservoir_calibration(self, empty_capacitance,
+                                   full_capacitance, app_values):
+        '''
+        Set capacitance of empty and filled pump reservoir used by auto pump
+        routines.
+
+        .. versionadded:: 0.26
+
+        Parameters
+        ----------
+        empty_capacitance, full_capacitance : float
+            Capacitance of empty and filled reservoir.
+        app_values : dict
+            Plugin app option values.
+
+        Returns
+        -------
+        fill_level.ReservoirCalibration or None
+            Reservoir calibration, or ``None`` if filled reservoir
+            capacitance is not greater than empty reservoir capacitance.
+        '''
+        try:
+            calibration = \
+                ReservoirCalibration(empty_capacitance, full_capacitance,
+                                     volume_ul=app_values
+                                     .get('Reservoir volume (uL)'))
+        except ValueError, exception:
+            logger.warning('Invalid reservoir calibration: %s', exception)
+            calibration = None
+        self.reservoir_calibration = calibration
+        return calibration
+
+    def _calibration_store(self):
+        '''
+        .. versionadded:: 0.26
+
+        Returns
+        -------
+        calibration_store.CalibrationStore
+            Store of reservoir calibrations in MicroDrop data directory.
+        '''
+        app = get_app()
+        return CalibrationStore(ph.path(app.config['data_dir'])
+                                .joinpath(self.name, STORE_FILENAME))
+
+    def _load_calibration(self, app_values):
+        '''
+        Load stored reservoir calibration for connected DropBot, current
+        device and auto pump settings **(blocking)**.
+
+        .. versionadded:: 0.26
+
+        Returns
+        -------
+        tuple or None
+            ``(key, calibration)`` (see :meth:`_calibration_key` and
+            :meth:`calibration_store.CalibrationStore.load`), or ``None`` if
+            the calibration store could not be read.
+        '''
+        try:
+            key = self._calibration_key(app_values)
+            max_age_h = app_values.get('Reservoir calibration max age (h)')
+            return key, self._calibration_store().load(key, max_age_s=
+                                                       3600. * max_age_h)
+        except Exception:
+            logger.warning('Could not load stored reservoir calibration.',
+                           exc_info=True)
+            return None
+
+    def _calibration_key(self, app_values):
+        '''
+        Key of reservoir calibration for connected DropBot, current device
+        and auto pump settings **(blocking)**.
+
+        .. versionadded:: 0.26
+
+        Returns
+        -------
+        str
+            Calibration key (see :func:`calibration_store.calibration_key`).
+        '''
+        try:
+            dropbot_id = str(self.dropbot_remote.uuid)
+        except Exception:
+            logger.debug('[%s] Could not get DropBot UUID.', __name__,
+                         exc_info=True)
+            dropbot_id = None
+        device_id = getattr(get_app().dmf_device, 'name', None)
+        settings = {'frequency_hz': app_values.get('Auto pump frequency'),
+                    'channel': app_values.get('Reservoir channel'),
+                    'voltage': app_values.get('Reservoir voltage')}
+        return calibration_key(dropbot_id, device_id, settings)
+
+    @asyncio.coroutine
+    def _sample_capacitance(self, n_samples, app_values):
+        '''
+        Take a batch of DropBot capacitance readings.
+
+        .. versionadded:: 0.26
+
+        .. versionchanged:: 0.26
+            If ``Adaptive capacitance sampling`` is enabled, stop taking
+            readings once the mean is known to within ``Capacitance relative
+            error`` (see :meth:`capacitance.CapacitanceSampler.estimate`).
+
+        Parameters
+        ----------
+        n_samples : int
+            Number of readings (maximum number if adaptive sampling is
+            enabled).
+        app_values : dict
+            Plugin app option values.
+
+        Returns
+        -------
+        capacitance.CapacitanceSample
+            Readings, mean and standard deviation.
+        '''
+        interval_s = app_values.get('Capacitance sample interval (s)') or 0
+        sampler = CapacitanceSampler(self.dropbot_remote.measure_capacitance,
+                                     interval_s=interval_s)
+        if app_values.get('Adaptive capacitance sampling'):
+            min_samples = app_values.get('Capacitance minimum samples') or 1
+            rel_error = app_values.get('Capacitance relative error') or 0
+            sample = yield asyncio.From(self._in_executor(sampler.estimate,
+                                                          min_samples,
+                                                          n_samples,
+                                                          rel_error))
+        else:
+            sample = yield asyncio.From(self._in_executor(sampler.sample,
+                                                          n_samples))
+        logger.debug('Capacitance: %s (std: %s, %d/%d samples)', sample.mean,
+                     sample.std, sample.n_samples, n_samples)
+        self._capacitance_sample_counts.append(sample.n_samples)
+        if self._fill_telemetry is not None:
+            self._fill_telemetry.add_sample(sample.mean, sample.std,
+                                            sample.n_samples)
+        raise asyncio.Return(sample)
+
+    @asyncio.coroutine
+    def _prepare_auto_pump(self, app_values, timer, step_log):
+        '''
+        Fill pump reservoir to determine capacitance of full reservoir.
+
+        Pump is pulsed until the measured capacitance deviates from a linear
+        fit of the capacitance measured after each preceding pulse.
+
+        .. versionadded:: 0.26
+
+        .. versionchanged:: 0.26
+            Update linear fit incrementally after each pulse (see
+            :class:`fill_model.LinearFillModel`) instead of refitting all
+            preceding measurements.
+
+        .. versionchanged:: 0.26
+            If ``Reuse reservoir calibration`` is enabled, reuse calibration
+            stored for the same DropBot, device and auto pump settings (see
+            :class:`calibration_store.CalibrationStore`) if it is not too old
+            and the empty reservoir capacitance has not drifted; otherwise,
+            store the new calibration.
+
+        .. versionchanged:: 0.26
+            Record fill telemetry (see :meth:`_apply_pump`).
+
+        .. versionchanged:: 0.26
+            Set :attr:`reservoir_calibration` (see
+            :meth:`_set_reservoir_calibration`) instead of capacitance of
+            filled reservoir.
+
+        Parameters
+        ----------
+        app_values : dict
+            Plugin app option values.
+        timer : pump_timing.PumpTimer
+            Pump timer.
+        step_log : dict
+            Step log, updated in-place with summary of linear fit and
+            calibration source.
+        '''
+        # Connect Dropbot to receive capacitance measurements
+        initialize_dropbot = self.initialize_connection_with_dropbot
+        yield asyncio.From(self._in_executor(initialize_dropbot))
+        # Turn on pump reservoir channel
+        yield asyncio.From(self._in_executor(self._actuate_reservoir,
+                                             app_values))
+
+        reference_samples = app_values.get('Capacitance reference samples')
+        pulse_samples = app_values.get('Capacitance samples per pulse')
+        sample = yield asyncio.From(self._sample_capacitance(reference_samples,
+                                                             app_values))
+        cap = sample.mean
+        logger.info('Capacitance of empty reservoir: %s (std: %s)', cap,
+                    sample.std)
+        empty_capacitance = cap
+
+        reuse = app_values.get('Reuse reservoir calibration')
+        if reuse:
+            loaded = yield asyncio.From(self._in_executor
+                                        (self._load_calibration, app_values))
+            reuse = loaded is not None
+            key, calibration = loaded or (None, None)
+            if calibration is not None:
+                # Quick verification: empty reservoir capacitance must match.
+                drift = ((empty_capacitance -
+                          calibration['empty_capacitance']) /
+                         calibration['empty_capacitance'])
+                tolerance = \
+                    app_values.get('Reservoir calibration drift tolerance')
+                step_log['reservoir calibration'] = \
+                    {'source': 'store', 'age_s': calibration['age_s'],
+                     'drift': drift}
+                if abs(drift) <= tolerance:
+                    # Shift stored full capacitance by offset of empty
+                    # reservoir.
+                    full_capacitance = (calibration['full_capacitance'] +
+                                        empty_capacitance -
+                                        calibration['empty_capacitance'])
+                    self._set_reservoir_calibration(empty_capacitance,
+                                                    full_capacitance,
+                                                    app_values)
+                    logger.info('Use stored reservoir calibration (%.1f h '
+                                'old, drift: %.2g); capacitance of filled '
+                                'reservoir: %s', calibration['age_s'] / 3600.,
+                                drift, full_capacitance)
+                    raise asyncio.Return()
+                logger.info('Stored reservoir calibration drifted (%.2g); '
+                            'recalibrate.', drift)
+        step_log['reservoir calibration'] = {'source': 'prepare'}
+
+        # self.board.pump_frequency_set(10000)
+        auto_pump_frequency = app_values.get('Auto pump frequency')
+        yield asyncio.From(self._board_call(self.board_state
+                                            .pump_frequency_set,
+                                            auto_pump_frequency))
+        # Wait for magnet before pumping.
+        yield asyncio.From(self._join_magnet())
+        telemetry = FillTelemetry('prepare', 'Fixed pulses')
+        telemetry.parameters['empty_capacitance'] = empty_capacitance
+        self._fill_telemetry = telemetry
+        start_time = timer.now()
+        end_time = timer.now()
+        pump_time = end_time - start_time
+
+        # Linear fit of capacitance against pump time.
+        self.fill_model = fill_model = LinearFillModel()
+        c0 = None
+        while (pump_time < plan.PREPARE_TIMEOUT_S):
+            yield asyncio.From(timer.pulse(0.25))
+            telemetry.add_pulse(timer.pulses[-1], auto_pump_frequency)
+
+            sample = yield asyncio.From(self._sample_capacitance(pulse_samples,
+                                                                 app_values))
+            cap = sample.mean
+            if c0 is None:
+                c0 = cap
+
+            end_time = timer.now()
+            pump_time = end_time - start_time
+
+            # Residual relative to fit of at least 3 preceding measurements.
+            check = fill_model.n >= 3
+            res = fill_model.update(pump_time, cap)
+            if check:
+                r_val = (abs(res) / c0)
+
+                if (r_val >= 1.0):
+                    logger.info('Filling reservoir stopped!')
+                    break
+        step_log['fill model'] = fill_model.summary()
+        telemetry.parameters['fit'] = step_log['fill model']
+        logger.debug('Fill model: %s', step_log['fill model'])
+
+        sample = yield asyncio.From(self._sample_capacitance(reference_samples,
+                                                             app_values))
+        full_capacitance = sample.mean
+        telemetry.target = full_capacitance
+        telemetry.calibration = \
+            self._set_reservoir_calibration(empty_capacitance,
+                                            full_capacitance, app_values)
+        logger.info('Capacitance of filled reservoir: %s (std: %s)',
+                    full_capacitance, sample.std)
+        if reuse and telemetry.calibration is not None:
+            try:
+                self._calibration_store().save(key, empty_capacitance,
+                                               full_capacitance)
+            except Exception:
+                logger.warning('Could not store reservoir calibration.',
+                               exc_info=True)
+
+    @asyncio.coroutine
+    def _auto_pump(self, app_values, timer, step_log):
+        '''
+        Pulse pump until reservoir reaches ``Auto pump target fill`` fraction
+        of reservoir calibration (see :meth:`_prepare_auto_pump`) or auto
+        pump timeout.
+
+        .. versionadded:: 0.26
+
+        .. versionchanged:: 0.26
+            If ``Auto pump control`` is ``PI``, choose the width and frequency
+            of each pulse with a closed-loop controller (see
+            :class:`pump_control.PIPumpController`) instead of fixed 0.2 s
+            pulses.
+
+        .. versionchanged:: 0.26
+            If ``Auto pump control`` is ``Continuous``, run the pump without
+            interruption while capacitance is sampled on a separate thread
+            (see :class:`capacitance.CapacitanceMonitor`), and turn the pump
+            off as soon as the filtered capacitance reaches the target.
+
+        .. versionchanged:: 0.26
+            Record fill telemetry (see :meth:`_apply_pump`).
+
+        .. versionchanged:: 0.26
+            Stop at ``Auto pump target fill`` fraction of the reservoir
+            calibration (see :class:`fill_level.ReservoirCalibration`)
+            instead of the capacitance of the filled reservoir, and record
+            final fill level in step log.
+
+        Parameters
+        ----------
+        app_values : dict
+            Plugin app option values.
+        timer : pump_timing.PumpTimer
+            Pump timer.
+        step_log : dict
+            Step log, updated in-place with controller trajectory or
+            capacitance monitor summary.
+        '''
+        auto_pump_timeout = app_values.get('Auto pump timeout')
+        auto_pump_frequency = app_values.get('Auto pump frequency')
+        pulse_samples = app_values.get('Capacitance samples per pulse')
+        calibration = self.reservoir_calibration
+        target_fill = app_values.get('Auto pump target fill') or 1.
+        target_cp = calibration.capacitance(target_fill)
+        control = app_values.get('Auto pump control') or 'Fixed pulses'
+        telemetry = FillTelemetry('auto', control, target=target_cp,
+                                  calibration=calibration)
+        self._fill_telemetry = telemetry
+
+        yield asyncio.From(self._board_call(self.board_state
+                                            .pump_frequency_set,
+                                            auto_pump_frequency))
+        yield asyncio.From(self._in_executor(self._actuate_reservoir,
+                                             app_values))
+        sample = yield asyncio.From(self._sample_capacitance(1, app_values))
+        cap = sample.mean
+        # Wait for magnet before pumping.
+        yield asyncio.From(self._join_magnet())
+        start_time = timer.now()
+        end_time = start_time
+        pump_time = end_time - start_time
+        if control == 'PI':
+            controller = \
+                PIPumpController(target_cp, auto_pump_frequency,
+                                 kp=app_values.get('Auto pump Kp'),
+                                 ki=app_values.get('Auto pump Ki'))
+            try:
+                while True:
+                    pump_time = timer.now() - start_time
+                    pulse = controller.update(pump_time, cap, remaining_s=
+                                              auto_pump_timeout - pump_time)
+                    if pulse is None:
+                        break
+                    width_s, frequency_hz = pulse
+                    frequency_hz = int(round(frequency_hz))
+                    yield asyncio.From(self._board_call(self.board_state
+                                                        .pump_frequency_set,
+                                                        frequency_hz))
+                    yield asyncio.From(timer.pulse(width_s))
+                    telemetry.add_pulse(timer.pulses[-1], frequency_hz)
+                    sample = yield asyncio.From(self._sample_capacitance
+                                                (pulse_samples, app_values))
+                    cap = sample.mean
+            finally:
+                step_log['pump controller'] = controller.summary()
+                telemetry.parameters['controller'] = \
+                    step_log['pump controller']
+            logger.info('Auto pump controller: %d pulses',
+                        step_log['pump controller']['pulse_count'])
+        elif control == 'Continuous':
+            if calibration.fill_fraction(cap) < target_fill:
+                interval_s = \
+                    app_values.get('Capacitance sample interval (s)') or 0
+                monitor = \
+                    CapacitanceMonitor(self.dropbot_remote.measure_capacitance,
+                                       window=pulse_samples,
+                                       interval_s=interval_s,
+                                       capacity=CAPACITANCE_MONITOR_CAPACITY)
+                monitor.start()
+                try:
+                    on_time = yield asyncio.From(timer.start())
+                    while pump_time < auto_pump_timeout:
+                        if monitor.error is not None:
+                            raise monitor.error
+                        filtered = monitor.filtered()
+                        if (filtered is not None and
+                                calibration.fill_fraction(filtered) >=
+                                target_fill):
+                            break
+                        yield asyncio.From(asyncio.sleep(CAPACITANCE_POLL_S))
+                        pump_time = timer.now() - start_time
+                finally:
+                    # Pump is turned off below, or by `apply_step_options()`
+                    # on error/cancellation.
+                    monitor.stop()
+                    step_log['capacitance monitor'] = monitor.summary()
+                    _, readings = monitor.ring_buffer.snapshot()
+                    telemetry.add_samples(readings['time_s'],
+                                          readings['value'],
+                                          start_time=monitor.start_time)
+                    telemetry.parameters['capacitance monitor'] = \
+                        step_log['capacitance monitor']
+                yield asyncio.From(timer.stop_at(on_time, timer.now()))
+                telemetry.add_pulse(timer.pulses[-1], auto_pump_frequency)
+                filtered = monitor.filtered()
+                if filtered is not None:
+                    cap = filtered
+        else:
+            while ((calibration.fill_fraction(cap) < target_fill) and
+                   (pump_time < auto_pump_timeout)):
+                yield asyncio.From(timer.pulse(0.2))
+                telemetry.add_pulse(timer.pulses[-1], auto_pump_frequency)
+                sample = yield asyncio.From(self._sample_capacitance
+                                            (pulse_samples, app_values))
+                cap = sample.mean
+                end_time = timer.now()
+                pump_time = end_time - start_time
+        fill_fraction = calibration.fill_fraction(cap)
+        step_log['fill level'] = {'capacitance': cap,
+                                  'target_fill': target_fill,
+                                  'fill_fraction': fill_fraction,
+                                  'volume_ul': calibration.volume(cap)}
+        logger.info('Capacitance of filled reservoir: %s (fill: %.1f%%)',
+                    cap, 100 * fill_fraction)
+
+    def _prepare_adc(self, background, app_values):
+        '''
+        Start ADC and apply calibration settings **(blocking)**.
+
+        Settings which are unchanged since the previous request are not
+        resent (see :class:`board_state.BoardState`).  Raw ADC commands are
+        also made through :class:`board_state.BoardState`, so only settings
+        overwritten by a command (e.g., by a calibration) are resent.
+
+        .. versionadded:: 0.26
+
+        Parameters
+        ----------
+        background : bool
+            If ``True``, set PMT control voltage and perform ADC calibration
+            to be used for the rest of the measurements.
+        app_values : dict
+            Plugin app option values.
+        '''
+        board_state = self.board_state
+        if background:
+            # Always restart the ADC to perform a fresh self-calibration for
+            # the background measurement.
+            board_state.invalidate('MAX11210_')
+        # Start the ADC and Perform ADC Calibration
+        board_state.MAX11210_begin()
+
+        config = self.board.config
+        if background:
+            ''' Set PMT control voltage via digipot.'''
+            # Divide the control voltage by the maximum 1100 mV and convert it
+            # to digipot steps
+            pmt_digipot = int((config.pmt_control_voltage / 1100.) * 255)
+            board_state.pmt_set_pot(pmt_digipot)
+
+            '''
+            Perform certain calibration steps only for the background
+            measurement.
+
+            Read from the 24bit Registries (SCGC, SCOC) and store their values
+            for the rest of the measurements.
+            '''
+            self.board.pmt_open_shutter()
+            self.adc_gain_calibration = self.board.MAX11210_getSelfCalGain()
+            self.adc_offset_calibration = \
+                self.board.MAX11210_getSelfCalOffset()
+            board_state.MAX11210_setSysOffsetCal(0x00)
+            board_state.MAX11210_send_command(0b10001000)
+            reading_i = []
+            for i in range(0, 20):
+                board_state.MAX11210_setRate(120)
+                reading_i.append(self.board.MAX11210_getData())
+            reading_avg = ((sum(reading_i) * 1.0) / (len(reading_i) * 1.0))
+            # Calibration settings for 30kOhm and 300kOhm Resistor
+            if app_values.get('30K PMT Resistor'):
+                self.off_cal_val = int(reading_avg) - 100
+            else:
+                self.off_cal_val = int(reading_avg) - 1677
+            self.board.pmt_close_shutter()
+        else:
+            if not self.adc_gain_calibration:
+                logger.warning('Missing ADC Calibration Values! Please '
+                               'perform a Background measurement')
+            else:
+                _adc_gain = self.adc_gain_calibration
+                board_state.MAX11210_setSelfCalGain(_adc_gain)
+                _adc_offset = self.adc_offset_calibration
+                board_state.MAX11210_setSelfCalOffset(_adc_offset)
+        if (config.pmt_sys_offset_cal != 0):
+            _sys_offset = config.pmt_sys_offset_cal
+            board_state.MAX11210_setSysOffsetCal(_sys_offset)
+        else:
+            board_state.MAX11210_setSysOffsetCal(self.off_cal_val)
+        _sys_gain = config.pmt_sys_gain_cal
+        board_state.MAX11210_setSysGainCal(_sys_gain)
+        board_state.MAX11210_send_command(0b10001000)
+
+    def _read_pmt_control_voltage(self, n_samples=20):
+        '''
+        Average of multiple PMT reference voltage readings **(blocking)**.
+
+        .. versionadded:: 0.26
+
+        Returns
+        -------
+        int
+            PMT control voltage in millivolts.
+        '''
+        temp_pmt_control_voltage = []
+        for i in range(0, n_samples):
+            _reference_voltage = self.board.pmt_reference_voltage()
+            temp_pmt_control_voltage.append(_reference_voltage)
+        step_pmt_control_voltage = (sum(temp_pmt_control_voltage) /
+                                    len(temp_pmt_control_voltage))
+        return int(step_pmt_control_voltage * 1000.0)
+
+    @asyncio.coroutine
+    def _prepare_pmt(self, background, app_values):
+        '''
+        Calibrate ADC and check PMT control voltage.
+
+        .. versionadded:: 0.26
+
+        Parameters
+        ----------
+        background : bool
+            If ``True``, perform background ADC calibration.
+        app_values : dict
+            Plugin app option values.
+
+        Returns
+        -------
+        dict
+            ADC calibration (``adc_calibration``), measured PMT control
+            voltage (``pmt_control_voltage``) and board configuration
+            (``config``).
+        '''
+        yield asyncio.From(self._board_call(self._prepare_adc, background,
+                                            app_values))
+
+        get_calibration = self.board.get_adc_calibration
+        adc_calibration = \
+            yield asyncio.From(self._board_call(get_calibration))
+        adc_calibration = adc_calibration.to_dict()
+
+        read_voltage = self._read_pmt_control_voltage
+        step_pmt_control_voltage = \
+            yield asyncio.From(self._board_call(read_voltage))
+        config = yield asyncio.From(self._board_call(getattr, self.board,
+                                                     'config'))
+        raise asyncio.Return({'adc_calibration': adc_calibration,
+                              'pmt_control_voltage': step_pmt_control_voltage,
+                              'config': config})
+
+    def _start_pmt_lookahead(self, app_values):
+        '''
+        Start preparing PMT measurement of next step (if any) during idle
+        time of current step, e.g., during or after a manual pump pulse.
+
+        Only non-background measurements are prepared ahead of time, since
+        background calibration requires the PMT shutter to be opened.
+
+        The prepared measurement is discarded if the step options change or
+        another step is selected (see :meth:`_cancel_pmt_lookahead`).
+
+        .. versionadded:: 0.26
+
+        Returns
+        -------
+        asyncio.Future
+            Prepared PMT measurement (see :meth:`_prepare_pmt`), or ``None``
+            if no measurement was started.
+        '''
+        app = get_app()
+        protocol_plan = self.protocol_plan
+        if (not app.running or protocol_plan is None or
+                self._pmt_lookahead is not None):
+            return None
+        step_number = app.protocol.current_step_number + 1
+        if (step_number >= len(protocol_plan) or
+                protocol_plan[step_number - 1]['state']['pmt'] is not None):
+            # No next step, or ADC is used by measurement of current step.
+            return None
+        pmt = protocol_plan[step_number]['state']['pmt']
+        if pmt is None or pmt['background']:
+            return None
+        logger.debug('Prepare PMT measurement of step %d.', step_number + 1)
+        future = asyncio.ensure_future(self._prepare_pmt(False, app_values))
+        self._pmt_lookahead = {'step_number': step_number, 'future': future,
+                               'loop': asyncio.get_event_loop()}
+        return future
+
+    def _cancel_pmt_lookahead(self):
+        '''
+        Discard PMT measurement prepared ahead of time (if any).
+
+        May be called from any thread; cancellation is scheduled on the event
+        loop running the look-ahead.
+
+        .. versionadded:: 0.26
+        '''
+        lookahead = self._pmt_lookahead
+        self._pmt_lookahead = None
+        if lookahead is not None:
+            lookahead['loop'].call_soon_threadsafe(lookahead['future']
+                                                   .cancel)
+
+    @asyncio.coroutine
+    def _acquire_pmt(self, data_func, duration_s, delta_t, app_values,
+                     step_log):
+        '''
+        Acquire PMT data without the measurement dialog (see
+        :class:`acquisition.AcquisitionEngine`).
+
+        Samples are streamed to the experiment log PMT cache as they are
+        acquired.  If the ``PMT live view`` app option is set, a lightweight
+        live view shows the progress and latest reading.
+
+        .. versionadded:: 0.26
+
+        Returns
+        -------
+        pandas.Series
+            Acquired PMT data (or ``None`` if no samples were acquired).
+        '''
+        app = get_app()
+        store = RunStore(app.experiment_log.get_log_path())
+        stream_path = store.stream_path(app.protocol.current_step_number)
+        writer = RecordWriter(stream_path)
+        view = None
+        ring_buffer = None
+        if app_values.get('PMT live view'):
+            # Live view reads recent samples from buffer shared with the
+            # acquisition thread.
+            ring_buffer = RingBuffer(LIVE_VIEW_CAPACITY)
+            view = yield asyncio.From(self._gtk_call(LiveView, 'PMT',
+                                                     duration_s,
+                                                     ring_buffer))
+        engine = AcquisitionEngine(data_func, duration_s,
+                                   delta_t_s=delta_t.total_seconds(),
+                                   writer=writer, ring_buffer=ring_buffer)
+        try:
+            data = yield asyncio.From(asyncio.wrap_future(engine.start()))
+        finally:
+            engine.stop()
+            writer.close()
+            if view is not None:
+                yield asyncio.From(self._gtk_call(view.close))
+        step_log['PMT stream'] = {'path': str(stream_path.name),
+                                  'sample_count': engine.sample_count,
+                                  'late_count': engine.late_count}
+        raise asyncio.Return(data)
+
+    @asyncio.coroutine
+    def _measure_pmt(self, pmt, step_label, app_values, step_log):
+        '''
+        Calibrate ADC, measure PMT and save measured data.
+
+        If the ADC was calibrated during the previous step (see
+        :meth:`_start_pmt_lookahead`), the measurement begins immediately.
+
+        .. versionadded:: 0.26
+
+        Parameters
+        ----------
+        pmt : dict
+            PMT measurement of step plan (see :func:`plan.step_state`).  The
+            ``background`` step label selects ADC calibration measurement.
+        step_label : str
+            Step label (if set).  Used as name of measured data.
+        app_values : dict
+            Plugin app option values.
+        step_log : dict
+            Step log, updated in-place with ADC calibration, PMT control
+            voltage and measured data.
+        '''
+        app = get_app()
+
+        background = pmt['background']
+        prepared = None
+        lookahead = self._pmt_lookahead
+        self._pmt_lookahead = None
+        if lookahead is not None:
+            if (not background and lookahead['step_number'] ==
+                    app.protocol.current_step_number):
+                try:
+                    prepared = yield asyncio.From(lookahead['future'])
+                    step_log['PMT look-ahead'] = True
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.debug('[%s] PMT look-ahead failed.', __name__,
+                                 exc_info=True)
+            else:
+                lookahead['future'].cancel()
+        if prepared is None:
+            prepared = yield asyncio.From(self._prepare_pmt(background,
+                                                            app_values))
+
+        adc_calibration = prepared['adc_calibration']
+        logger.info('ADC calibration:\n%s', adc_calibration)
+        step_log['ADC calibration'] = adc_calibration
+
+        step_pmt_control_voltage = prepared['pmt_control_voltage']
+        logger.info('PMT control voltge: %s' % step_pmt_control_voltage)
+        step_log['PMT control voltge'] = step_pmt_control_voltage
+        config = prepared['config']
+        _control_voltage = config.pmt_control_voltage
+        if step_pmt_control_voltage < (_control_voltage - 150):
+            logger.warning('PMT Control Voltage Error!\nFailed to reach the '
+                           'specified control voltage!\nVoltage read: %s',
+                           step_pmt_control_voltage)
+
+        # Launch PMT measure dialog.
+        delta_t = dt.timedelta(seconds=1)
+
+        # Set sampling reset_board_state
+        adc_rate = config.pmt_sampling_rate
+
+        # Set Resistor state
+        resistor_val = app_values.get('30K PMT Resistor')
+        # Construct a function compatible with `measure_dialog` to read from
+        # MAX11210 ADC.
+        #
+        # ADC requests are executed in the board I/O thread.
+        board = SerializedProxy(self.board, self.board_io)
+        data_func = (mrbox.ui.gtk.measure_dialog
+                     .adc_data_func_factory(proxy=board,
+                                            delta_t=delta_t,
+                                            adc_rate=adc_rate,
+                                            resistor_val=resistor_val))
+        raw_writer = None
+        if app_values.get('Filter PMT outliers'):
+            # Reject single-sample ADC glitches from each chunk as it is
+            # acquired, before it is plotted or stored.  Raw chunks are
+            # streamed to disk as they are acquired.
+            store = RunStore(app.experiment_log.get_log_path())
+            raw_writer = RecordWriter(store.raw_path(app.protocol
+                                                     .current_step_number))
+            window_size = app_values.get('PMT filter window')
+            n_sigmas = app_values.get('PMT filter threshold')
+            data_func = FilteredDataFunc(data_func, window_size=window_size,
+                                         n_sigmas=n_sigmas,
+                                         raw_writer=raw_writer)
+
+        # Use constructed function to launch measurement dialog for the
+        # duration specified by the step options.
+        duration_s = pmt['duration_s']
+        try:
+            # ADC is prepared; wait for magnet before measuring.
+            yield asyncio.From(self._join_magnet())
+            if app_values.get('PMT acquisition') == 'Headless':
+                data = yield asyncio.From(self._acquire_pmt(data_func,
+                                                            duration_s,
+                                                            delta_t,
+                                                            app_values,
+                                                            step_log))
+            else:
+                use_si_prefixes = app_values.get('Use PMT y-axis SI '
+                                                 'prefixes')
+                measure_dialog = mrbox.ui.gtk.measure_dialog.measure_dialog
+                data = yield asyncio.From(self._gtk_call(measure_dialog,
+                                                         data_func,
+                                                         duration_s=duration_s,
+                                                         auto_start=True,
+                                                         auto_close=False,
+                                                         si_units=
+                                                         use_si_prefixes))
+        finally:
+            if raw_writer is not None:
+                raw_writer.close()
+        if data is not None:
+            # Append measured data as JSON line to [new-line
+            # delimited JSON][1] file for step.
+            #
+            # Each line of results can be loaded using
+            # `pandas.read_json(..., orient='split')`.
+            #
+            # [1]: http://ndjson.org/
+            step_number = app.protocol.current_step_number
+            filename = ph.path('PMT_readings-step%04d.ndjson' %
+                               step_number)
+            log_dir = app.experiment_log.get_log_path()
+            log_dir.makedirs_p()
+
+            data.name = filename.namebase
+
+            if step_label:
+                # Set name of data series based on step label.
+                data.name = step_label
+
+            if raw_writer is not None:
+                # The raw data is kept in a separate file in the PMT cache,
+                # which is not used to generate the report.
+                rejected_count = data_func.rejected_count
+                logger.info('Rejected %d/%d PMT samples as '
+                            'outliers.', rejected_count,
+                            data_func.sample_count)
+                hampel_filter = data_func.hampel_filter
+                step_log['PMT filter'] = \
+                    {'window_size': hampel_filter.window_size,
+                     'n_sigmas': hampel_filter.n_sigmas,
+                     'rejected_count': rejected_count,
+                     'sample_count': data_func.sample_count,
+                     'raw_path': str(raw_writer.path.name)}
+
+            with log_dir.joinpath(filename).open('a') as output:
+                # Write JSON data with `split` orientation, which
+                # preserves the name of the Pandas series.
+                data.to_json(output, orient='split')
+                output.write('\n')
+
+            step_log['data'] = data.to_dict()
+
+            yield asyncio.From(self._in_executor(self.update_excel_results))
+
     def update_excel_results(self, launch=False):
         '''
         Update output Excel results file.
 
         .. versionadded:: 0.19
 
+        .. versionchanged:: 0.26
+            If the ``Report format`` app option is ``HTML``, also write a
+            self-contained HTML report (``PMT_readings.html``), read from the
+            PMT run cache (see :class:`run_store.RunStore`), and launch it
+            instead of the Excel spreadsheet.
+
+        .. versionchanged:: 0.26
+            Write Excel report from compiled template skeleton (see
+            :mod:`report_skeleton`) unless the ``Use compiled report
+            template`` app option is disabled.
+
+        .. versionchanged:: 0.26
+            Summarize fill level of recorded auto pump fills (see
+            :meth:`run_store.RunStore.fills`) in HTML report.
+
         Parameters
         ----------
         launch : bool, optional
-            If ``True``, launch Excel spreadsheet after writing.
+            If ``True``, launch Excel spreadsheet (or HTML report) after
+            writing.
         '''
         app = get_app()
+        app_values = self.get_app_values()
         log_dir = app.experiment_log.get_log_path()
 
         # Update Excel file with latest PMT results.
         output_path = log_dir.joinpath('PMT_readings.xlsx')
+        html_output_path = log_dir.joinpath('PMT_readings.html')
         data_files = list(log_dir.files('PMT_readings-*.ndjson'))
 
         if not data_files:
             logger.debug('No PMT readings files found.')
             return
 
+        write_html = app_values.get('Report format') == 'HTML'
+        launch_path = html_output_path if write_html else output_path
+
+        if write_html:
+            assay_info = OrderedDict()
+            try:
+                assay_info['Device'] = app.dmf_device.name
+                assay_info['Protocol'] = app.protocol.name
+            except AttributeError:
+                pass
+            assay_info['Experiment log'] = log_dir
+            store = RunStore(log_dir)
+            try:
+                fills = store.fills()
+            except Exception:
+                logger.warning('Could not load pump fill telemetry.',
+                               exc_info=True)
+                fills = None
+            try:
+                # Runs are read from the binary PMT cache, so only new data
+                # files are decoded.
+                write_html_results(html_output_path, store,
+                                   assay_info=assay_info, fills=fills)
+            except Exception:
+                logger.error('Error writing HTML PMT report: `%s`',
+                             html_output_path, exc_info=True)
+
+        # Use template compiled into a report skeleton (compiled once, on
+        # first use) to write the report without loading the template into
+        # the `openpyxl` object model.
+        skeleton = None
+        if app_values.get('Use compiled report template'):
+            try:
+                skeleton = report_skeleton.get_skeleton(TEMPLATE_PATH)
+            except Exception:
+                logger.warning('Error compiling report template.  Falling '
+                               'back to `openpyxl` report writer.',
+                               exc_info=True)
+        formulas = app_values.get('Write PMT mean formulas')
+
         # Wrap writing of results to occur in main GTK thread in case
         # confirmation dialog needs to be displayed.
         @gtk_threadsafe
         def _threadsafe_write_results():
             while True:
                 try:
-                    _write_results(TEMPLATE_PATH, output_path, data_files)
+                    if skeleton is not None:
+                        report_skeleton.write_results(skeleton, output_path,
+                                                      data_files,
+                                                      formulas=formulas)
+                    else:
+                        _write_results(TEMPLATE_PATH, output_path,
+                                       data_files, formulas=formulas)
                     if launch:
                         try:
-                            output_path.launch()
+                            launch_path.launch()
                         except Exception:
                             pass
                     break
@@ -867,7 +2363,10 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
         gtk.gdk.threads_init()
 
         # Create pump control view widget.
-        pump_control_view = PumpControl(self.board, frequency_hz=frequency_hz,
+        #
+        # Widget requests are executed in the board I/O thread.
+        board = SerializedProxy(self.board, self.board_io)
+        pump_control_view = PumpControl(board, frequency_hz=frequency_hz,
                                         duration_s=duration_s)
 
         # Start pump automatically.
@@ -903,7 +2402,12 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
                 pass
 
             try:
-                self.board = mrbox.SerialProxy(baudrate=57600, settling_time_s=2.5)
+                # Open serial connection in board I/O thread.
+                self.board = self.board_io.call(mrbox.SerialProxy,
+                                                baudrate=57600,
+                                                settling_time_s=2.5)
+                # New connection; board state is unknown.
+                self.board_state = BoardState(self.board)
 
                 host_software_version = utility.Version.fromstring(
                     str(self.board.host_software_version))
@@ -947,17 +2451,75 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
         '''
         Display a dialog to manually edit the configuration settings.
         '''
-        config = self.board.config
+        config = self.board_io.call(getattr, self.board, 'config')
         form = dict_to_form(config)
         dialog = FormViewDialog(form, 'Edit configuration settings')
         valid, response = dialog.run()
         if valid:
-            self.board.update_config(**response)
+            self.board_io.call(self.board.update_config, **response)
+
+    def on_compare_experiments(self, widget=None, data=None):
+        '''
+        Display a dialog to select experiment log directories and write a
+        workbook comparing their PMT results.
+
+        The comparison is written to ``PMT_comparison.xlsx`` in the parent
+        directory of the first selected experiment log directory, in an
+        executor thread (see :meth:`_write_comparison`).
+
+        .. versionadded:: 0.26
+        '''
+        app = get_app()
+        dialog = gtk.FileChooserDialog('Select experiment log directories',
+                                       action=gtk
+                                       .FILE_CHOOSER_ACTION_SELECT_FOLDER,
+                                       buttons=(gtk.STOCK_CANCEL,
+                                                gtk.RESPONSE_CANCEL,
+                                                gtk.STOCK_OPEN,
+                                                gtk.RESPONSE_OK))
+        dialog.set_select_multiple(True)
+        try:
+            dialog.set_current_folder(app.experiment_log.get_log_path()
+                                      .parent)
+        except Exception:
+            pass
+        try:
+            if dialog.run() != gtk.RESPONSE_OK:
+                return
+            log_dirs = sorted(map(ph.path, dialog.get_filenames()))
+        finally:
+            dialog.destroy()
+
+        if not log_dirs:
+            return
+        output_path = log_dirs[0].parent.joinpath('PMT_comparison.xlsx')
+        # Do not block GTK thread while reading PMT runs.
+        self._in_executor(self._write_comparison, output_path, log_dirs)
+
+    def _write_comparison(self, output_path, log_dirs):
+        '''
+        Write and launch comparison of PMT results of experiment log
+        directories **(blocking)**.
+
+        See :func:`comparison_report.write_comparison`.
+
+        .. versionadded:: 0.26
+        '''
+        try:
+            write_comparison(output_path, log_dirs)
+            logger.info('Wrote PMT comparison of %d experiments to `%s`.',
+                        len(log_dirs), output_path)
+            output_path.launch()
+        except Exception:
+            logger.error('Error writing PMT comparison to `%s`.',
+                         output_path, exc_info=True)
 
     def on_flash_firmware(self, widget=None, data=None):
         app = get_app()
         try:
-            self.board.flash_firmware()
+            self.board_io.call(self.board.flash_firmware)
+            # Board was reset by firmware update.
+            self.board_io.call(self.board_state.invalidate)
             app.main_window_controller.info("Firmware updated successfully.",
                                             "Firmware update")
         except Exception, why:
@@ -967,14 +2529,17 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
         '''
         Close serial connection to MR-Box peripheral board.
         '''
+        self._magnet_state = None
         if self.board is not None:
             try:
-                self.board.zstage.home()
+                self.board_io.call(self.board.zstage.home)
                 logger.info('Z-stage homed.')
             except:
                 pass
             # Close board connection and release serial connection.
-            self.board.close()
+            self.board_io.call(self.board.close)
+        # Stop board I/O thread (restarted on next request).
+        self.board_io.stop()
 
     def get_schedule_requests(self, function_name):
         """
@@ -1014,6 +2579,13 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
             self.edit_config_menu_item.connect("activate",
                                                self.on_edit_configuration)
             self.edit_config_menu_item.show()
+
+            self.compare_menu_item = \
+                gtk.MenuItem("Compare experiment PMT results...")
+            self.tools_menu.append(self.compare_menu_item)
+            self.compare_menu_item.connect("activate",
+                                           self.on_compare_experiments)
+            self.compare_menu_item.show()
             self.initialized = True
 
         # if we're connected to the board, display the menu
@@ -1074,15 +2646,34 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
         # mr-box-peripheral-board seems to have trouble connecting **after**
         # the DropBot has connected.
         self.initialize_connection_with_dropbot()
+        if self.reservoir_actuator is not None:
+            self.reservoir_actuator.invalidate()
+        # Magnet may have been moved since the last step (e.g., manually, or
+        # the protocol starts at the selected step).
+        self._magnet_state = None
+
+        try:
+            self.protocol_plan = self.compile_protocol_plan()
+        except Exception:
+            logger.warning('Could not compile MR-Box protocol plan; apply all '
+                           'step actions.', exc_info=True)
+            self.protocol_plan = None
 
     def on_protocol_pause(self):
         '''
         Handler called when a protocol is paused.
         '''
-        # Close the PMT shutter.
-        self.board.pmt_close_shutter()
+        self._cancel_pmt_lookahead()
+        # Magnet may be moved while protocol is paused.
+        self._magnet_state = None
+        if not self.cancel_step():
+            # Close the PMT shutter.
+            (self.board_io.submit(self.board.pmt_close_shutter)
+             .add_done_callback(log_exception))
 
     def on_protocol_finished(self):
+        self.protocol_plan = None
+        self._cancel_pmt_lookahead()
         # Protocol has finished.  Update
         app_values = self.get_app_values()
         self.update_excel_results(launch=app_values.get('Show Report'))
@@ -1098,8 +2689,10 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
         if self.board:
             self.reset_board_state()
 
-        # Reset auto pump maximum value
-        self.max_capacitance = 0
+        # Reset auto pump reservoir calibration
+        self.reservoir_calibration = None
+        if self.reservoir_actuator is not None:
+            self.reservoir_actuator.invalidate()
 
     def on_app_options_changed(self, plugin_name):
         """
@@ -1112,6 +2705,9 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
         plugin : str
             Plugin name for which the app options changed
         """
+        if plugin_name == self.name:
+            # Plan was compiled using previous app values.
+            self.protocol_plan = None
         if plugin_name == self.name and self.board:
             self.update_leds()
 
@@ -1122,9 +2718,14 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
 
         for k, v in app_values.items():
             if k == 'LED 1 brightness':
-                self.board.led1.brightness = v
+                led = 1
             elif k == 'LED 2 brightness':
-                self.board.led2.brightness = v
+                led = 2
+            else:
+                continue
+            # Brightness is only sent to the board if it has changed.
+            (self.board_io.submit(self.board_state.led_brightness, led, v)
+             .add_done_callback(log_exception))
 
     def on_app_exit(self):
         self.close_board_connection()
@@ -1141,26 +2742,69 @@ class MrBoxPeripheralBoardPlugin(AppDataController, StepOptionsController,
         '''
         # Get latest step field values for this plugin.
         options = plugin_kwargs[self.name]
-        # Apply step options
-        self.apply_step_options(options)
+        # Apply step options (in a task which may be cancelled by
+        # `cancel_step()`, e.g., when protocol is paused).
+        self._step_cancelled = False
+        self._step_loop = asyncio.get_event_loop()
+        self._step_task = asyncio.ensure_future(self
+                                                .apply_step_options(options))
+        try:
+            yield asyncio.From(self._step_task)
+        except asyncio.CancelledError:
+            if not self._step_cancelled:
+                # Step handler was cancelled by caller.
+                raise
+        finally:
+            self._step_task = None
+
+    def on_step_options_changed(self, plugin, step_number):
+        '''
+        Handler called when the step options are changed for a particular
+        plugin.
 
-    # def on_step_swapped(self, original_step_number, new_step_number):
-    #     '''
-    #     Handler called when a new step is activated/selected.
-    #
-    #     Parameters
-    #     ----------
-    #     original_step_number : int
-    #         Step number of previously activated step.
-    #     new_step_number : int
-    #         Step number of newly activated step.
-    #     '''
-    #     # Step options have changed.
-    #     app = get_app()
-    #     if app.realtime_mode and not app.running:
-    #         # Apply step options.
-    #         options = self.get_step_options()
-    #         self.apply_step_options(options)
+        A PMT measurement prepared ahead of time (see
+        :meth:`_start_pmt_lookahead`) may no longer match the changed steps,
+        so it is discarded.
+
+        .. versionadded:: 0.26
+
+        Parameters
+        ----------
+        plugin : str
+            Name of plugin for which the step options changed.
+        step_number : int
+            Step number for which the step options changed.
+        '''
+        if plugin == self.name:
+            self._cancel_pmt_lookahead()
+
+    def on_step_swapped(self, original_step_number, new_step_number):
+        '''
+        Handler called when a new step is activated/selected.
+
+        A PMT measurement prepared ahead of time (see
+        :meth:`_start_pmt_lookahead`) is discarded unless the prepared step
+        is selected.
+
+        .. versionadded:: 0.26
+
+        Parameters
+        ----------
+        original_step_number : int
+            Step number of previously activated step.
+        new_step_number : int
+            Step number of newly activated step.
+        '''
+        lookahead = self._pmt_lookahead
+        if (lookahead is not None and
+                new_step_number != lookahead['step_number']):
+            self._cancel_pmt_lookahead()
+        # # Step options have changed.
+        # app = get_app()
+        # if app.realtime_mode and not app.running:
+        #     # Apply step options.
+        #     options = self.get_step_options()
+        #     self.apply_step_options(options)
 
 
 PluginGlobals.pop_env()
@@ -0,0 +1,146 @@
+'''
+Headless PMT acquisition engine.
+
+Reads from the MAX11210 ADC using a data function constructed by
+:func:`mr_box_peripheral_board.ui.gtk.measure_dialog.adc_data_func_factory`
+on a worker thread, without creating a GTK dialog or redrawing plots.
+Acquired samples are streamed to disk (see :class:`run_store.RecordWriter`)
+and, optionally, published to a shared :class:`ring_buffer.RingBuffer` for a
+lightweight live view (see :class:`live_view.LiveView`).
+
+.. versionadded:: 0.26
+'''
+import logging
+import threading
+
+import concurrent.futures
+import numpy as np
+import pandas as pd
+from trollius.time_monotonic import time_monotonic
+
+logger = logging.getLogger(__name__)
+
+
+class AcquisitionEngine(object):
+    '''
+    Acquire PMT data on a worker thread.
+
+    The data function is called at absolute deadlines ``t0 + k * delta_t``
+    (monotonic clock), so time spent reading from the ADC and writing to disk
+    does not accumulate as drift.  If a call overruns its deadline, the
+    schedule is restarted from the current time and the overrun is counted in
+    :attr:`late_count`.  Once the duration has elapsed (or acquisition is
+    stopped), the data function is called once more to read the samples
+    acquired since the previous call.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    data_func : callable
+        Function returning a :class:`pandas.Series` of samples acquired since
+        the previous call (see ``adc_data_func_factory`` in
+        :mod:`mr_box_peripheral_board.ui.gtk.measure_dialog`).
+    duration_s : float
+        Measurement duration.
+    delta_t_s : float, optional
+        Interval between data function calls.
+    writer : run_store.RecordWriter, optional
+        Writer to stream each acquired chunk of samples to.
+    ring_buffer : ring_buffer.RingBuffer, optional
+        Buffer to publish each acquired chunk of samples to, as time relative
+        to the start of the measurement (``time_s``) and ``value``.
+
+    Attributes
+    ----------
+    future : concurrent.futures.Future
+        Result of acquisition, i.e., :class:`pandas.Series` of all acquired
+        samples (or ``None`` if no samples were acquired).
+    '''
+    def __init__(self, data_func, duration_s, delta_t_s=1., writer=None,
+                 ring_buffer=None):
+        self.data_func = data_func
+        self.duration_s = duration_s
+        self.delta_t_s = delta_t_s
+        self.writer = writer
+        self.ring_buffer = ring_buffer
+        self.future = concurrent.futures.Future()
+        self.late_count = 0
+        self.sample_count = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+        # Time stamp of first acquired sample (ns).
+        self._t0 = None
+
+    def start(self):
+        '''
+        Start acquisition on worker thread.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Result of acquisition (see :attr:`future`).
+        '''
+        self.future.set_running_or_notify_cancel()
+        self._thread = threading.Thread(target=self._run,
+                                        name='pmt-acquisition')
+        self._thread.daemon = True
+        self._thread.start()
+        return self.future
+
+    def stop(self):
+        '''
+        Stop acquisition after the current data function call (and a final
+        read of the remaining samples).
+
+        Samples acquired so far are returned as the result.
+        '''
+        self._stop_event.set()
+
+    def _publish(self, s_chunk, t0):
+        time_s = (s_chunk.index.values.astype('datetime64[ns]')
+                  .astype('<i8') - t0) * 1e-9
+        values = np.asarray(s_chunk.values, dtype=float)
+        self.ring_buffer.extend(time_s=time_s, value=values)
+
+    def _read(self, chunks):
+        '''
+        Call data function and store, stream and publish acquired samples.
+        '''
+        s_chunk = self.data_func()
+        if s_chunk is None or not len(s_chunk):
+            return
+        chunks.append(s_chunk)
+        self.sample_count += len(s_chunk)
+        if self.writer is not None:
+            self.writer.append(s_chunk)
+        if self._t0 is None:
+            self._t0 = (s_chunk.index.values[:1].astype('datetime64[ns]')
+                        .astype('<i8')[0])
+        if self.ring_buffer is not None:
+            self._publish(s_chunk, self._t0)
+
+    def _run(self):
+        chunks = []
+        try:
+            start = time_monotonic()
+            deadline = start
+            while not self._stop_event.is_set():
+                if time_monotonic() - start >= self.duration_s:
+                    break
+                self._read(chunks)
+                deadline += self.delta_t_s
+                delay_s = deadline - time_monotonic()
+                if delay_s > 0:
+                    self._stop_event.wait(delay_s)
+                else:
+                    # Fell behind schedule; restart schedule from now.
+                    self.late_count += 1
+                    deadline = time_monotonic()
+            # Read samples acquired since the last call.
+            self._read(chunks)
+        except BaseException as exception:
+            logger.error('PMT acquisition failed.', exc_info=True)
+            self.future.set_exception(exception)
+        else:
+            self.future.set_result(pd.concat(chunks) if chunks else None)
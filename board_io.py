@@ -0,0 +1,202 @@
+'''
+Serialized access to the MR-Box peripheral board serial connection.
+
+All requests to the board are executed, in submission order, by a single
+I/O thread which owns the serial port.  Callers receive a future for each
+request, so the GTK UI thread and protocol step coroutines may queue several
+independent commands and wait for the results without blocking each other or
+interleaving traffic on the serial port.
+
+.. versionadded:: 0.26
+'''
+import Queue
+import functools
+import logging
+import threading
+
+import concurrent.futures
+import trollius as asyncio
+
+logger = logging.getLogger(__name__)
+
+
+class BoardIO(object):
+    '''
+    Single-thread executor for board requests.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of I/O thread.
+    '''
+    def __init__(self, name='mrbox-board-io'):
+        self.name = name
+        self._queue = Queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def in_io_thread(self):
+        '''
+        Returns
+        -------
+        bool
+            ``True`` if called from the I/O thread.
+        '''
+        return threading.current_thread() is self._thread
+
+    def start(self):
+        '''
+        Start I/O thread (if not already running).
+        '''
+        with self._lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self, wait=True):
+        '''
+        Stop I/O thread after all queued requests have been executed.
+
+        Parameters
+        ----------
+        wait : bool, optional
+            If ``True``, wait for I/O thread to exit.
+        '''
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(None)
+            self._thread = None
+        if wait and thread is not threading.current_thread():
+            thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            future, func = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = func()
+            except BaseException as exception:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+
+    def submit(self, func, *args, **kwargs):
+        '''
+        Queue request for execution by the I/O thread.
+
+        Requests are executed in submission order.  If called from the I/O
+        thread (e.g., from within another request), the request is executed
+        immediately to avoid a deadlock.
+
+        Parameters
+        ----------
+        func : callable
+            Function to call, e.g., bound method of
+            :class:`mr_box_peripheral_board.SerialProxy`.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Result of function call.
+        '''
+        future = concurrent.futures.Future()
+        func = functools.partial(func, *args, **kwargs)
+        if self.in_io_thread():
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(func())
+            except BaseException as exception:
+                future.set_exception(exception)
+            return future
+        self.start()
+        self._queue.put((future, func))
+        return future
+
+    def call(self, func, *args, **kwargs):
+        '''
+        Execute request in I/O thread and wait for the result.
+
+        Returns
+        -------
+        object
+            Result of function call.
+
+        Raises
+        ------
+        Exception
+            If function call raised an exception.
+        '''
+        return self.submit(func, *args, **kwargs).result()
+
+    def call_async(self, func, *args, **kwargs):
+        '''
+        Execute request in I/O thread without blocking the event loop.
+
+        Returns
+        -------
+        asyncio.Future
+            Result of function call.
+        '''
+        return asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+
+def log_exception(future):
+    '''
+    Log exception (if any) raised by a request submitted without waiting for
+    the result.
+
+    Example
+    -------
+
+    >>> board_io.submit(board.pmt_close_shutter).add_done_callback(
+    ...     log_exception)
+    '''
+    if not future.cancelled() and future.exception() is not None:
+        logger.error('Error executing board request: %s', future.exception())
+
+
+class SerializedProxy(object):
+    '''
+    Wrapper which executes method calls of an object (e.g., the board serial
+    proxy) in the I/O thread.
+
+    Use to pass the board to code which makes requests from other threads,
+    e.g., the PMT measurement dialog or the pump control widget.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    obj : object
+        Object to wrap.
+    board_io : BoardIO
+        I/O executor.
+    '''
+    def __init__(self, obj, board_io):
+        self.__dict__['_obj'] = obj
+        self.__dict__['_board_io'] = board_io
+
+    def __getattr__(self, name):
+        value = self._board_io.call(getattr, self._obj, name)
+        if callable(value):
+            def _call(*args, **kwargs):
+                return self._board_io.call(value, *args, **kwargs)
+            return _call
+        return value
+
+    def __setattr__(self, name, value):
+        self._board_io.call(setattr, self._obj, name, value)
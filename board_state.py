@@ -0,0 +1,178 @@
+'''
+Write-through cache of settable MR-Box peripheral board parameters.
+
+Each protocol step applies the full set of board settings, most of which are
+unchanged from the previous step.  :class:`BoardState` remembers the last
+value acknowledged by the board for each settable parameter and skips
+requests which would not change the board state.
+
+.. versionadded:: 0.26
+'''
+import logging
+
+from mr_box_peripheral_board.max11210_adc_ui import MAX11210_begin
+
+logger = logging.getLogger(__name__)
+
+#: MAX11210 command byte ``MODE`` bit (set: register access command).
+MAX11210_MODE = 0x40
+#: MAX11210 command byte ``CAL1:CAL0`` bits (conversion commands).
+MAX11210_CAL = 0x30
+#: Calibration registers overwritten by each MAX11210 calibration command,
+#: as cached setting keys, indexed by ``CAL1:CAL0`` bits.
+MAX11210_CALIBRATION_KEYS = {0x10: ('MAX11210_setSelfCalOffset',
+                                    'MAX11210_setSelfCalGain'),
+                             0x20: ('MAX11210_setSysOffsetCal', ),
+                             0x30: ('MAX11210_setSysGainCal', )}
+
+
+class BoardState(object):
+    '''
+    Write-through cache of settable board parameters.
+
+    A value is only cached after the corresponding board request succeeds.
+    If a request fails, the cached value is discarded, so the next request is
+    always sent.
+
+    Raw ADC commands must be made through this object, so cached ADC values
+    changed by a command (e.g., registers overwritten by a calibration) are
+    discarded.
+
+    .. note::
+        Not thread-safe.  Only use from the board I/O thread (see
+        :class:`board_io.BoardIO`).
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    board : mr_box_peripheral_board.SerialProxy
+        Board serial connection.
+    '''
+    def __init__(self, board):
+        self.board = board
+        self._values = {}
+        self.sent_count = 0
+        self.skipped_count = 0
+
+    def invalidate(self, prefix=None):
+        '''
+        Discard cached values, e.g., after reconnecting or resetting the
+        board.
+
+        Parameters
+        ----------
+        prefix : str, optional
+            Only discard values with keys starting with prefix, e.g.,
+            ``'MAX11210_'``.  By default, all values are discarded.
+        '''
+        if prefix is None:
+            self._values.clear()
+        else:
+            for key_i in [k for k in self._values if k.startswith(prefix)]:
+                del self._values[key_i]
+
+    def _write(self, key, value, func, *args):
+        '''
+        Call ``func(*args)`` unless ``value`` is already cached for ``key``.
+
+        Returns
+        -------
+        bool
+            ``True`` if request was sent to the board.
+        '''
+        if key in self._values and self._values[key] == value:
+            self.skipped_count += 1
+            logger.debug('Skip `%s(%s)` (unchanged).', key, value)
+            return False
+        self._values.pop(key, None)
+        func(*args)
+        self._values[key] = value
+        self.sent_count += 1
+        return True
+
+    def pump_frequency_set(self, frequency_hz):
+        return self._write('pump_frequency_set', frequency_hz,
+                           self.board.pump_frequency_set, frequency_hz)
+
+    def pmt_set_pot(self, value):
+        return self._write('pmt_set_pot', value, self.board.pmt_set_pot,
+                           value)
+
+    def led_brightness(self, led, brightness):
+        '''
+        Parameters
+        ----------
+        led : int
+            LED number, i.e., 1 or 2.
+        brightness : float
+            LED brightness.
+        '''
+        led_obj = getattr(self.board, 'led%d' % led)
+        return self._write('led%d.brightness' % led, brightness, setattr,
+                           led_obj, 'brightness', brightness)
+
+    def MAX11210_begin(self):
+        '''
+        Start the ADC and perform ADC self-calibration (only once until
+        invalidated).
+
+        Self-calibration overwrites the ADC calibration registers, so cached
+        ADC register values are discarded whenever the request is sent.
+        '''
+        if self._values.get('MAX11210_begin'):
+            self.skipped_count += 1
+            logger.debug('Skip `MAX11210_begin` (ADC already started).')
+            return False
+        self.invalidate('MAX11210_')
+        MAX11210_begin(self.board)
+        self._values['MAX11210_begin'] = True
+        self.sent_count += 1
+        return True
+
+    def MAX11210_setSelfCalGain(self, value):
+        return self._write('MAX11210_setSelfCalGain', value,
+                           self.board.MAX11210_setSelfCalGain, value)
+
+    def MAX11210_setSelfCalOffset(self, value):
+        return self._write('MAX11210_setSelfCalOffset', value,
+                           self.board.MAX11210_setSelfCalOffset, value)
+
+    def MAX11210_setSysOffsetCal(self, value):
+        return self._write('MAX11210_setSysOffsetCal', value,
+                           self.board.MAX11210_setSysOffsetCal, value)
+
+    def MAX11210_setSysGainCal(self, value):
+        return self._write('MAX11210_setSysGainCal', value,
+                           self.board.MAX11210_setSysGainCal, value)
+
+    def MAX11210_send_command(self, command):
+        '''
+        Send raw ADC command byte (always sent).
+
+        Conversion commands (e.g., ``0b10001000``) leave the ADC
+        configuration and calibration registers unchanged.  Calibration
+        commands discard the cached values of the calibration registers they
+        overwrite, and register access commands discard all cached ADC
+        values.
+
+        Parameters
+        ----------
+        command : int
+            MAX11210 command byte.
+        '''
+        if command & MAX11210_MODE:
+            self.invalidate('MAX11210_')
+        else:
+            for key_i in MAX11210_CALIBRATION_KEYS.get(command &
+                                                       MAX11210_CAL, []):
+                self._values.pop(key_i, None)
+        self.board.MAX11210_send_command(command)
+        self.sent_count += 1
+
+    def MAX11210_setRate(self, rate):
+        '''
+        Start conversions at rate (always sent; no cached values change).
+        '''
+        self.board.MAX11210_setRate(rate)
+        self.sent_count += 1
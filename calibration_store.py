@@ -0,0 +1,111 @@
+'''
+Persistent store of pump reservoir calibrations.
+
+The capacitance of the empty and filled pump reservoir is determined by the
+auto pump ``prepare`` routine, which takes about 15 seconds.  Calibrations
+are stored in a JSON file, keyed by DropBot, chip/device and auto pump
+settings, so a later experiment using the same hardware and settings only
+needs to verify the empty reservoir capacitance.
+
+.. versionadded:: 0.26
+'''
+import json
+import logging
+import time
+
+import path_helpers as ph
+
+logger = logging.getLogger(__name__)
+
+STORE_FILENAME = 'reservoir_calibration.json'
+
+
+def calibration_key(dropbot_id, device_id, settings):
+    '''
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    dropbot_id : str
+        DropBot identifier (e.g., UUID).
+    device_id : str
+        Chip/device identifier (e.g., DMF device name).
+    settings : dict
+        Auto pump settings which affect the calibration (e.g., pump
+        frequency, reservoir channel and voltage).
+
+    Returns
+    -------
+    str
+        Key of calibration in store.
+    '''
+    return json.dumps([dropbot_id, device_id, sorted(settings.items())],
+                      sort_keys=True)
+
+
+class CalibrationStore(object):
+    '''
+    JSON file of reservoir calibrations.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    path : str
+        Store file path.
+    '''
+    def __init__(self, path):
+        self.path = ph.path(path)
+
+    def _load(self):
+        try:
+            with self.path.open('r') as input_:
+                return json.load(input_)
+        except (IOError, ValueError):
+            return {}
+
+    def load(self, key, max_age_s=None):
+        '''
+        Parameters
+        ----------
+        key : str
+            Calibration key (see :func:`calibration_key`).
+        max_age_s : float, optional
+            Maximum age of calibration.
+
+        Returns
+        -------
+        dict or None
+            Calibration, with keys ``empty_capacitance``,
+            ``full_capacitance``, ``timestamp`` (seconds since epoch) and
+            ``age_s``, or ``None`` if no calibration is stored for key or the
+            stored calibration is too old.
+        '''
+        entry = self._load().get(key)
+        if entry is None:
+            return None
+        entry['age_s'] = time.time() - entry['timestamp']
+        if max_age_s is not None and entry['age_s'] > max_age_s:
+            logger.info('Stored reservoir calibration expired (%.1f h old).',
+                        entry['age_s'] / 3600.)
+            return None
+        return entry
+
+    def save(self, key, empty_capacitance, full_capacitance):
+        '''
+        Store calibration, replacing any previous calibration for key.
+
+        Parameters
+        ----------
+        key : str
+            Calibration key (see :func:`calibration_key`).
+        empty_capacitance, full_capacitance : float
+            Capacitance of empty and filled reservoir.
+        '''
+        entries = self._load()
+        entries[key] = {'empty_capacitance': float(empty_capacitance),
+                        'full_capacitance': float(full_capacitance),
+                        'timestamp': time.time()}
+        self.path.parent.makedirs_p()
+        with self.path.open('w') as output:
+            json.dump(entries, output, indent=1)
@@ -0,0 +1,243 @@
+'''
+Sampling of DropBot capacitance measurements.
+
+.. versionadded:: 0.26
+'''
+from collections import namedtuple
+import logging
+import threading
+import time
+
+import numpy as np
+from trollius.time_monotonic import time_monotonic
+
+from .ring_buffer import RingBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class CapacitanceSample(namedtuple('CapacitanceSample', 'values mean std')):
+    '''
+    Capacitance readings with their mean and (sample) standard deviation.
+
+    .. versionadded:: 0.26
+    '''
+    __slots__ = ()
+
+    @property
+    def n_samples(self):
+        '''
+        Number of readings taken.
+
+        .. versionadded:: 0.26
+        '''
+        return len(self.values)
+
+
+class CapacitanceSampler(object):
+    '''
+    Take batches of DropBot capacitance readings **(blocking)**, either of a
+    fixed size (:meth:`sample`) or until the mean is known to a specified
+    precision (:meth:`estimate`).
+
+    The DropBot API only provides a single reading per request (i.e.,
+    ``measure_capacitance()``), so a batch of ``n`` readings takes ``n``
+    serial requests.  Readings are written to a preallocated array and
+    summarized with :mod:`numpy` rather than accumulated in a list.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    measure : callable
+        Function returning a single capacitance reading, e.g.,
+        ``dropbot_remote.measure_capacitance``.
+    interval_s : float, optional
+        Delay between consecutive readings.
+
+    Attributes
+    ----------
+    request_count : int
+        Total number of readings requested.
+    '''
+    def __init__(self, measure, interval_s=0.):
+        self.measure = measure
+        self.interval_s = interval_s
+        self.request_count = 0
+
+    def sample(self, n_samples):
+        '''
+        Take a batch of readings.
+
+        Parameters
+        ----------
+        n_samples : int
+            Number of readings.
+
+        Returns
+        -------
+        CapacitanceSample
+            Readings (as a :class:`numpy.ndarray`), mean and sample standard
+            deviation (``0`` if only one reading is taken).
+        '''
+        n_samples = max(1, int(n_samples))
+        values = np.empty(n_samples)
+        for i in xrange(n_samples):
+            if i and self.interval_s > 0:
+                time.sleep(self.interval_s)
+            values[i] = self.measure()
+            self.request_count += 1
+        std = values.std(ddof=1) if n_samples > 1 else 0.
+        return CapacitanceSample(values, values.mean(), std)
+
+    def estimate(self, min_samples, max_samples, rel_error):
+        '''
+        Take readings until the standard error of the mean falls below a
+        fraction of the mean.
+
+        The mean and variance are updated after each reading (Welford's
+        method), so readings stop as soon as they are stable enough.
+
+        .. versionadded:: 0.26
+
+        Parameters
+        ----------
+        min_samples : int
+            Minimum number of readings.
+        max_samples : int
+            Maximum number of readings.
+        rel_error : float
+            Target standard error of mean, relative to absolute value of mean.
+
+        Returns
+        -------
+        CapacitanceSample
+            Readings taken (see :attr:`CapacitanceSample.n_samples`), mean and
+            sample standard deviation.
+        '''
+        max_samples = max(1, int(max_samples))
+        min_samples = min(max(1, int(min_samples)), max_samples)
+        values = np.empty(max_samples)
+        mean = 0.
+        m2 = 0.
+        n = 0
+        while n < max_samples:
+            if n and self.interval_s > 0:
+                time.sleep(self.interval_s)
+            value = self.measure()
+            self.request_count += 1
+            values[n] = value
+            n += 1
+            delta = value - mean
+            mean += delta / n
+            m2 += delta * (value - mean)
+            if n >= max(2, min_samples):
+                std_error = np.sqrt(m2 / (n - 1) / n)
+                if std_error <= rel_error * abs(mean):
+                    break
+        std = np.sqrt(m2 / (n - 1)) if n > 1 else 0.
+        return CapacitanceSample(values[:n], mean, std)
+
+
+class CapacitanceMonitor(object):
+    '''
+    Take DropBot capacitance readings continuously on a worker thread, e.g.,
+    while the pump is running.
+
+    Readings are published to a :class:`ring_buffer.RingBuffer`, so the
+    filtered capacitance (median of the most recent readings) may be read
+    at any time without waiting for the worker thread.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    measure : callable
+        Function returning a single capacitance reading, e.g.,
+        ``dropbot_remote.measure_capacitance``.
+    window : int, optional
+        Number of most recent readings filtered.
+    interval_s : float, optional
+        Delay between consecutive readings.
+    capacity : int, optional
+        Number of readings kept.
+
+    Attributes
+    ----------
+    ring_buffer : ring_buffer.RingBuffer
+        Readings, as time since :meth:`start` (``time_s``) and ``value``.
+    error : Exception or None
+        Exception raised by a reading (readings stop after an error).
+    start_time : float
+        Monotonic clock time readings started.
+    '''
+    def __init__(self, measure, window=5, interval_s=0., capacity=1024):
+        self.measure = measure
+        self.window = max(1, int(window))
+        self.interval_s = interval_s
+        self.ring_buffer = RingBuffer(capacity)
+        self.error = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.start_time = None
+
+    @property
+    def count(self):
+        '''
+        Total number of readings taken.
+        '''
+        return self.ring_buffer.count
+
+    def start(self):
+        self.start_time = time_monotonic()
+        self._thread = threading.Thread(target=self._run,
+                                        name='capacitance-monitor')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        '''
+        Stop readings after the current reading (without waiting).
+        '''
+        self._stop_event.set()
+
+    def filtered(self):
+        '''
+        Returns
+        -------
+        float or None
+            Median of (up to) :attr:`window` most recent readings, or
+            ``None`` if no readings were taken yet.
+        '''
+        count, view = self.ring_buffer.snapshot(self.window)
+        if not count:
+            return None
+        return float(np.median(view['value']))
+
+    def summary(self):
+        '''
+        Returns
+        -------
+        dict
+            Number of readings, mean reading rate and latest filtered
+            reading, e.g., for the step log.
+        '''
+        count, view = self.ring_buffer.snapshot(1)
+        duration_s = float(view['time_s'][-1]) if count else 0.
+        return {'count': count,
+                'rate_hz': count / duration_s if duration_s > 0 else None,
+                'filtered': self.filtered()}
+
+    def _run(self):
+        time_s = np.empty(1)
+        value = np.empty(1)
+        try:
+            while not self._stop_event.is_set():
+                value[0] = self.measure()
+                time_s[0] = time_monotonic() - self.start_time
+                self.ring_buffer.extend(time_s=time_s, value=value)
+                if self.interval_s > 0:
+                    self._stop_event.wait(self.interval_s)
+        except Exception as exception:
+            logger.error('Capacitance monitor failed.', exc_info=True)
+            self.error = exception
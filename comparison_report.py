@@ -0,0 +1,197 @@
+'''
+Comparison of PMT results across multiple experiments.
+
+.. versionadded:: 0.26
+'''
+from collections import OrderedDict
+import logging
+import re
+
+import numpy as np
+import openpyxl as ox
+import path_helpers as ph
+
+from .html_report import decimate
+from .run_store import RunStore
+
+logger = logging.getLogger(__name__)
+
+STAT_COLUMNS = ['mean', 'std', 'min', 'max', 'count', 'duration_s']
+
+
+def _overlay_chart(title):
+    chart = ox.chart.ScatterChart()
+    chart.title = title
+    chart.x_axis.title = 'Time (s)'
+    chart.y_axis.title = 'Current (A)'
+    chart.height = 10  # default is 7.5
+    chart.width = 20  # default is 15
+    return chart
+
+
+def _unique_title(title, existing):
+    '''
+    Returns
+    -------
+    unicode
+        Valid worksheet title derived from ``title`` (at most 31
+        characters), with a ``_<n>`` suffix if the title is already in
+        ``existing`` (case-insensitive), e.g., ``Experiment foo_2``.
+    '''
+    title = re.sub(r'[\[\]:*?/\\]', '_', unicode(title))[:31]
+    candidate = title
+    i = 2
+    while candidate.lower() in existing:
+        suffix = u'_%d' % i
+        candidate = title[:31 - len(suffix)] + suffix
+        i += 1
+    existing.add(candidate.lower())
+    return candidate
+
+
+def write_comparison(output_path, log_dirs, max_points=1000):
+    '''
+    Write comparison of PMT results from multiple experiments to an Excel
+    spreadsheet.
+
+    The workbook contains:
+
+     - ``Summary``: statistics of each run of each experiment;
+     - ``Means``: mean of each run (rows: run names, columns: experiment log
+       directories);
+     - ``Overlays``: chart per run name, overlaying that run from each
+       experiment; and
+     - one worksheet per experiment containing decimated traces of each run,
+       with a chart overlaying all runs of the experiment.
+
+    Runs are read from the :class:`run_store.RunStore` cache of each
+    experiment and the workbook is written in ``openpyxl`` write-only mode,
+    so only one experiment's decimated traces are held in memory at a time.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    output_path : str
+        Path to write output Excel spreadsheet to.
+    log_dirs : list
+        Experiment log directories.
+    max_points : int, optional
+        Maximum number of points per decimated run trace.
+
+    Returns
+    -------
+    path_helpers.path
+        Wrapped output path.
+    '''
+    output_path = ph.path(output_path)
+    workbook = ox.Workbook(write_only=True)
+
+    summary_sheet = workbook.create_sheet('Summary')
+    means_sheet = workbook.create_sheet('Means')
+    overlays_sheet = workbook.create_sheet('Overlays')
+
+    sheet_titles = set(['summary', 'means', 'overlays'])
+
+    summary_rows = []
+    # Mean of each run, keyed by run name, then experiment log directory
+    # (experiment names are not unique, e.g., same name in different parent
+    # directories).
+    means = OrderedDict()
+    # References to each decimated trace, keyed by run name.
+    traces_by_run = OrderedDict()
+    experiment_dirs = []
+
+    for log_dir_i in map(ph.path, log_dirs):
+        store_i = RunStore(log_dir_i)
+        runs_i = store_i.runs()
+        if not runs_i:
+            logger.info('No PMT runs found in `%s`.', log_dir_i)
+            continue
+        experiment_i = log_dir_i.name
+        experiment_dirs.append(log_dir_i)
+        title_i = _unique_title('Experiment %s' % experiment_i,
+                                sheet_titles)
+        sheet_i = workbook.create_sheet(title_i)
+
+        # Decimate each run of the experiment (one run in memory at a time).
+        columns_i = []
+        name_counts_i = {}
+        for run_ij in runs_i:
+            # Distinguish repeated run names within an experiment, e.g.,
+            # `sample`, `sample (2)`.
+            count_ij = name_counts_i.get(run_ij['name'], 0) + 1
+            name_counts_i[run_ij['name']] = count_ij
+            name_ij = (run_ij['name'] if count_ij == 1 else '%s (%d)' %
+                       (run_ij['name'], count_ij))
+            records_ij = store_i.records(run_ij)
+            if len(records_ij):
+                time_s_ij = 1e-9 * (records_ij['time_ns'] -
+                                    records_ij['time_ns'][0])
+                columns_i.append((name_ij,) +
+                                 decimate(time_s_ij,
+                                          np.asarray(records_ij['value']),
+                                          max_points=max_points))
+            else:
+                columns_i.append((name_ij, np.array([]),
+                                  np.array([])))
+            stats_ij = run_ij['stats']
+            summary_rows.append([experiment_i, name_ij] +
+                                [stats_ij[k] for k in STAT_COLUMNS])
+            means.setdefault(name_ij, OrderedDict())[log_dir_i] = \
+                stats_ij['mean']
+
+        # Write decimated traces as pairs of columns: time, value.
+        header = []
+        for name_j, _, _ in columns_i:
+            header.extend(['%s time (s)' % name_j, name_j])
+        sheet_i.append(header)
+        n_rows = max(len(x) for _, x, _ in columns_i)
+        for k in xrange(n_rows):
+            row_k = []
+            for _, x_j, y_j in columns_i:
+                row_k.extend([float(x_j[k]), float(y_j[k])] if k < len(x_j)
+                             else [None, None])
+            sheet_i.append(row_k)
+
+        chart_i = _overlay_chart('PMT current: %s' % experiment_i)
+        for j, (name_j, x_j, _) in enumerate(columns_i):
+            if not len(x_j):
+                continue
+            xvalues_j = ox.chart.Reference(sheet_i, min_col=2 * j + 1,
+                                           min_row=2, max_row=len(x_j) + 1)
+            yvalues_j = ox.chart.Reference(sheet_i, min_col=2 * j + 2,
+                                           min_row=1, max_row=len(x_j) + 1)
+            series_j = ox.chart.Series(yvalues_j, xvalues_j,
+                                       title_from_data=True)
+            chart_i.series.append(series_j)
+            traces_by_run.setdefault(name_j, []).append((experiment_i,
+                                                         xvalues_j,
+                                                         yvalues_j))
+        # Place chart to the right of the data columns.
+        chart_column_i = ox.utils.get_column_letter(2 * len(columns_i) + 2)
+        sheet_i.add_chart(chart_i, '%s1' % chart_column_i)
+        # Release decimated traces before processing the next experiment.
+        del columns_i
+
+    summary_sheet.append(['Experiment', 'Run'] + STAT_COLUMNS)
+    for row_i in summary_rows:
+        summary_sheet.append(row_i)
+
+    means_sheet.append(['Run'] + map(unicode, experiment_dirs))
+    for name_i, means_i in means.iteritems():
+        means_sheet.append([name_i] + [means_i.get(log_dir_j)
+                                       for log_dir_j in experiment_dirs])
+
+    # One overlay chart per run name, stacked vertically.
+    overlays_sheet.append(['Overlay of each run name across experiments.'])
+    for i, (name_i, traces_i) in enumerate(traces_by_run.iteritems()):
+        chart_i = _overlay_chart('PMT current: %s' % name_i)
+        for experiment_j, xvalues_j, yvalues_j in traces_i:
+            series_j = ox.chart.Series(yvalues_j, xvalues_j,
+                                       title=experiment_j)
+            chart_i.series.append(series_j)
+        overlays_sheet.add_chart(chart_i, 'A%d' % (2 + 21 * i))
+
+    workbook.save(output_path)
+    return output_path
@@ -0,0 +1,115 @@
+'''
+Conversion of pump reservoir capacitance to fill level.
+
+The capacitance of the actuated reservoir electrode increases linearly with
+the liquid covering it, so the fill fraction is interpolated between the
+capacitance of the empty and filled reservoir measured by the auto pump
+``prepare`` routine (or a stored calibration, see :mod:`calibration_store`).
+
+All conversions accept scalars or arrays.
+
+.. versionadded:: 0.26
+'''
+import numpy as np
+
+
+def _result(values):
+    # Return scalar for scalar input.
+    return float(values) if np.ndim(values) == 0 else values
+
+
+class ReservoirCalibration(object):
+    '''
+    Capacitance of empty and filled pump reservoir.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    empty_capacitance, full_capacitance : float
+        Capacitance of empty and filled reservoir.
+    volume_ul : float, optional
+        Volume of filled reservoir (microliters), if known.
+
+    Raises
+    ------
+    ValueError
+        If filled reservoir capacitance is not greater than empty reservoir
+        capacitance.
+    '''
+    def __init__(self, empty_capacitance, full_capacitance, volume_ul=None):
+        if not full_capacitance > empty_capacitance:
+            raise ValueError('Filled reservoir capacitance (%s) must be '
+                             'greater than empty reservoir capacitance (%s).'
+                             % (full_capacitance, empty_capacitance))
+        self.empty_capacitance = float(empty_capacitance)
+        self.full_capacitance = float(full_capacitance)
+        self.volume_ul = volume_ul or None
+
+    @property
+    def span(self):
+        '''
+        Capacitance difference between filled and empty reservoir.
+        '''
+        return self.full_capacitance - self.empty_capacitance
+
+    def fill_fraction(self, capacitance, clip=False):
+        '''
+        Parameters
+        ----------
+        capacitance : float or array_like
+            Reservoir capacitance.
+        clip : bool, optional
+            If ``True``, limit fill fraction to the range ``[0, 1]``.
+
+        Returns
+        -------
+        float or numpy.ndarray
+            Fill fraction (``0`` when empty, ``1`` when filled).
+        '''
+        fraction = ((np.asarray(capacitance, dtype=float) -
+                     self.empty_capacitance) / self.span)
+        if clip:
+            fraction = np.clip(fraction, 0, 1)
+        return _result(fraction)
+
+    def volume(self, capacitance, clip=False):
+        '''
+        Parameters
+        ----------
+        capacitance : float or array_like
+            Reservoir capacitance.
+        clip : bool, optional
+            If ``True``, limit volume to the range ``[0, volume_ul]``.
+
+        Returns
+        -------
+        float or numpy.ndarray or None
+            Estimated liquid volume (microliters), or ``None`` if the
+            reservoir volume is not known.
+        '''
+        if self.volume_ul is None:
+            return None
+        return _result(self.volume_ul *
+                       np.asarray(self.fill_fraction(capacitance, clip=clip)))
+
+    def capacitance(self, fill_fraction):
+        '''
+        Parameters
+        ----------
+        fill_fraction : float or array_like
+            Fill fraction.
+
+        Returns
+        -------
+        float or numpy.ndarray
+            Reservoir capacitance at fill fraction (inverse of
+            :meth:`fill_fraction`).
+        '''
+        return _result(self.empty_capacitance + self.span *
+                       np.asarray(fill_fraction, dtype=float))
+
+    def to_dict(self):
+        return {'empty_capacitance': self.empty_capacitance,
+                'full_capacitance': self.full_capacitance,
+                'volume_ul': self.volume_ul}
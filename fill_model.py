@@ -0,0 +1,160 @@
+'''
+Incremental linear model of pump reservoir capacitance during filling.
+
+.. versionadded:: 0.26
+'''
+import numpy as np
+
+
+class LinearFillModel(object):
+    '''
+    Recursive least-squares fit of a line, ``y = slope * x + intercept``,
+    e.g., reservoir capacitance against pump time.
+
+    Each point is folded into running means and co-moments (Welford's
+    method) in constant time, so the fit after ``n`` points is identical to
+    an ordinary least-squares fit of all ``n`` points (e.g., with
+    :func:`scipy.optimize.curve_fit`), without storing or refitting the
+    history.
+
+    .. versionadded:: 0.26
+
+    Attributes
+    ----------
+    n : int
+        Number of points fitted.
+    residuals : list
+        Residual of each point relative to the fit of the preceding points
+        (``None`` for the first two points, before a line is defined).
+    '''
+    def __init__(self):
+        self.n = 0
+        self.residuals = []
+        self._mean_x = 0.
+        self._mean_y = 0.
+        self._sxx = 0.
+        self._sxy = 0.
+        self._syy = 0.
+
+    def update(self, x, y):
+        '''
+        Add a point to the fit.
+
+        Parameters
+        ----------
+        x, y : float
+            Point coordinates.
+
+        Returns
+        -------
+        float or None
+            Residual of point relative to the fit *before* the update (see
+            :meth:`residual`).
+        '''
+        residual = self.residual(x, y)
+        self.residuals.append(residual)
+        self.n += 1
+        dx = x - self._mean_x
+        dy = y - self._mean_y
+        self._mean_x += dx / self.n
+        self._mean_y += dy / self.n
+        self._sxx += dx * (x - self._mean_x)
+        self._sxy += dx * (y - self._mean_y)
+        self._syy += dy * (y - self._mean_y)
+        return residual
+
+    @property
+    def coefficients(self):
+        '''
+        Returns
+        -------
+        tuple or None
+            ``(slope, intercept)``, or ``None`` if the line is not defined,
+            i.e., fewer than two distinct ``x`` values were fitted.
+        '''
+        if self.n < 2 or self._sxx <= 0:
+            return None
+        slope = self._sxy / self._sxx
+        return slope, self._mean_y - slope * self._mean_x
+
+    def predict(self, x):
+        '''
+        Returns
+        -------
+        float or numpy.ndarray or None
+            Fitted value(s) at ``x`` (``None`` if the line is not defined).
+        '''
+        coefficients = self.coefficients
+        if coefficients is None:
+            return None
+        slope, intercept = coefficients
+        return slope * np.asarray(x) + intercept
+
+    def residual(self, x, y):
+        '''
+        Returns
+        -------
+        float or None
+            ``y - predict(x)`` (``None`` if the line is not defined).
+        '''
+        y_fit = self.predict(x)
+        return None if y_fit is None else y - float(y_fit)
+
+    @property
+    def residual_std(self):
+        '''
+        Returns
+        -------
+        float or None
+            Standard deviation of residuals of fitted points (``None`` for
+            fewer than three points).
+        '''
+        if self.n < 3 or self.coefficients is None:
+            return None
+        sse = max(0., self._syy - self._sxy ** 2 / self._sxx)
+        return np.sqrt(sse / (self.n - 2))
+
+    @property
+    def slope_stderr(self):
+        '''
+        Returns
+        -------
+        float or None
+            Standard error of fitted slope (``None`` for fewer than three
+            points).
+        '''
+        residual_std = self.residual_std
+        if residual_std is None:
+            return None
+        return residual_std / np.sqrt(self._sxx)
+
+    @property
+    def r_squared(self):
+        '''
+        Returns
+        -------
+        float or None
+            Coefficient of determination of fit (``None`` if the line is not
+            defined).
+        '''
+        if self.coefficients is None:
+            return None
+        if self._syy <= 0:
+            return 1.
+        return self._sxy ** 2 / (self._sxx * self._syy)
+
+    def summary(self):
+        '''
+        Returns
+        -------
+        dict
+            Number of points, fitted coefficients, residual standard
+            deviation, slope standard error and coefficient of determination,
+            e.g., for the step log.
+        '''
+        coefficients = self.coefficients or (None, None)
+        return {'n': self.n, 'slope': coefficients[0],
+                'intercept': coefficients[1],
+                'residual_std': self.residual_std,
+                'slope_stderr': self.slope_stderr,
+                'r_squared': self.r_squared}
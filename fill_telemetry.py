@@ -0,0 +1,219 @@
+'''
+Telemetry of auto pump reservoir fills.
+
+Each auto pump routine records its capacitance measurements, pump pulses and
+fit/controller parameters in a :class:`FillTelemetry`, which is written to
+the run store (see :meth:`run_store.RunStore.save_fill`) and summarized in
+the step log.  Recorded fills may be replayed offline to compare pump
+control variants (see :mod:`replay`).
+
+.. versionadded:: 0.26
+'''
+import numpy as np
+from trollius.time_monotonic import time_monotonic
+
+from .html_report import decimate
+
+
+def fill_metrics(time_s, capacitance, target, initial=None):
+    '''
+    Fill performance of a capacitance trajectory.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    time_s : array_like
+        Time of each capacitance measurement (relative to start of fill).
+    capacitance : array_like
+        Capacitance measurements.
+    target : float
+        Target capacitance (e.g., of filled reservoir).
+    initial : float, optional
+        Capacitance at start of fill.  By default, the first measurement.
+
+    Returns
+    -------
+    dict
+        ``time_to_fill_s`` (time of first measurement reaching the target,
+        or ``None`` if the target was not reached), ``final_capacitance``,
+        ``overshoot`` (capacitance beyond target at end of fill) and
+        ``relative_overshoot`` (overshoot as a fraction of the fill range,
+        ``target - initial``).
+    '''
+    time_s = np.asarray(time_s, dtype=float)
+    capacitance = np.asarray(capacitance, dtype=float)
+    if not capacitance.size:
+        return {'time_to_fill_s': None, 'final_capacitance': None,
+                'overshoot': None, 'relative_overshoot': None}
+    if initial is None:
+        initial = capacitance[0]
+    reached = np.flatnonzero(capacitance >= target)
+    overshoot = max(0., capacitance[-1] - target)
+    fill_range = target - initial
+    return {'time_to_fill_s': (float(time_s[reached[0]]) if reached.size
+                               else None),
+            'final_capacitance': float(capacitance[-1]),
+            'overshoot': overshoot,
+            'relative_overshoot': (overshoot / fill_range if fill_range > 0
+                                   else None)}
+
+
+class FillTelemetry(object):
+    '''
+    Record of an auto pump reservoir fill.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    mode : str
+        Pump routine, i.e., ``'prepare'`` or ``'auto'``.
+    control : str
+        Pump control variant (e.g., ``'Fixed pulses'``, ``'PI'`` or
+        ``'Continuous'``).
+    target : float, optional
+        Target capacitance (if known).
+    calibration : fill_level.ReservoirCalibration, optional
+        Reservoir calibration (if known), used to report the fill level of
+        each capacitance measurement.
+
+    Attributes
+    ----------
+    start_time : float
+        Monotonic clock time (see :func:`trollius.time_monotonic`) all
+        recorded times are relative to.
+    samples : list
+        ``(time_s, capacitance, std, n_samples)`` of each capacitance
+        measurement.
+    pulses : list
+        ``(start_s, width_s, frequency_hz)`` of each pump pulse.
+    parameters : dict
+        Other parameters of fill, e.g., linear fit or controller summary.
+    '''
+    def __init__(self, mode, control, target=None, calibration=None):
+        self.mode = mode
+        self.control = control
+        self.target = target
+        self.calibration = calibration
+        self.start_time = time_monotonic()
+        self.samples = []
+        self.pulses = []
+        self.parameters = {}
+
+    def now(self):
+        '''
+        Returns
+        -------
+        float
+            Time since start of fill.
+        '''
+        return time_monotonic() - self.start_time
+
+    def add_sample(self, capacitance, std=0., n_samples=1, time_s=None):
+        '''
+        Record capacitance measurement (at current time by default).
+        '''
+        if time_s is None:
+            time_s = self.now()
+        self.samples.append((time_s, capacitance, std, n_samples))
+
+    def add_samples(self, time_s, capacitance, start_time=None):
+        '''
+        Record array of single capacitance readings.
+
+        Parameters
+        ----------
+        time_s : array_like
+            Time of each reading, relative to ``start_time``.
+        capacitance : array_like
+            Capacitance readings.
+        start_time : float, optional
+            Monotonic clock time ``time_s`` is relative to.  By default,
+            :attr:`start_time`.
+        '''
+        offset_s = (0. if start_time is None
+                    else start_time - self.start_time)
+        self.samples.extend((float(t) + offset_s, float(c), 0., 1)
+                            for t, c in zip(time_s, capacitance))
+
+    def add_pulse(self, pulse, frequency_hz):
+        '''
+        Parameters
+        ----------
+        pulse : dict
+            Pulse recorded by :class:`pump_timing.PumpTimer`.
+        frequency_hz : float
+            Pump frequency during pulse.
+        '''
+        self.pulses.append((pulse['on_time'] - self.start_time,
+                            pulse['actual_s'], frequency_hz))
+
+    def metrics(self):
+        '''
+        Returns
+        -------
+        dict
+            Fill metrics (see :func:`fill_metrics`), number of pulses and
+            total pump time.  If the reservoir calibration is known, also
+            the final fill fraction and volume (see
+            :class:`fill_level.ReservoirCalibration`).
+        '''
+        if self.target is None or not self.samples:
+            metrics = {}
+        else:
+            samples = np.array(self.samples, dtype=float)
+            metrics = fill_metrics(samples[:, 0], samples[:, 1],
+                                   self.target)
+            if self.calibration is not None:
+                final = metrics['final_capacitance']
+                metrics['final_fill_fraction'] = \
+                    self.calibration.fill_fraction(final)
+                metrics['final_volume_ul'] = self.calibration.volume(final)
+        metrics['pulse_count'] = len(self.pulses)
+        metrics['pump_time_s'] = sum(width_s for _, width_s, _ in
+                                     self.pulses)
+        return metrics
+
+    def to_dict(self, max_samples=None):
+        '''
+        Parameters
+        ----------
+        max_samples : int, optional
+            Maximum number of samples, e.g., to limit size of step log (see
+            :func:`html_report.decimate`).  By default, all samples are
+            included.
+
+        Returns
+        -------
+        dict
+            JSON-serializable record of fill.  If the reservoir calibration
+            is known, samples include the fill fraction of each capacitance
+            measurement (``fill_fraction``).
+        '''
+        samples = (np.array(self.samples, dtype=float).reshape(-1, 4)
+                   .T.copy())
+        time_s, capacitance, std, n_samples = samples
+        if max_samples is not None and len(time_s) > max_samples:
+            time_s, capacitance = decimate(time_s, capacitance,
+                                           max_points=max_samples)
+            std = n_samples = None
+        samples = {'time_s': list(time_s),
+                   'capacitance': list(capacitance),
+                   'std': None if std is None else list(std),
+                   'n_samples': (None if n_samples is None else
+                                 [int(n) for n in n_samples])}
+        calibration = None
+        if self.calibration is not None:
+            calibration = self.calibration.to_dict()
+            samples['fill_fraction'] = \
+                list(self.calibration.fill_fraction(capacitance))
+        return {'mode': self.mode, 'control': self.control,
+                'target': self.target, 'calibration': calibration,
+                'samples': samples,
+                'pulses': [{'start_s': start_s, 'width_s': width_s,
+                            'frequency_hz': frequency_hz}
+                           for start_s, width_s, frequency_hz in
+                           self.pulses],
+                'parameters': self.parameters,
+                'metrics': self.metrics()}
@@ -0,0 +1,306 @@
+'''
+Self-contained HTML report of PMT results.
+
+Plots are rendered as inline SVG from decimated data, so the report opens
+instantly in any web browser and does not require a spreadsheet application
+or network access.
+
+.. versionadded:: 0.26
+'''
+from collections import OrderedDict
+from xml.sax.saxutils import escape, quoteattr
+import datetime as dt
+import socket
+
+import numpy as np
+import path_helpers as ph
+
+
+
+# Line colors used for plotting PMT measurement runs (cycled).
+COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b',
+          '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+
+STYLE = '''
+body { font-family: Calibri, Arial, sans-serif; margin: 1.5em; }
+table { border-collapse: collapse; margin-bottom: 1.5em; }
+th, td { border: 1px solid #999; padding: 0.2em 0.6em; text-align: left; }
+th { background: #eee; }
+td.number { text-align: right; font-family: monospace; }
+svg { display: block; margin-bottom: 1em; }
+svg text { font-size: 11px; }
+'''
+
+
+def decimate(x, y, max_points=1000):
+    '''
+    Reduce the number of points in a trace while preserving its envelope.
+
+    Samples are grouped into ``max_points / 2`` buckets, and the minimum and
+    maximum of each bucket are kept, so single-sample spikes remain visible.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    x, y : numpy.ndarray
+        Sample coordinates.
+    max_points : int, optional
+        Maximum number of points to return.
+
+    Returns
+    -------
+    tuple(numpy.ndarray, numpy.ndarray)
+        Decimated ``x`` and ``y`` coordinates.
+    '''
+    n_buckets = max(max_points // 2, 1)
+    if len(y) <= 2 * n_buckets:
+        return x, y
+    starts = np.linspace(0, len(y), n_buckets + 1).astype(int)
+    y_min = np.minimum.reduceat(y, starts[:-1])
+    y_max = np.maximum.reduceat(y, starts[:-1])
+    x_mid = x[(starts[:-1] + starts[1:]) // 2]
+    return np.repeat(x_mid, 2), np.column_stack([y_min, y_max]).ravel()
+
+
+def _ticks(lower, upper, count=5):
+    '''
+    Returns
+    -------
+    numpy.ndarray
+        Evenly spaced "round" tick values spanning ``[lower, upper]``.
+    '''
+    if upper <= lower:
+        return np.array([lower])
+    raw_step = (upper - lower) / float(count)
+    magnitude = 10 ** np.floor(np.log10(raw_step))
+    step = min((m * magnitude for m in (1, 2, 5, 10)
+                if m * magnitude >= raw_step))
+    return np.arange(np.ceil(lower / step) * step, upper + 1e-9 * step, step)
+
+
+def svg_plot(traces, title, width=720, height=300, x_label='Time (s)',
+             y_label='Current (A)'):
+    '''
+    Render traces as an SVG line plot.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    traces : list
+        List of ``(label, x, y, color)`` tuples.
+    title : str
+        Plot title.
+    width, height : int, optional
+        Plot size in pixels.
+    x_label, y_label : str, optional
+        Axis titles.
+
+    Returns
+    -------
+    str
+        SVG element markup.
+    '''
+    margin = dict(left=80, right=20, top=30, bottom=45)
+    plot_width = width - margin['left'] - margin['right']
+    plot_height = height - margin['top'] - margin['bottom']
+
+    traces = [trace_i for trace_i in traces if len(trace_i[1])]
+    if traces:
+        x_all = np.concatenate([trace_i[1] for trace_i in traces])
+        y_all = np.concatenate([trace_i[2] for trace_i in traces])
+        x_min, x_max = np.nanmin(x_all), np.nanmax(x_all)
+        y_min, y_max = np.nanmin(y_all), np.nanmax(y_all)
+    else:
+        x_min, x_max, y_min, y_max = 0., 1., 0., 1.
+    if x_max <= x_min:
+        x_max = x_min + 1.
+    if y_max <= y_min:
+        # Flat trace(s); pad range so the trace is centered vertically.
+        padding = .1 * abs(y_max) or 1.
+        y_min, y_max = y_min - padding, y_max + padding
+
+    def x_px(x):
+        return margin['left'] + (x - x_min) / (x_max - x_min) * plot_width
+
+    def y_px(y):
+        return margin['top'] + (y_max - y) / (y_max - y_min) * plot_height
+
+    elements = ['<svg xmlns="http://www.w3.org/2000/svg" width="%d" '
+                'height="%d">' % (width, height),
+                '<text x="%d" y="18" font-weight="bold">%s</text>' %
+                (margin['left'], escape(title)),
+                '<rect x="%d" y="%d" width="%d" height="%d" fill="none" '
+                'stroke="#999"/>' % (margin['left'], margin['top'],
+                                     plot_width, plot_height)]
+
+    for tick_i in _ticks(x_min, x_max):
+        elements.append('<text x="%.1f" y="%d" text-anchor="middle">%.3g'
+                        '</text>' % (x_px(tick_i), height - 25, tick_i))
+    for tick_i in _ticks(y_min, y_max):
+        elements.append('<line x1="%d" x2="%d" y1="%.1f" y2="%.1f" '
+                        'stroke="#ddd"/>' % (margin['left'], margin['left'] +
+                                             plot_width, y_px(tick_i),
+                                             y_px(tick_i)))
+        elements.append('<text x="%d" y="%.1f" text-anchor="end">%.3g'
+                        '</text>' % (margin['left'] - 5, y_px(tick_i) + 4,
+                                     tick_i))
+    elements.append('<text x="%.1f" y="%d" text-anchor="middle">%s</text>' %
+                    (margin['left'] + .5 * plot_width, height - 5,
+                     escape(x_label)))
+    elements.append('<text x="12" y="%.1f" text-anchor="middle" '
+                    'transform="rotate(-90 12 %.1f)">%s</text>' %
+                    ((margin['top'] + .5 * plot_height,) * 2 +
+                     (escape(y_label),)))
+
+    for label_i, x_i, y_i, color_i in traces:
+        points_i = ' '.join('%.1f,%.1f' % xy for xy in zip(x_px(x_i),
+                                                           y_px(y_i)))
+        elements.append('<polyline fill="none" stroke=%s stroke-width="1" '
+                        'points="%s"><title>%s</title></polyline>' %
+                        (quoteattr(color_i), points_i, escape(label_i)))
+    elements.append('</svg>')
+    return '\n'.join(elements)
+
+
+def _table(header, rows):
+    '''
+    Returns
+    -------
+    str
+        HTML table markup; ``float`` values are right-aligned.
+    '''
+    html = ['<table>', '<tr>%s</tr>' % ''.join('<th>%s</th>' % escape(h)
+                                               for h in header)]
+    for row_i in rows:
+        cells_i = []
+        for value_ij in row_i:
+            if isinstance(value_ij, float):
+                cells_i.append('<td class="number">%.6g</td>' % value_ij)
+            else:
+                cells_i.append('<td>%s</td>' % escape(unicode(value_ij)))
+        html.append('<tr>%s</tr>' % ''.join(cells_i))
+    html.append('</table>')
+    return '\n'.join(html)
+
+
+def _fill_section(fills):
+    '''
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    fills : list
+        Recorded auto pump fills (see :meth:`run_store.RunStore.fills`).
+
+    Returns
+    -------
+    list
+        HTML markup of pump reservoir fill table and fill level plot.
+    '''
+    def _value(value):
+        return '-' if value is None else float(value)
+
+    rows = []
+    traces = []
+    for i, fill_i in enumerate(fills):
+        metrics_i = fill_i.get('metrics', {})
+        fraction_i = metrics_i.get('final_fill_fraction')
+        rows.append((fill_i.get('file', i), fill_i['mode'],
+                     fill_i['control'],
+                     _value(None if fraction_i is None else 100 * fraction_i),
+                     _value(metrics_i.get('final_volume_ul')),
+                     _value(metrics_i.get('time_to_fill_s')),
+                     metrics_i.get('pulse_count', '-')))
+        samples_i = fill_i['samples']
+        if samples_i.get('fill_fraction'):
+            traces.append((unicode(fill_i.get('file', i)),
+                           np.asarray(samples_i['time_s'], dtype=float),
+                           100 * np.asarray(samples_i['fill_fraction'],
+                                            dtype=float),
+                           COLORS[i % len(COLORS)]))
+    html = ['<h2>Pump reservoir fills</h2>',
+            _table(['Fill', 'Routine', 'Control', 'Final fill (%)',
+                    'Volume (uL)', 'Time to fill (s)', 'Pulses'], rows)]
+    if traces:
+        html.append(svg_plot(traces, title='Pump reservoir fill level',
+                             y_label='Fill (%)'))
+    return html
+
+
+def write_html_results(output_path, store, assay_info=None,
+                       max_points=1000, fills=None):
+    '''
+    Write results as a self-contained HTML document.
+
+    Runs are read from the binary cache of the experiment log directory, so
+    only new or modified PMT data files are decoded.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    output_path : str
+        Path to write output HTML document to.
+    store : run_store.RunStore
+        Cache of measured PMT runs (see :meth:`run_store.RunStore.runs`).
+    assay_info : dict, optional
+        Additional assay information fields to list in the report.
+    max_points : int, optional
+        Maximum number of points plotted per measurement run.
+    fills : list, optional
+        Recorded auto pump fills (see :meth:`run_store.RunStore.fills`) to
+        summarize by fill level.
+
+    Returns
+    -------
+    path_helpers.path
+        Wrapped output path.
+    '''
+    output_path = ph.path(output_path)
+
+    info = OrderedDict([('Date', dt.datetime.utcnow().date()),
+                        ('Laptop', socket.gethostname())])
+    info.update(assay_info or {})
+
+    results = []
+    traces = []
+    run_plots = []
+    for i, run_i in enumerate(store.runs()):
+        stats_i = run_i['stats']
+        results.append((run_i['name'],
+                        float('nan' if stats_i['mean'] is None
+                              else stats_i['mean']),
+                        float('nan' if stats_i['std'] is None
+                              else stats_i['std']),
+                        stats_i['count'], stats_i['duration_s']))
+
+        # Only keep decimated traces in memory (records are memory-mapped).
+        records_i = store.records(run_i)
+        time_s_i = 1e-9 * (records_i['time_ns'] - records_i['time_ns'][0]
+                           if len(records_i) else np.array([]))
+        x_i, y_i = decimate(time_s_i, np.asarray(records_i['value']),
+                            max_points=max_points)
+        trace_i = (unicode(run_i['name']), x_i, y_i,
+                   COLORS[i % len(COLORS)])
+        traces.append(trace_i)
+        run_plots.append(svg_plot([trace_i], title='PMT current: %s' %
+                                  run_i['name']))
+
+    html = ['<!DOCTYPE html>', '<html>', '<head>', '<meta charset="utf-8">',
+            '<title>PMT results</title>', '<style>%s</style>' % STYLE,
+            '</head>', '<body>', '<h1>PMT results</h1>', '<h2>Assay Info</h2>',
+            _table(['Field', 'Value'], info.items()),
+            '<h2>Results</h2>',
+            _table(['Measurement ID', 'Mean (A)', 'Std. dev. (A)', 'Samples',
+                    'Duration (s)'], results),
+            svg_plot(traces, title='PMT current', height=400),
+            '<h2>Measurement runs</h2>'] + run_plots
+    if fills:
+        html += _fill_section(fills)
+    html += ['</body>', '</html>']
+
+    with output_path.open('wb') as output:
+        output.write('\n'.join(html).encode('utf-8'))
+    return output_path
@@ -0,0 +1,117 @@
+'''
+Lightweight live view of headless PMT acquisition.
+
+.. versionadded:: 0.26
+'''
+import logging
+
+import gobject
+import gtk
+
+from .html_report import decimate
+
+logger = logging.getLogger(__name__)
+
+
+class LiveView(object):
+    '''
+    Small window showing progress, latest PMT reading and a trace of recent
+    samples of a headless acquisition (see
+    :class:`acquisition.AcquisitionEngine`).
+
+    Samples are read from a :class:`ring_buffer.RingBuffer` shared with the
+    acquisition thread.  The view polls the buffer at a fixed rate and draws
+    from a zero-copy snapshot, so memory use does not grow with the
+    measurement duration and the acquisition thread never waits for the UI.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    title : str
+        Window title.
+    duration_s : float
+        Measurement duration.
+    ring_buffer : ring_buffer.RingBuffer
+        Buffer of live samples, with ``time_s`` and ``value`` fields.
+    interval_ms : int, optional
+        Refresh interval.
+    max_points : int, optional
+        Maximum number of points drawn (see :func:`html_report.decimate`).
+    '''
+    def __init__(self, title, duration_s, ring_buffer, interval_ms=200,
+                 max_points=300):
+        self.duration_s = duration_s
+        self.ring_buffer = ring_buffer
+        self.max_points = max_points
+        self._count = 0
+        self._trace = None
+
+        self.window = gtk.Window()
+        self.window.set_title(title)
+        self.window.set_default_size(320, -1)
+        self.window.set_position(gtk.WIN_POS_MOUSE)
+        vbox = gtk.VBox(spacing=6)
+        vbox.set_border_width(6)
+        self.label = gtk.Label('Waiting for data...')
+        self.trace_area = gtk.DrawingArea()
+        self.trace_area.set_size_request(300, 80)
+        self.trace_area.connect('expose-event', self.on_expose)
+        self.progress = gtk.ProgressBar()
+        vbox.pack_start(self.label, False, False)
+        vbox.pack_start(self.trace_area, True, True)
+        vbox.pack_start(self.progress, False, False)
+        self.window.add(vbox)
+        self.window.show_all()
+        self._timeout_id = gobject.timeout_add(interval_ms, self.refresh)
+
+    def refresh(self):
+        '''
+        Update view from ring buffer (if new samples are available).
+
+        Returns
+        -------
+        bool
+            ``True``, to keep polling.
+        '''
+        count, samples = self.ring_buffer.snapshot()
+        if count == self._count or not len(samples):
+            return True
+        self._count = count
+        time_s = samples['time_s']
+        values = samples['value']
+        self.label.set_text('%.3g A' % values[-1])
+        fraction = (min(1., time_s[-1] / self.duration_s)
+                    if self.duration_s else 1.)
+        self.progress.set_fraction(fraction)
+        self.progress.set_text('%.0f / %.0f s' % (time_s[-1],
+                                                  self.duration_s))
+        self._trace = decimate(time_s, values, max_points=self.max_points)
+        self.trace_area.queue_draw()
+        return True
+
+    def on_expose(self, widget, event):
+        if self._trace is None:
+            return False
+        x, y = self._trace
+        if len(x) < 2:
+            return False
+        width, height = widget.window.get_size()
+        x_min, x_max = x[0], x[-1]
+        y_min, y_max = y.min(), y.max()
+        x_scale = (width - 1) / ((x_max - x_min) or 1.)
+        y_scale = (height - 1) / ((y_max - y_min) or 1.)
+        context = widget.window.cairo_create()
+        context.set_line_width(1)
+        context.set_source_rgb(0.12, 0.47, 0.71)
+        context.move_to((x[0] - x_min) * x_scale,
+                        height - 1 - (y[0] - y_min) * y_scale)
+        for x_i, y_i in zip(x[1:], y[1:]):
+            context.line_to((x_i - x_min) * x_scale,
+                            height - 1 - (y_i - y_min) * y_scale)
+        context.stroke()
+        return False
+
+    def close(self):
+        gobject.source_remove(self._timeout_id)
+        self.window.destroy()
@@ -0,0 +1,359 @@
+'''
+Compilation of protocol step options into a per-step hardware plan.
+
+Each step is compiled into the hardware state it requires (magnet position,
+pump routine, PMT measurement, LEDs) and the list of actions needed to reach
+that state from the state left by the previous step.  Actions which do not
+change the hardware state (e.g., engaging an already engaged magnet) are not
+emitted.
+
+The compiled plan may be validated and its duration estimated before the
+protocol starts.  Since a protocol may start or resume at any step, the
+actions executed by each step are derived from the hardware state actually
+applied (see :func:`step_actions`).
+
+.. versionadded:: 0.26
+'''
+from collections import OrderedDict
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+#: Approximate duration of a magnet z-stage move (seconds).
+MAGNET_MOVE_S = 3.
+#: Approximate duration of ADC start, calibration and PMT reference voltage
+#: check before each PMT measurement (seconds).
+PMT_PREPARE_S = 2.
+#: Time reserved at the end of a pump pulse, by which a PMT measurement
+#: prepared during the pulse must be ready (otherwise it is cancelled), so
+#: queued ADC requests do not delay pump deactivation (seconds).
+PUMP_LOOKAHEAD_GUARD_S = 1.
+#: Default number of pump frequency levels of purge/prime routine.
+PRIME_LEVEL_COUNT = 10
+#: Default first and last pump frequency of purge/prime routine (Hz).
+PRIME_START_HZ = 10
+PRIME_END_HZ = 910
+#: Maximum duration of auto pump prepare routine (seconds).
+PREPARE_TIMEOUT_S = 15.
+#: Time allowed for each step action in addition to its estimated duration,
+#: e.g., for serial requests and capacitance measurements (seconds).
+TIMEOUT_MARGIN_S = 10.
+
+
+def prime_schedule(duration_s, shape='Linear', level_count=PRIME_LEVEL_COUNT,
+                   start_hz=PRIME_START_HZ, end_hz=PRIME_END_HZ, points=None):
+    '''
+    Compile pump frequency schedule of purge/prime routine.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    duration_s : float
+        Duration of each frequency level.
+    shape : str, optional
+        ``'Linear'`` or ``'Exponential'`` ramp from ``start_hz`` to
+        ``end_hz``, or ``'Custom'`` frequency levels (``points``).
+    level_count : int, optional
+        Number of levels of linear or exponential ramp.
+    start_hz, end_hz : float, optional
+        First and last frequency of linear or exponential ramp.
+    points : str, optional
+        Comma-separated list of frequencies of ``'Custom'`` ramp, e.g.,
+        ``'100, 500, 1000'``.
+
+    Returns
+    -------
+    list
+        List of ``(frequency_hz, duration_s)`` levels, in order.
+
+    Raises
+    ------
+    ValueError
+        If the shape is unknown or no valid custom frequency is specified.
+    '''
+    if shape == 'Custom':
+        frequencies = [float(f) for f in (points or '').split(',')
+                       if f.strip()]
+        if not frequencies or min(frequencies) <= 0:
+            raise ValueError('Invalid custom pump frequencies: `%s`' %
+                             points)
+    elif shape == 'Linear':
+        frequencies = np.linspace(start_hz, end_hz, level_count)
+    elif shape == 'Exponential':
+        frequencies = np.logspace(np.log10(start_hz), np.log10(end_hz),
+                                  level_count)
+    else:
+        raise ValueError('Unknown pump ramp shape: `%s`' % shape)
+    return [(int(round(f)), duration_s) for f in frequencies]
+
+
+def step_state(step_options, step_label, app_values):
+    '''
+    Compile hardware state required by a protocol step.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    step_options : dict
+        MR-Box peripheral board plugin options for a protocol step.
+    step_label : str
+        Step label (if set).
+    app_values : dict
+        Plugin app option values.
+
+    Returns
+    -------
+    OrderedDict
+        Hardware state of step:
+
+         - ``magnet``: ``True`` if magnet is engaged;
+         - ``pump``: pump routine (``None`` if pump is not used), with keys
+           ``mode`` (``'prime'``, ``'prepare'``, ``'auto'`` or
+           ``'manual'``), ``frequency_hz`` and ``duration_s`` (and
+           ``schedule`` for ``'prime'``, see :func:`prime_schedule`);
+         - ``pmt``: PMT measurement (``None`` if PMT is not measured), with
+           keys ``background`` and ``duration_s``; and
+         - ``leds_on``: ``False`` if LEDs are turned off during step.
+    '''
+    label = (step_label or '').lower()
+    state = OrderedDict()
+    state['magnet'] = bool(step_options.get('Magnet'))
+
+    pump = None
+    if step_options.get('Pump'):
+        if app_values.get('Use auto pump'):
+            if label in ('purge', 'prime'):
+                duration_s = step_options.get('Pump_duration_(s)')
+                ramp = {'shape': app_values.get('Prime ramp shape'),
+                        'level_count': app_values.get('Prime ramp levels'),
+                        'start_hz': app_values.get('Prime ramp start (Hz)'),
+                        'end_hz': app_values.get('Prime ramp end (Hz)'),
+                        'points': app_values.get('Prime ramp custom '
+                                                 'frequencies (Hz)')}
+                try:
+                    schedule = prime_schedule(duration_s,
+                                              **{k: v for k, v in
+                                                 ramp.iteritems()
+                                                 if v is not None})
+                except ValueError:
+                    logger.warning('Invalid pump ramp settings; use default '
+                                   'linear ramp.', exc_info=True)
+                    schedule = prime_schedule(duration_s)
+                pump = {'mode': 'prime',
+                        'frequency_hz': max(f for f, _ in schedule),
+                        'duration_s': duration_s, 'schedule': schedule}
+            elif label == 'prepare':
+                pump = {'mode': 'prepare',
+                        'frequency_hz': app_values.get('Auto pump frequency'),
+                        'duration_s': PREPARE_TIMEOUT_S}
+            else:
+                pump = {'mode': 'auto',
+                        'frequency_hz': app_values.get('Auto pump frequency'),
+                        'duration_s': app_values.get('Auto pump timeout')}
+        else:
+            pump = {'mode': 'manual',
+                    'frequency_hz': step_options.get('Pump_frequency_(hz)'),
+                    'duration_s': step_options.get('Pump_duration_(s)')}
+    state['pump'] = pump
+
+    pmt = None
+    if step_options.get('Measure_PMT'):
+        pmt = {'background': label == 'background',
+               'duration_s': step_options.get('Measurement_duration_(s)')
+               + 1}
+    state['pmt'] = pmt
+    state['leds_on'] = pmt is None
+    return state
+
+
+def step_actions(state, previous_state=None):
+    '''
+    List actions required to reach hardware state of step.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    state : dict
+        Hardware state of step (see :func:`step_state`).
+    previous_state : dict, optional
+        Hardware state after previous step.  If not specified, the hardware
+        state is assumed to be unknown and all actions are emitted.
+
+    Returns
+    -------
+    list
+        List of ``(action, value)`` tuples, in execution order:
+
+         - ``('magnet', engaged)``: move magnet z-stage;
+         - ``('pump', pump)``: run pump routine;
+         - ``('leds', on)``: turn LEDs on/off; and
+         - ``('pmt', pmt)``: measure PMT.
+    '''
+    actions = []
+    if previous_state is None or state['magnet'] != previous_state['magnet']:
+        actions.append(('magnet', state['magnet']))
+    if state['pump'] is not None:
+        actions.append(('pump', state['pump']))
+    if not state['leds_on']:
+        actions.append(('leds', False))
+    if state['pmt'] is not None:
+        actions.append(('pmt', state['pmt']))
+    return actions
+
+
+def compile_protocol(steps, app_values):
+    '''
+    Compile hardware plan of protocol.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    steps : list
+        List of ``(step_options, step_label)`` tuples, one per protocol
+        step.
+    app_values : dict
+        Plugin app option values.
+
+    Returns
+    -------
+    list
+        Plan of each step, as a dictionary with the keys ``step_number``,
+        ``label``, ``options``, ``state`` (see :func:`step_state`) and
+        ``actions`` (see :func:`step_actions`).  Actions assume steps run in
+        order from the first step, e.g., to estimate the duration of the
+        protocol.
+    '''
+    plan = []
+    previous_state = None
+    for i, (step_options_i, step_label_i) in enumerate(steps):
+        state_i = step_state(step_options_i, step_label_i, app_values)
+        plan.append({'step_number': i, 'label': step_label_i,
+                     'options': dict(step_options_i), 'state': state_i,
+                     'actions': step_actions(state_i, previous_state)})
+        previous_state = state_i
+    return plan
+
+
+def validate_plan(plan, calibrated=False, pump_prepared=False):
+    '''
+    Check protocol plan for steps which will not run as intended.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    plan : list
+        Protocol plan (see :func:`compile_protocol`).
+    calibrated : bool, optional
+        ``True`` if ADC calibration values from a previous background
+        measurement are available.
+    pump_prepared : bool, optional
+        ``True`` if the capacitance of a filled pump reservoir was measured by
+        a previous auto pump ``prepare`` step.
+
+    Returns
+    -------
+    list
+        Warning messages.
+    '''
+    warnings = []
+    for step_i in plan:
+        state_i = step_i['state']
+        number_i = step_i['step_number'] + 1
+        pump_i = state_i['pump']
+        if pump_i is not None:
+            if pump_i['mode'] == 'prepare':
+                pump_prepared = True
+            elif pump_i['mode'] == 'auto' and not pump_prepared:
+                warnings.append('Step %d: auto pump is skipped since no '
+                                'previous step is labelled `prepare`.' %
+                                number_i)
+            if not pump_i['duration_s']:
+                warnings.append('Step %d: pump duration is not set.' %
+                                number_i)
+        pmt_i = state_i['pmt']
+        if pmt_i is not None:
+            if pmt_i['background']:
+                calibrated = True
+            elif not calibrated:
+                warnings.append('Step %d: PMT measurement has no ADC '
+                                'calibration since no previous step is '
+                                'labelled `background`.' % number_i)
+    return warnings
+
+
+def action_duration(action, value):
+    '''
+    Estimate (maximum) duration of a step action.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    action : str
+        Action name (see :func:`step_actions`).
+    value
+        Action value (see :func:`step_actions`).
+
+    Returns
+    -------
+    float
+        Estimated duration of action (seconds).
+    '''
+    if action == 'magnet':
+        return MAGNET_MOVE_S
+    elif action == 'pump':
+        if value['mode'] == 'prime':
+            return sum(duration_s or 0
+                       for _, duration_s in value['schedule'])
+        return value['duration_s'] or 0
+    elif action == 'pmt':
+        return PMT_PREPARE_S + value['duration_s']
+    return 0.
+
+
+def action_timeout(action, value):
+    '''
+    Time budget of a step action, after which the action is cancelled.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    action : str
+        Action name (see :func:`step_actions`).
+    value
+        Action value (see :func:`step_actions`).
+
+    Returns
+    -------
+    float
+        Estimated duration of action plus :data:`TIMEOUT_MARGIN_S` (seconds).
+    '''
+    return action_duration(action, value) + TIMEOUT_MARGIN_S
+
+
+def estimate_duration(step):
+    '''
+    Estimate (maximum) duration of a step plan.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    step : dict
+        Step plan (see :func:`compile_protocol`).
+
+    Returns
+    -------
+    float
+        Estimated duration of MR-Box hardware actions of step (seconds).
+    '''
+    return sum(action_duration(action_i, value_i)
+               for action_i, value_i in step['actions'])
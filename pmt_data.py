@@ -0,0 +1,125 @@
+'''
+Decoding of PMT measurement runs stored as new-line delimited JSON.
+
+.. versionadded:: 0.26
+'''
+from collections import OrderedDict
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def decode_run(data_json, default_name=None):
+    '''
+    Decode a single PMT measurement run from a JSON line.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    data_json : str
+        JSON encoded :class:`pandas.Series`, preferably in ``split``
+        orientation.
+    default_name : str, optional
+        Name to assign to the series if no name was encoded in the JSON data.
+
+    Returns
+    -------
+    pandas.Series
+        Measured PMT data, indexed by sample time.
+    '''
+    try:
+        # Try reading JSON data with `split` orientation, which preserves the
+        # name of the Pandas series.
+        s_data = pd.read_json(data_json, typ='series', orient='split')
+    except ValueError:
+        logger.debug('Decode legacy series')
+        # JSON data was not encoded in `split` orientation.
+        s_data = pd.read_json(data_json, typ='series')
+
+    if not s_data.name:
+        s_data.name = default_name
+    return s_data
+
+
+def iter_runs(data_files):
+    '''
+    Iterate through PMT measurement runs in `new-line delimited JSON files
+    <http://ndjson.org/>`_.
+
+    Runs are decoded one at a time, so only a single run is held in memory.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    data_files : list
+        List of paths to new-line delimited JSON files containing measured PMT
+        data.
+
+        Each new-line delimited JSON file corresponds to protocol step, and
+        each line in each file corresponds to measured PMT data from a single
+        measurement run.
+
+    Yields
+    ------
+    pandas.Series
+        Measured PMT data for each run.  If no name was encoded in the JSON
+        data, the name is interpreted from the filename and line number, e.g.,
+        ``step0003-00``.
+    '''
+    for data_file_i in data_files:
+        for j, data_json_ij in enumerate(data_file_i.lines()):
+            default_name_ij = '%s-%02d' % (data_file_i.namebase
+                                           .split('-')[-1], j)
+            yield decode_run(data_json_ij, default_name=default_name_ij)
+
+
+def relative_time_s(s_data):
+    '''
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    s_data : pandas.Series
+        Measured PMT data, indexed by sample time.
+
+    Returns
+    -------
+    numpy.ndarray
+        Time of each sample in seconds relative to the first sample.
+    '''
+    return (pd.Series(s_data.index - s_data.index[0])
+            .dt.total_seconds().values)
+
+
+def run_statistics(s_data):
+    '''
+    Compute summary statistics of a PMT measurement run.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    s_data : pandas.Series
+        Measured PMT data, indexed by sample time.
+
+    Returns
+    -------
+    OrderedDict
+        Mean, standard deviation, minimum, maximum, number of samples and
+        duration (in seconds) of the run.  ``NaN`` samples are ignored.
+    '''
+    values = np.asarray(s_data.values, dtype=float)
+    finite = values[np.isfinite(values)]
+    if finite.size:
+        stats = [('mean', finite.mean()), ('std', finite.std()),
+                 ('min', finite.min()), ('max', finite.max())]
+    else:
+        stats = [(k, np.nan) for k in ('mean', 'std', 'min', 'max')]
+    time_s = relative_time_s(s_data) if len(s_data) else np.array([0.])
+    return OrderedDict(stats + [('count', int(finite.size)),
+                                ('duration_s', float(time_s[-1]))])
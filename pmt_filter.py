@@ -0,0 +1,161 @@
+'''
+Streaming outlier rejection for PMT measurements.
+
+PMT data functions may be wrapped (see :class:`FilteredDataFunc`) to reject
+outliers from each chunk of samples as it is acquired, before it is plotted
+or stored.  Raw samples are streamed to disk rather than kept in memory.
+
+.. versionadded:: 0.26
+'''
+import numpy as np
+import pandas as pd
+
+
+# Scale factor relating the median absolute deviation (MAD) to the standard
+# deviation of normally distributed data.
+MAD_SCALE = 1.4826
+
+
+class HampelFilter(object):
+    '''
+    Streaming `Hampel filter`_ over a fixed-size ring buffer.
+
+    Each new sample is compared against the median of the preceding
+    ``window_size`` samples.  If the sample deviates from the median by more
+    than ``n_sigmas`` scaled median absolute deviations, it is rejected and
+    replaced by the median.  Non-finite samples (e.g., ``NaN``) are passed
+    through unchanged and are not added to the window.
+
+    Memory use is fixed by ``window_size``, regardless of how many samples are
+    filtered.
+
+    .. versionadded:: 0.26
+
+    .. _`Hampel filter`: https://en.wikipedia.org/wiki/Hampel_filter
+
+    Parameters
+    ----------
+    window_size : int, optional
+        Number of preceding samples used to estimate the local median.
+    n_sigmas : float, optional
+        Rejection threshold, in scaled median absolute deviations.
+    '''
+    def __init__(self, window_size=7, n_sigmas=3.):
+        if window_size < 3:
+            raise ValueError('Window size must be at least 3 samples.')
+        self.window_size = int(window_size)
+        self.n_sigmas = float(n_sigmas)
+        self._window = np.empty(self.window_size, dtype=float)
+        self.reset()
+
+    def reset(self):
+        '''
+        Clear sample history and rejected sample count.
+        '''
+        self._count = 0
+        self.rejected_count = 0
+
+    def update(self, value):
+        '''
+        Filter a single sample.
+
+        Parameters
+        ----------
+        value : float
+            Raw sample value.
+
+        Returns
+        -------
+        tuple(float, bool)
+            Filtered sample value and whether the raw sample was rejected.
+        '''
+        filtered = value
+        rejected = False
+        if not np.isfinite(value):
+            # Invalid sample would poison the median of the window.
+            return filtered, rejected
+
+        n = min(self._count, self.window_size)
+        # Require at least 3 samples of history before rejecting anything.
+        if n >= 3:
+            window = self._window[:n]
+            median = np.median(window)
+            mad = MAD_SCALE * np.median(np.abs(window - median))
+            # A zero MAD (e.g., quantized, flat signal) provides no scale to
+            # judge outliers against, so accept the sample.
+            if mad > 0 and abs(value - median) > self.n_sigmas * mad:
+                filtered = median
+                rejected = True
+                self.rejected_count += 1
+
+        # Store *raw* sample in history so that genuine level changes are
+        # accepted once they make up the majority of the window.
+        self._window[self._count % self.window_size] = value
+        self._count += 1
+        return filtered, rejected
+
+    def filter(self, values):
+        '''
+        Filter a chunk of samples, continuing from the preceding samples.
+
+        Parameters
+        ----------
+        values : array_like
+            Raw sample values.
+
+        Returns
+        -------
+        numpy.ndarray
+            Filtered sample values.
+        '''
+        values = np.asarray(values, dtype=float)
+        filtered = np.empty(len(values), dtype=float)
+        for i, value_i in enumerate(values):
+            filtered[i], _ = self.update(value_i)
+        return filtered
+
+
+class FilteredDataFunc(object):
+    '''
+    PMT data function which rejects outliers from each chunk of samples as
+    it is acquired.
+
+    Raw chunks are not kept in memory, but may be streamed to disk as they
+    are acquired, e.g., to store the raw data alongside the filtered data.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    data_func : callable
+        Function returning a :class:`pandas.Series` of samples acquired since
+        the previous call (see ``adc_data_func_factory`` in
+        :mod:`mr_box_peripheral_board.ui.gtk.measure_dialog`).
+    window_size : int, optional
+        See :class:`HampelFilter`.
+    n_sigmas : float, optional
+        See :class:`HampelFilter`.
+    raw_writer : run_store.RecordWriter, optional
+        Writer each raw chunk is appended to.
+    '''
+    def __init__(self, data_func, window_size=7, n_sigmas=3.,
+                 raw_writer=None):
+        self.data_func = data_func
+        self.hampel_filter = HampelFilter(window_size=window_size,
+                                          n_sigmas=n_sigmas)
+        self.raw_writer = raw_writer
+        self.sample_count = 0
+
+    def __call__(self):
+        s_chunk = self.data_func()
+        if s_chunk is None or not len(s_chunk):
+            return s_chunk
+        if self.raw_writer is not None:
+            self.raw_writer.append(s_chunk)
+        self.sample_count += len(s_chunk)
+        return pd.Series(self.hampel_filter.filter(s_chunk.values),
+                         index=s_chunk.index, name=s_chunk.name)
+
+    @property
+    def rejected_count(self):
+        return self.hampel_filter.rejected_count
@@ -0,0 +1,171 @@
+'''
+Closed-loop control of auto pump pulses.
+
+.. versionadded:: 0.26
+'''
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PIPumpController(object):
+    '''
+    Proportional-integral controller choosing the width and frequency of each
+    pump pulse to fill the pump reservoir to a target capacitance.
+
+    The fill rate (capacitance per pump cycle) is estimated from the
+    capacitance change after each pulse, so the capacitance error can be
+    expressed as the pump time remaining at full frequency, ``error_s``.  The
+    next pulse width is ``kp * error_s + ki * integral_s``, limited to:
+
+     - at most ``error_s``, so a pulse never pumps past the target (assuming
+       the fill rate does not increase);
+     - at most ``max_width_s`` and the time remaining before the timeout; and
+     - at least ``min_width_s``.  Shorter pulses are delivered by reducing
+       the pump frequency instead (down to ``min_frequency_hz``).
+
+    The error is only integrated while the output is within these limits
+    (conditional integration), which prevents integral windup.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    target : float
+        Target capacitance, e.g., of the filled reservoir.
+    frequency_hz : float
+        Maximum pump frequency.
+    kp : float, optional
+        Proportional gain (fraction of remaining pump time per pulse).
+    ki : float, optional
+        Integral gain.
+    min_width_s, max_width_s : float, optional
+        Pulse width limits.
+    min_frequency_hz : float, optional
+        Minimum pump frequency.
+    initial_width_s : float, optional
+        Width of pulses before the fill rate is known.
+    alpha : float, optional
+        Weight of latest fill rate in moving average.
+
+    Attributes
+    ----------
+    trajectory : list
+        Record of each controller update: measurement time (``time_s``),
+        ``capacitance``, capacitance ``error``, fill ``rate``, ``error_s``,
+        ``integral_s``, output pulse ``width_s`` and ``frequency_hz`` and
+        whether the output was ``limited``.
+    '''
+    def __init__(self, target, frequency_hz, kp=.7, ki=.05, min_width_s=.02,
+                 max_width_s=1., min_frequency_hz=100, initial_width_s=.2,
+                 alpha=.5):
+        self.target = target
+        self.frequency_hz = frequency_hz
+        self.kp = kp
+        self.ki = ki
+        self.min_width_s = min_width_s
+        self.max_width_s = max_width_s
+        self.min_frequency_hz = min(min_frequency_hz, frequency_hz)
+        self.initial_width_s = initial_width_s
+        self.alpha = alpha
+        self.rate = None
+        self.integral_s = 0.
+        self.trajectory = []
+        self._previous = None
+
+    def _update_rate(self, capacitance):
+        if self._previous is None:
+            return
+        previous_capacitance, width_s, frequency_hz = self._previous
+        cycles = width_s * frequency_hz
+        delta = capacitance - previous_capacitance
+        if cycles > 0 and delta > 0:
+            rate = delta / cycles
+            if self.rate is None:
+                self.rate = rate
+            else:
+                self.rate = (self.alpha * rate + (1 - self.alpha) *
+                             self.rate)
+
+    def update(self, time_s, capacitance, remaining_s=None):
+        '''
+        Record capacitance measurement and choose next pulse.
+
+        Parameters
+        ----------
+        time_s : float
+            Time of measurement (e.g., since the start of the routine).
+        capacitance : float
+            Measured capacitance.
+        remaining_s : float, optional
+            Time remaining before the timeout.
+
+        Returns
+        -------
+        tuple or None
+            ``(width_s, frequency_hz)`` of next pulse, or ``None`` if the
+            target is reached (or closer than half the shortest pulse) or no
+            time remains.
+        '''
+        self._update_rate(capacitance)
+        error = self.target - capacitance
+        entry = {'time_s': time_s, 'capacitance': capacitance,
+                 'error': error, 'rate': self.rate, 'error_s': None,
+                 'integral_s': self.integral_s, 'width_s': 0.,
+                 'frequency_hz': 0., 'limited': False}
+        self.trajectory.append(entry)
+
+        max_width_s = self.max_width_s
+        if remaining_s is not None:
+            max_width_s = min(max_width_s, remaining_s)
+        if error <= 0 or max_width_s <= 0:
+            self._previous = None
+            return None
+
+        frequency_hz = self.frequency_hz
+        if self.rate is None:
+            width_s = min(self.initial_width_s, max_width_s)
+        else:
+            # Remaining pump time at full frequency.
+            error_s = error / (self.rate * self.frequency_hz)
+            entry['error_s'] = error_s
+            shortest_s = (self.min_width_s * self.min_frequency_hz /
+                          self.frequency_hz)
+            if error_s < .5 * shortest_s:
+                # Shortest pulse would overshoot more than it would fill.
+                self._previous = None
+                return None
+            output_s = self.kp * error_s + self.ki * self.integral_s
+            width_s = max(0., min(output_s, error_s, max_width_s))
+            if width_s < self.min_width_s:
+                # Deliver fewer pump cycles by reducing frequency.
+                frequency_hz = max(self.min_frequency_hz, frequency_hz *
+                                   width_s / self.min_width_s)
+                width_s = min(self.min_width_s, max_width_s)
+            limited = abs(width_s * frequency_hz / self.frequency_hz -
+                          output_s) > 1e-9
+            if not limited:
+                # Anti-windup: only integrate while output is not limited.
+                self.integral_s += error_s
+            entry['limited'] = limited
+        entry['width_s'] = width_s
+        entry['frequency_hz'] = frequency_hz
+        self._previous = (capacitance, width_s, frequency_hz)
+        return width_s, frequency_hz
+
+    def summary(self):
+        '''
+        Returns
+        -------
+        dict
+            Number of pulses, final capacitance error and controller
+            trajectory, e.g., for the step log.
+        '''
+        pulses = [entry_i for entry_i in self.trajectory
+                  if entry_i['width_s'] > 0]
+        return {'pulse_count': len(pulses),
+                'target': self.target,
+                'final_error': (self.trajectory[-1]['error']
+                                if self.trajectory else None),
+                'kp': self.kp, 'ki': self.ki,
+                'trajectory': self.trajectory}
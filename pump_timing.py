@@ -0,0 +1,174 @@
+'''
+Drift-compensated timing of pump pulses.
+
+Pump pulses were previously timed with ``time.sleep(width)`` between the
+activate and deactivate requests, so the serial round-trip latency of each
+request was added to every pulse.  :class:`PumpTimer` schedules requests at
+absolute deadlines on a monotonic clock, and sends each deactivate request
+early by the estimated one-way request latency, so the pump is on for the
+intended width.
+
+.. versionadded:: 0.26
+'''
+import logging
+
+import numpy as np
+import trollius as asyncio
+from trollius.time_monotonic import time_monotonic
+
+logger = logging.getLogger(__name__)
+
+
+class PumpTimer(object):
+    '''
+    Schedule pump activate/deactivate requests at absolute deadlines.
+
+    The board applies a request at some point during its round trip; the
+    midpoint of the round trip is used as the best estimate.  The one-way
+    latency is estimated as half of an exponentially weighted moving average
+    of measured round-trip times.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    activate : callable
+        Function returning a future which completes once the pump is
+        activated, e.g., a board I/O request.
+    deactivate : callable
+        Function returning a future which completes once the pump is
+        deactivated.
+    alpha : float, optional
+        Weight of latest round-trip time in moving average.
+
+    Attributes
+    ----------
+    pulses : list
+        Record of each pulse, with estimated activation time (``on_time``,
+        see :meth:`now`), intended width (``intended_s``), actual width
+        (``actual_s``) and round-trip latency of the activate and deactivate
+        requests (``latency_s``).
+    '''
+    def __init__(self, activate, deactivate, alpha=.3):
+        self.activate = activate
+        self.deactivate = deactivate
+        self.alpha = alpha
+        self.round_trip_s = None
+        self.pulses = []
+
+    @staticmethod
+    def now():
+        return time_monotonic()
+
+    def _update_latency(self, round_trip_s):
+        if self.round_trip_s is None:
+            self.round_trip_s = round_trip_s
+        else:
+            self.round_trip_s = (self.alpha * round_trip_s +
+                                 (1 - self.alpha) * self.round_trip_s)
+
+    @asyncio.coroutine
+    def _request(self, func):
+        '''
+        Returns
+        -------
+        float
+            Estimated time request was applied, i.e., midpoint of round trip.
+        '''
+        start = self.now()
+        yield asyncio.From(func())
+        end = self.now()
+        self._update_latency(end - start)
+        raise asyncio.Return(.5 * (start + end))
+
+    @asyncio.coroutine
+    def wait_until(self, deadline):
+        '''
+        Wait until monotonic clock time (see :meth:`now`).
+        '''
+        delay_s = deadline - self.now()
+        if delay_s > 0:
+            yield asyncio.From(asyncio.sleep(delay_s))
+
+    @asyncio.coroutine
+    def start(self):
+        '''
+        Activate pump.
+
+        Returns
+        -------
+        float
+            Estimated time pump was activated.
+        '''
+        on_time = yield asyncio.From(self._request(self.activate))
+        raise asyncio.Return(on_time)
+
+    @asyncio.coroutine
+    def stop_at(self, on_time, off_deadline):
+        '''
+        Deactivate pump at deadline (compensating for request latency) and
+        record pulse.
+
+        Parameters
+        ----------
+        on_time : float
+            Estimated time pump was activated (see :meth:`start`).
+        off_deadline : float
+            Time to deactivate pump.
+
+        Returns
+        -------
+        float
+            Actual pulse width.
+        '''
+        one_way_s = .5 * (self.round_trip_s or 0)
+        yield asyncio.From(self.wait_until(off_deadline - one_way_s))
+        off_time = yield asyncio.From(self._request(self.deactivate))
+        actual_s = off_time - on_time
+        self.pulses.append({'on_time': on_time,
+                            'intended_s': off_deadline - on_time,
+                            'actual_s': actual_s,
+                            'latency_s': self.round_trip_s})
+        raise asyncio.Return(actual_s)
+
+    @asyncio.coroutine
+    def pulse(self, width_s):
+        '''
+        Activate pump for specified duration.
+
+        Parameters
+        ----------
+        width_s : float
+            Intended pulse width.
+
+        Returns
+        -------
+        float
+            Actual pulse width.
+        '''
+        on_time = yield asyncio.From(self.start())
+        actual_s = yield asyncio.From(self.stop_at(on_time,
+                                                   on_time + width_s))
+        raise asyncio.Return(actual_s)
+
+    def summary(self):
+        '''
+        Returns
+        -------
+        dict
+            Number of pulses, total intended and actual pump time, mean and
+            maximum absolute pulse width error, latest round-trip latency and
+            record of each pulse, for the step log.
+        '''
+        if not self.pulses:
+            return {'count': 0}
+        intended = np.array([p['intended_s'] for p in self.pulses])
+        actual = np.array([p['actual_s'] for p in self.pulses])
+        error = np.abs(actual - intended)
+        return {'count': len(self.pulses),
+                'intended_total_s': float(intended.sum()),
+                'actual_total_s': float(actual.sum()),
+                'mean_abs_error_s': float(error.mean()),
+                'max_abs_error_s': float(error.max()),
+                'round_trip_s': self.round_trip_s,
+                'pulses': self.pulses}
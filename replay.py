@@ -0,0 +1,321 @@
+'''
+Offline replay of recorded auto pump fills.
+
+Each recorded fill (see :class:`fill_telemetry.FillTelemetry`) defines the
+reservoir capacitance as a function of the number of pump cycles delivered.
+Pump control variants are simulated against this fill curve to compare their
+time to fill and overshoot on the same reservoir.
+
+Example
+-------
+
+Compare control variants on all fills recorded in an experiment log
+directory (run from the MicroDrop plugins directory)::
+
+    python -m mr_box_plugin.replay <experiment log directory>
+
+.. versionadded:: 0.26
+'''
+import argparse
+import logging
+import sys
+
+import numpy as np
+
+from .fill_level import ReservoirCalibration
+from .fill_telemetry import fill_metrics
+from .pump_control import PIPumpController
+from .run_store import RunStore
+
+logger = logging.getLogger(__name__)
+
+#: Pump control variants which may be replayed.
+VARIANTS = ('Fixed pulses', 'PI', 'Continuous')
+#: Default time between end of a pump pulse and the capacitance measurement
+#: used to choose the next pulse (seconds).
+MEASURE_S = .05
+#: Default interval between continuous capacitance readings (seconds).
+READING_S = .005
+
+
+def pump_cycles(time_s, pulses):
+    '''
+    Number of pump cycles delivered before each time.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    time_s : array_like
+        Times (relative to start of fill).
+    pulses : list
+        Recorded pump pulses, each with ``start_s``, ``width_s`` and
+        ``frequency_hz``.
+
+    Returns
+    -------
+    numpy.ndarray
+        Cumulative pump cycles at each time.
+    '''
+    time_s = np.asarray(time_s, dtype=float)
+    cycles = np.zeros_like(time_s)
+    for pulse_i in pulses:
+        start_i = pulse_i['start_s']
+        on_s = np.clip(time_s - start_i, 0, pulse_i['width_s'])
+        cycles += on_s * pulse_i['frequency_hz']
+    return cycles
+
+
+class FillCurve(object):
+    '''
+    Reservoir capacitance as a function of pump cycles, interpolated from a
+    recorded fill and extrapolated linearly beyond it.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    fill : dict
+        Recorded fill (see :meth:`fill_telemetry.FillTelemetry.to_dict`).
+    '''
+    def __init__(self, fill):
+        samples = fill['samples']
+        cycles = pump_cycles(samples['time_s'], fill['pulses'])
+        capacitance = np.asarray(samples['capacitance'], dtype=float)
+        order = np.argsort(cycles, kind='mergesort')
+        self.cycles = cycles[order]
+        self.capacitance = capacitance[order]
+        # Extrapolate with slope of last quarter of fill.
+        tail = max(2, len(self.cycles) // 4)
+        x = self.cycles[-tail:]
+        y = self.capacitance[-tail:]
+        self.slope = (np.polyfit(x, y, 1)[0]
+                      if len(x) > 1 and np.ptp(x) > 0 else 0.)
+        stds = samples.get('std') or []
+        stds = [s for s in stds if s]
+        self.noise = float(np.median(stds)) if stds else 0.
+
+    def __call__(self, cycles):
+        '''
+        Returns
+        -------
+        float or numpy.ndarray
+            Capacitance after ``cycles`` pump cycles (vectorized).
+        '''
+        cycles = np.asarray(cycles, dtype=float)
+        capacitance = np.interp(cycles, self.cycles, self.capacitance)
+        beyond = cycles > self.cycles[-1]
+        return np.where(beyond, self.capacitance[-1] + self.slope *
+                        (cycles - self.cycles[-1]), capacitance)
+
+
+def simulate(curve, variant, target, frequency_hz, timeout_s, width_s=.2,
+             kp=.7, ki=.05, measure_s=MEASURE_S, reading_s=READING_S,
+             window=5, random_state=None):
+    '''
+    Simulate pump control variant on fill curve.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    curve : FillCurve
+        Capacitance as a function of pump cycles.
+    variant : str
+        One of :data:`VARIANTS`.
+    target : float
+        Target capacitance.
+    frequency_hz : float
+        Pump frequency.
+    timeout_s : float
+        Auto pump timeout.
+    width_s : float, optional
+        Pulse width of ``'Fixed pulses'`` variant.
+    kp, ki : float, optional
+        Gains of ``'PI'`` variant (see
+        :class:`pump_control.PIPumpController`).
+    measure_s : float, optional
+        Duration of capacitance measurement after each pulse.
+    reading_s : float, optional
+        Interval between readings of ``'Continuous'`` variant.
+    window : int, optional
+        Readings filtered by ``'Continuous'`` variant.
+    random_state : numpy.random.RandomState, optional
+        Source of measurement noise (with standard deviation of recorded
+        measurements).  By default, measurements are noise-free.
+
+    Returns
+    -------
+    dict
+        Fill metrics (see :func:`fill_telemetry.fill_metrics`), number of
+        pulses and total pump time.
+    '''
+    def measure(cycles):
+        capacitance = float(curve(cycles))
+        if random_state is not None and curve.noise:
+            capacitance += random_state.normal(0, curve.noise)
+        return capacitance
+
+    cycles = 0.
+    time_s = 0.
+    times = [0.]
+    values = [measure(0.)]
+    pulse_count = 0
+    pump_time_s = 0.
+    if variant == 'Continuous':
+        pulse_count = 1
+        readings = list(values)
+        while time_s < timeout_s:
+            if np.median(readings[-window:]) >= target:
+                break
+            time_s += reading_s
+            cycles += reading_s * frequency_hz
+            readings.append(measure(cycles))
+        pump_time_s = time_s
+        times.append(time_s)
+        values.append(float(curve(cycles)))
+    elif variant in ('Fixed pulses', 'PI'):
+        controller = (PIPumpController(target, frequency_hz, kp=kp, ki=ki)
+                      if variant == 'PI' else None)
+        while True:
+            if controller is None:
+                if values[-1] >= target or time_s >= timeout_s:
+                    break
+                pulse = (width_s, frequency_hz)
+            else:
+                pulse = controller.update(time_s, values[-1],
+                                          remaining_s=timeout_s - time_s)
+                if pulse is None:
+                    break
+            pulse_width_s, pulse_frequency_hz = pulse
+            cycles += pulse_width_s * pulse_frequency_hz
+            time_s += pulse_width_s + measure_s
+            pulse_count += 1
+            pump_time_s += pulse_width_s
+            times.append(time_s)
+            values.append(measure(cycles))
+    else:
+        raise ValueError('Unknown pump control variant: `%s`' % variant)
+    # Report overshoot of true (noise-free) final capacitance.
+    values[-1] = float(curve(cycles))
+    metrics = fill_metrics(times, values, target)
+    metrics['pulse_count'] = pulse_count
+    metrics['pump_time_s'] = pump_time_s
+    return metrics
+
+
+def replay(fill, variants=VARIANTS, timeout_s=None, **kwargs):
+    '''
+    Compare pump control variants on a recorded fill.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    fill : dict
+        Recorded fill (see :meth:`fill_telemetry.FillTelemetry.to_dict`).
+    variants : list, optional
+        Pump control variants to simulate.
+    timeout_s : float, optional
+        Auto pump timeout.  By default, duration of recorded fill.
+    **kwargs
+        Additional keyword arguments to :func:`simulate`.
+
+    Returns
+    -------
+    list
+        ``(variant, metrics)`` for recorded fill (as ``'recorded: ...'``)
+        followed by each simulated variant.  If the fill records its
+        reservoir calibration, simulated metrics include the final fill
+        fraction (``final_fill_fraction``).
+    '''
+    if fill.get('target') is None or not fill['pulses']:
+        raise ValueError('Fill has no target or no pump pulses.')
+    curve = FillCurve(fill)
+    frequency_hz = max(p['frequency_hz'] for p in fill['pulses'])
+    if timeout_s is None:
+        timeout_s = max(fill['samples']['time_s'])
+    calibration = fill.get('calibration')
+    if calibration is not None:
+        calibration = ReservoirCalibration(**calibration)
+    results = [('recorded: %s' % fill['control'], fill['metrics'])]
+    for variant_i in variants:
+        metrics_i = simulate(curve, variant_i, fill['target'], frequency_hz,
+                             timeout_s, **kwargs)
+        if calibration is not None:
+            metrics_i['final_fill_fraction'] = \
+                calibration.fill_fraction(metrics_i['final_capacitance'])
+        results.append((variant_i, metrics_i))
+    return results
+
+
+def format_results(results):
+    '''
+    .. versionadded:: 0.26
+
+    Returns
+    -------
+    str
+        Table of time to fill, overshoot, final fill fraction, pulse count
+        and pump time of each variant (see :func:`replay`).
+    '''
+    def _format(value, format_):
+        return '-' if value is None else format_ % value
+
+    def _percent(value):
+        return _format(None if value is None else 100 * value, '%.1f%%')
+
+    lines = ['%-24s %14s %10s %7s %7s %9s' % ('variant', 'fill time (s)',
+                                              'overshoot', 'fill', 'pulses',
+                                              'pump (s)')]
+    for variant_i, metrics_i in results:
+        lines.append('%-24s %14s %10s %7s %7s %9s' %
+                     (variant_i,
+                      _format(metrics_i.get('time_to_fill_s'), '%.2f'),
+                      _percent(metrics_i.get('relative_overshoot')),
+                      _percent(metrics_i.get('final_fill_fraction')),
+                      _format(metrics_i.get('pulse_count'), '%d'),
+                      _format(metrics_i.get('pump_time_s'), '%.2f')))
+    return '\n'.join(lines)
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description='Compare auto pump control '
+                                     'variants on recorded fills.')
+    parser.add_argument('log_dir', help='Experiment log directory.')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='Auto pump timeout (default: duration of each '
+                        'recorded fill).')
+    parser.add_argument('--width', type=float, default=.2,
+                        help='Pulse width of fixed pulses (default: '
+                        '%(default)s).')
+    parser.add_argument('--kp', type=float, default=.7)
+    parser.add_argument('--ki', type=float, default=.05)
+    parser.add_argument('--noise', action='store_true', help='Add '
+                        'measurement noise (seeded).')
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+    fills = RunStore(args.log_dir).fills()
+    if not fills:
+        print >> sys.stderr, 'No recorded pump fills in `%s`.' % args.log_dir
+        return 1
+    for fill_i in fills:
+        print '%s (%s)' % (fill_i['file'], fill_i['mode'])
+        try:
+            random_state = np.random.RandomState(0) if args.noise else None
+            results = replay(fill_i, timeout_s=args.timeout,
+                             width_s=args.width, kp=args.kp, ki=args.ki,
+                             random_state=random_state)
+        except ValueError, exception:
+            print '  skipped: %s' % exception
+            continue
+        print format_results(results)
+        print
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,739 @@
+'''
+Pre-compiled Excel report template.
+
+Loading the report template with ``openpyxl`` and patching it for every
+report is slow, and ``openpyxl`` drops template features (e.g., data
+validation extension lists) which must then be restored.
+
+Instead, the template is compiled **once** into a :class:`ReportSkeleton`
+holding:
+
+ - the raw template parts (styles, shared strings, `Field values` sheet, etc.),
+   copied verbatim to each report;
+ - resolved named-range coordinates; and
+ - ``Assay Info`` worksheet, workbook and package XML fragments with
+   placeholders.
+
+A report is then assembled by writing XML directly to the output ZIP file,
+one part at a time.
+
+.. versionadded:: 0.26
+'''
+from xml.sax.saxutils import escape, quoteattr
+import datetime as dt
+import io
+import json
+import logging
+import re
+import socket
+import zipfile
+
+from openpyxl.drawing.colors import PRESET_COLORS
+import lxml.etree
+import numpy as np
+import path_helpers as ph
+
+from . import pmt_data
+
+logger = logging.getLogger(__name__)
+
+NS = {'main': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+      'r': 'http://schemas.openxmlformats.org/officeDocument/2006/'
+      'relationships',
+      'pr': 'http://schemas.openxmlformats.org/package/2006/relationships'}
+
+REL_TYPE = ('http://schemas.openxmlformats.org/officeDocument/2006/'
+            'relationships/')
+CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.'
+
+# Custom number format used for PMT sample timestamps.
+TIMESTAMP_FORMAT = 'yyyy-mm-dd hh:mm:ss'
+
+# Excel serial date epoch.
+EXCEL_EPOCH = dt.datetime(1899, 12, 30)
+
+XML_DECLARATION = (u'<?xml version="1.0" encoding="UTF-8" '
+                   u'standalone="yes"?>\n')
+
+# English Metric Units per centimeter (chart sizes).
+EMU_PER_CM = 360000
+
+CELL_REFERENCE = re.compile(r"^(?:'(?P<quoted>(?:[^']|'')+)'|(?P<sheet>[^!]+))"
+                            r"!\$?(?P<min_col>[A-Z]+)\$?(?P<min_row>\d+)"
+                            r"(?::\$?(?P<max_col>[A-Z]+)\$?"
+                            r"(?P<max_row>\d+))?$")
+
+
+def column_index(letters):
+    '''
+    Returns
+    -------
+    int
+        One-based index of column, e.g., ``A`` is ``1`` and ``AA`` is ``27``.
+    '''
+    index = 0
+    for letter_i in letters:
+        index = 26 * index + ord(letter_i) - ord('A') + 1
+    return index
+
+
+def column_letters(index):
+    '''
+    Returns
+    -------
+    str
+        Letters of one-based column index, e.g., ``27`` is ``AA``.
+    '''
+    letters = ''
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def quote_sheetname(name):
+    return "'%s'" % name.replace("'", "''")
+
+
+def _sheet_title(name, existing):
+    '''
+    Returns
+    -------
+    unicode
+        Valid, unique worksheet title derived from ``name``.
+    '''
+    title = re.sub(r'[\[\]:*?/\\]', '_', unicode(name))[:31] or u'Sheet'
+    candidate = title
+    i = 1
+    while candidate.lower() in existing:
+        suffix = unicode(i)
+        candidate = title[:31 - len(suffix)] + suffix
+        i += 1
+    existing.add(candidate.lower())
+    return candidate
+
+
+class ReportSkeleton(object):
+    '''
+    Compiled report template.
+
+    See :func:`compile_skeleton`.
+
+    .. versionadded:: 0.26
+
+    Attributes
+    ----------
+    parts : dict
+        Template ZIP file parts copied verbatim to each report, keyed by
+        filename.
+    fragments : dict
+        XML fragments of the template, keyed by name.
+    defined_names : dict
+        Resolved coordinates of each defined name, keyed by name.
+    sheets : list
+        Template worksheet ``(name, relationship target)`` pairs, in order.
+    metadata : dict
+        Styles and template properties used to assemble reports.
+    '''
+    def __init__(self, parts, fragments, defined_names, sheets, metadata):
+        self.parts = parts
+        self.fragments = fragments
+        self.defined_names = defined_names
+        self.sheets = sheets
+        self.metadata = metadata
+
+    def save(self, path):
+        '''
+        Write skeleton package to a ZIP file.
+
+        Parameters
+        ----------
+        path : str
+            Output path.
+        '''
+        manifest = {'fragments': self.fragments,
+                    'defined_names': self.defined_names,
+                    'sheets': self.sheets, 'metadata': self.metadata,
+                    'parts': sorted(self.parts)}
+        with zipfile.ZipFile(path, mode='w',
+                             compression=zipfile.ZIP_DEFLATED) as output:
+            output.writestr('manifest.json', json.dumps(manifest))
+            for name_i, data_i in self.parts.iteritems():
+                output.writestr('parts/' + name_i, data_i)
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Load skeleton package written by :meth:`save`.
+
+        Parameters
+        ----------
+        path : str
+            Skeleton package path.
+
+        Returns
+        -------
+        ReportSkeleton
+        '''
+        with zipfile.ZipFile(path, mode='r') as input_:
+            manifest = json.loads(input_.read('manifest.json'))
+            parts = {name_i: input_.read('parts/' + name_i)
+                     for name_i in manifest['parts']}
+        return cls(parts, manifest['fragments'], manifest['defined_names'],
+                   [tuple(sheet_i) for sheet_i in manifest['sheets']],
+                   manifest['metadata'])
+
+
+def _resolve_defined_names(workbook):
+    defined_names = {}
+    for element_i in workbook.iterfind('main:definedNames/main:definedName',
+                                       NS):
+        match = CELL_REFERENCE.match((element_i.text or '').strip())
+        if not match:
+            continue
+        groups = match.groupdict()
+        sheet = (groups['quoted'].replace("''", "'") if groups['quoted']
+                 else groups['sheet'])
+        min_col = column_index(groups['min_col'])
+        min_row = int(groups['min_row'])
+        defined_names[element_i.get('name')] = \
+            {'sheet': sheet, 'min_col': min_col, 'min_row': min_row,
+             'max_col': column_index(groups['max_col'] or
+                                     groups['min_col']),
+             'max_row': int(groups['max_row'] or min_row)}
+    return defined_names
+
+
+def _set_placeholder(sheet_data, coordinate, placeholder, string=False):
+    '''
+    Replace contents of worksheet cell with a placeholder value.
+    '''
+    row = int(re.search(r'\d+', coordinate).group())
+    row_element = sheet_data.find('main:row[@r="%d"]' % row, NS)
+    if row_element is None:
+        row_element = lxml.etree.SubElement(sheet_data,
+                                            '{%s}row' % NS['main'], r=str(row))
+        # Keep rows sorted.
+        rows = sorted(sheet_data, key=lambda r: int(r.get('r')))
+        sheet_data[:] = rows
+    cell = row_element.find('main:c[@r="%s"]' % coordinate, NS)
+    if cell is None:
+        cell = lxml.etree.SubElement(row_element, '{%s}c' % NS['main'],
+                                     r=coordinate)
+        cells = sorted(row_element,
+                       key=lambda c: column_index(re.match('[A-Z]+',
+                                                           c.get('r'))
+                                                  .group()))
+        row_element[:] = cells
+    for child_i in list(cell):
+        cell.remove(child_i)
+    if string:
+        cell.set('t', 'inlineStr')
+        is_ = lxml.etree.SubElement(cell, '{%s}is' % NS['main'])
+        lxml.etree.SubElement(is_, '{%s}t' % NS['main']).text = placeholder
+    else:
+        cell.attrib.pop('t', None)
+        lxml.etree.SubElement(cell, '{%s}v' % NS['main']).text = placeholder
+
+
+def compile_skeleton(template_path):
+    '''
+    Compile report template into a :class:`ReportSkeleton`.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    template_path : str
+        Path to Excel template spreadsheet.
+
+    Returns
+    -------
+    ReportSkeleton
+
+    Raises
+    ------
+    ValueError
+        If the template contains features not supported by the skeleton
+        (e.g., existing drawings on the ``Assay Info`` worksheet).
+    '''
+    with zipfile.ZipFile(template_path, mode='r') as input_:
+        parts = {name_i: input_.read(name_i) for name_i in input_.namelist()}
+
+    workbook = lxml.etree.fromstring(parts.pop('xl/workbook.xml'))
+    workbook_rels = lxml.etree.fromstring(parts
+                                          .pop('xl/_rels/workbook.xml.rels'))
+    targets_by_id = {rel_i.get('Id'): rel_i.get('Target')
+                     for rel_i in workbook_rels}
+
+    sheets = [(sheet_i.get('name'),
+               targets_by_id[sheet_i.get('{%s}id' % NS['r'])])
+              for sheet_i in workbook.iterfind('main:sheets/main:sheet', NS)]
+    defined_names = _resolve_defined_names(workbook)
+
+    assay_sheet_path = 'xl/' + dict(sheets)['Assay Info']
+    if 'xl/worksheets/_rels/%s.rels' % ph.path(assay_sheet_path).name in parts:
+        raise ValueError('`Assay Info` worksheet relationships are not '
+                         'supported.')
+
+    # Results table rows are appended after the last template row.
+    results_row = defined_names['PMTMeasurementIDEntries']['min_row']
+
+    # Assay Info worksheet
+    # --------------------
+    sheet = lxml.etree.fromstring(parts.pop(assay_sheet_path))
+    sheet_data = sheet.find('main:sheetData', NS)
+    if any(int(row_i.get('r')) >= results_row for row_i in sheet_data):
+        raise ValueError('Template contains rows within results table.')
+
+    def coordinate(name):
+        entry = defined_names[name]
+        return '%s%d' % (column_letters(entry['min_col']), entry['min_row'])
+
+    _set_placeholder(sheet_data, coordinate('DateEntry'), '@@DateEntry@@')
+    if 'LaptopEntry' in defined_names:
+        _set_placeholder(sheet_data, coordinate('LaptopEntry'),
+                         '@@LaptopEntry@@', string=True)
+
+    # Select the "Location" entry cell by default.
+    sheet_view = sheet.find('main:sheetViews/main:sheetView', NS)
+    for selection_i in sheet_view.findall('main:selection', NS):
+        sheet_view.remove(selection_i)
+    location = coordinate('LocationEntry')
+    lxml.etree.SubElement(sheet_view, '{%s}selection' % NS['main'],
+                          activeCell=location, sqref=location)
+
+    dimension = sheet.find('main:dimension', NS)
+    if dimension is not None:
+        dimension.set('ref', '@@DIMENSION@@')
+
+    # Reference the drawing containing the overlay chart.  Drawing element
+    # must precede any extension list (see ECMA-376 `CT_Worksheet`).
+    drawing = lxml.etree.Element('{%s}drawing' % NS['main'])
+    drawing.set('{%s}id' % NS['r'], 'rId1')
+    ext_lst = sheet.find('main:extLst', NS)
+    if ext_lst is not None:
+        ext_lst.addprevious(drawing)
+    else:
+        sheet.append(drawing)
+
+    sheet_xml = lxml.etree.tostring(sheet, encoding=unicode)
+    sheet_xml = sheet_xml.replace('<sheetData/>',
+                                  '<sheetData></sheetData>')
+    sheet_head, sheet_tail = sheet_xml.split('</sheetData>')
+
+    # Workbook
+    # --------
+    sheets_element = workbook.find('main:sheets', NS)
+    marker = lxml.etree.Comment('@@SHEETS@@')
+    sheets_element.addnext(marker)
+    workbook.remove(sheets_element)
+    workbook_head, workbook_tail = (lxml.etree
+                                    .tostring(workbook, encoding=unicode)
+                                    .split('<!--@@SHEETS@@-->'))
+
+    # Styles: add timestamp style for PMT data sample times.
+    styles = lxml.etree.fromstring(parts.pop('xl/styles.xml'))
+    num_fmts = styles.find('main:numFmts', NS)
+    if num_fmts is None:
+        num_fmts = lxml.etree.Element('{%s}numFmts' % NS['main'])
+        styles.insert(0, num_fmts)
+    num_fmt_id = max([int(f.get('numFmtId')) for f in num_fmts] + [163]) + 1
+    lxml.etree.SubElement(num_fmts, '{%s}numFmt' % NS['main'],
+                          numFmtId=str(num_fmt_id),
+                          formatCode=TIMESTAMP_FORMAT)
+    num_fmts.set('count', str(len(num_fmts)))
+    cell_xfs = styles.find('main:cellXfs', NS)
+    lxml.etree.SubElement(cell_xfs, '{%s}xf' % NS['main'],
+                          numFmtId=str(num_fmt_id), fontId='0', fillId='0',
+                          borderId='0', xfId='0', applyNumberFormat='1')
+    cell_xfs.set('count', str(len(cell_xfs)))
+    # Bold header style (as written by `pandas`).
+    header_style = next((i for i, xf_i in enumerate(cell_xfs)
+                         if xf_i.get('fontId') == '1' and
+                         xf_i.get('borderId') == '0'), 0)
+    parts['xl/styles.xml'] = lxml.etree.tostring(styles, xml_declaration=True,
+                                                 encoding='UTF-8',
+                                                 standalone=True)
+
+    # Package
+    # -------
+    content_types = parts.pop('[Content_Types].xml').decode('utf8')
+    # Document properties are regenerated since they list sheet titles.
+    parts.pop('docProps/app.xml', None)
+
+    fragments = {'sheet_head': sheet_head, 'sheet_tail': sheet_tail,
+                 'workbook_head': workbook_head,
+                 'workbook_tail': workbook_tail,
+                 'workbook_rels': [(rel_i.get('Id'), rel_i.get('Type'),
+                                    rel_i.get('Target'))
+                                   for rel_i in workbook_rels],
+                 'content_types': content_types}
+    metadata = {'assay_sheet_path': assay_sheet_path,
+                'results_row': results_row,
+                'timestamp_style': len(cell_xfs) - 1,
+                'header_style': header_style,
+                'has_app_properties':
+                'docProps/app.xml' in content_types}
+    return ReportSkeleton(parts, fragments, defined_names, sheets, metadata)
+
+
+_skeleton_cache = {}
+
+
+def get_skeleton(template_path):
+    '''
+    Load compiled skeleton for template, compiling it on first use.
+
+    The compiled skeleton is cached in memory and, if possible, persisted
+    next to the template as ``<template>.skeleton.zip``.  A persisted
+    skeleton older than the template is recompiled.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    template_path : str
+        Path to Excel template spreadsheet.
+
+    Returns
+    -------
+    ReportSkeleton
+    '''
+    template_path = ph.path(template_path).realpath()
+    mtime = template_path.mtime
+    cached = _skeleton_cache.get(template_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    skeleton_path = ph.path(template_path + '.skeleton.zip')
+    skeleton = None
+    if skeleton_path.isfile() and skeleton_path.mtime >= mtime:
+        try:
+            skeleton = ReportSkeleton.load(skeleton_path)
+        except Exception:
+            logger.debug('Error loading report skeleton `%s`.', skeleton_path,
+                         exc_info=True)
+    if skeleton is None:
+        skeleton = compile_skeleton(template_path)
+        try:
+            skeleton.save(skeleton_path)
+        except (IOError, OSError):
+            logger.debug('Could not save report skeleton `%s`.',
+                         skeleton_path, exc_info=True)
+    _skeleton_cache[template_path] = mtime, skeleton
+    return skeleton
+
+
+def _inline_string(coordinate, value, style=None):
+    style_attr = '' if style is None else ' s="%d"' % style
+    return (u'<c r="%s"%s t="inlineStr"><is><t xml:space="preserve">%s</t>'
+            u'</is></c>' % (coordinate, style_attr, escape(unicode(value))))
+
+
+def _number_cell(coordinate, value):
+    # Non-finite values are not valid in a cell, so leave cell empty.
+    if not np.isfinite(value):
+        return u''
+    return u'<c r="%s"><v>%r</v></c>' % (coordinate, float(value))
+
+
+def _data_sheet_xml(s_data, style):
+    '''
+    Returns
+    -------
+    unicode
+        Worksheet XML containing PMT data in the same layout as
+        ``pandas.DataFrame.to_excel``: ``A``: sample time, ``B``: time
+        relative to first sample, ``C``: PMT data.
+    '''
+    n = len(s_data)
+    timestamps = ((s_data.index.values - np.datetime64(EXCEL_EPOCH)) /
+                  np.timedelta64(1, 'D')) if n else np.array([])
+    relative_time_s = pmt_data.relative_time_s(s_data) if n else np.array([])
+    values = np.asarray(s_data.values, dtype=float)
+
+    rows = [u'<row r="1">%s%s</row>' %
+            (_inline_string('B1', 'relative_time_s',
+                            style=style['header']),
+             _inline_string('C1', s_data.name, style=style['header']))]
+    for i, (t_i, dt_i, v_i) in enumerate(zip(timestamps, relative_time_s,
+                                             values)):
+        r = i + 2
+        rows.append(u'<row r="%d"><c r="A%d" s="%d"><v>%r</v></c>%s%s'
+                    u'</row>' %
+                    (r, r, style['timestamp'], float(t_i),
+                     _number_cell('B%d' % r, dt_i),
+                     _number_cell('C%d' % r, v_i)))
+    return (XML_DECLARATION +
+            u'<worksheet xmlns="%s" xmlns:r="%s"><dimension ref="A1:C%d"/>'
+            u'<sheetData>%s</sheetData><pageMargins left="0.7" right="0.7" '
+            u'top="0.75" bottom="0.75" header="0.3" footer="0.3"/>'
+            u'<drawing r:id="rId1"/></worksheet>' %
+            (NS['main'], NS['r'], n + 1, u''.join(rows)))
+
+
+def _chart_xml(series):
+    '''
+    Returns
+    -------
+    unicode
+        Scatter chart XML for series ``(sheet title, n_rows, color)``.
+    '''
+    series_xml = []
+    for i, (title_i, n_rows_i, color_i) in enumerate(series):
+        sheet_i = escape(quote_sheetname(title_i))
+        series_xml.append(
+            u'<c:ser><c:idx val="%(i)d"/><c:order val="%(i)d"/>'
+            u'<c:tx><c:strRef><c:f>%(sheet)s!$C$1</c:f></c:strRef></c:tx>'
+            u'<c:spPr><a:ln><a:solidFill><a:prstClr val=%(color)s/>'
+            u'</a:solidFill></a:ln></c:spPr>'
+            u'<c:marker><c:symbol val="none"/></c:marker>'
+            u'<c:xVal><c:numRef><c:f>%(sheet)s!$B$2:$B$%(end)d</c:f>'
+            u'</c:numRef></c:xVal>'
+            u'<c:yVal><c:numRef><c:f>%(sheet)s!$C$2:$C$%(end)d</c:f>'
+            u'</c:numRef></c:yVal><c:smooth val="0"/></c:ser>' %
+            {'i': i, 'sheet': sheet_i, 'color': quoteattr(color_i),
+             'end': max(n_rows_i + 1, 2)})
+
+    def axis(axis_id, cross_id, position, title):
+        return (u'<c:valAx><c:axId val="%d"/><c:scaling><c:orientation '
+                u'val="minMax"/></c:scaling><c:delete val="0"/>'
+                u'<c:axPos val="%s"/><c:title><c:tx><c:rich><a:bodyPr/>'
+                u'<a:p><a:r><a:t>%s</a:t></a:r></a:p></c:rich></c:tx>'
+                u'<c:overlay val="0"/></c:title><c:numFmt formatCode="General"'
+                u' sourceLinked="1"/><c:majorTickMark val="out"/>'
+                u'<c:minorTickMark val="none"/><c:tickLblPos val="nextTo"/>'
+                u'<c:crossAx val="%d"/><c:crosses val="autoZero"/>'
+                u'<c:crossBetween val="midCat"/></c:valAx>' %
+                (axis_id, position, escape(title), cross_id))
+
+    return (XML_DECLARATION +
+            u'<c:chartSpace xmlns:c="http://schemas.openxmlformats.org/'
+            u'drawingml/2006/chart" xmlns:a="http://schemas.openxmlformats.org'
+            u'/drawingml/2006/main" xmlns:r="%s"><c:chart><c:title><c:tx>'
+            u'<c:rich><a:bodyPr/><a:p><a:r><a:t>PMT current</a:t></a:r></a:p>'
+            u'</c:rich></c:tx><c:overlay val="0"/></c:title>'
+            u'<c:plotArea><c:layout/><c:scatterChart><c:scatterStyle '
+            u'val="lineMarker"/><c:varyColors val="0"/>%s<c:axId val="10"/>'
+            u'<c:axId val="100"/></c:scatterChart>%s%s</c:plotArea><c:legend>'
+            u'<c:legendPos val="r"/><c:overlay val="0"/></c:legend>'
+            u'<c:plotVisOnly val="1"/></c:chart></c:chartSpace>' %
+            (NS['r'], u''.join(series_xml),
+             axis(10, 100, 'b', 'Time (s)'), axis(100, 10, 'l',
+                                                   'Current (A)')))
+
+
+def _drawing_xml(column, width_cm, height_cm):
+    '''
+    Returns
+    -------
+    unicode
+        Drawing XML anchoring a single chart at the top of ``column``
+        (zero-based index).
+    '''
+    return (XML_DECLARATION +
+            u'<xdr:wsDr xmlns:xdr="http://schemas.openxmlformats.org/'
+            u'drawingml/2006/spreadsheetDrawing" xmlns:a="http://schemas.'
+            u'openxmlformats.org/drawingml/2006/main"><xdr:oneCellAnchor>'
+            u'<xdr:from><xdr:col>%d</xdr:col><xdr:colOff>0</xdr:colOff>'
+            u'<xdr:row>0</xdr:row><xdr:rowOff>0</xdr:rowOff></xdr:from>'
+            u'<xdr:ext cx="%d" cy="%d"/><xdr:graphicFrame macro="">'
+            u'<xdr:nvGraphicFramePr><xdr:cNvPr id="1" name="Chart 1"/>'
+            u'<xdr:cNvGraphicFramePr/></xdr:nvGraphicFramePr><xdr:xfrm>'
+            u'<a:off x="0" y="0"/><a:ext cx="0" cy="0"/></xdr:xfrm>'
+            u'<a:graphic><a:graphicData uri="http://schemas.openxmlformats.'
+            u'org/drawingml/2006/chart"><c:chart xmlns:c="http://schemas.'
+            u'openxmlformats.org/drawingml/2006/chart" xmlns:r="%s" '
+            u'r:id="rId1"/></a:graphicData></a:graphic></xdr:graphicFrame>'
+            u'<xdr:clientData/></xdr:oneCellAnchor></xdr:wsDr>' %
+            (column, width_cm * EMU_PER_CM, height_cm * EMU_PER_CM, NS['r']))
+
+
+def _rels_xml(relationships):
+    return (XML_DECLARATION +
+            u'<Relationships xmlns="%s">%s</Relationships>' %
+            (NS['pr'], u''.join(u'<Relationship Id="%s" Type="%s" '
+                                u'Target="%s"/>' % rel_i
+                                for rel_i in relationships))).encode('utf8')
+
+
+def write_results(skeleton, output_path, data_files, formulas=False):
+    '''
+    Write results as Excel spreadsheet to output path based on compiled
+    report template.
+
+    Produces the same workbook as :func:`_write_results` without loading the
+    template into the ``openpyxl`` object model.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    skeleton : ReportSkeleton
+        Compiled report template (see :func:`get_skeleton`).
+    output_path : str
+        Path to write output Excel spreadsheet to.
+    data_files : list
+        List of paths to `new-line delimited JSON files <http://ndjson.org/`_
+        containing measured PMT data (see :func:`pmt_data.iter_runs`).
+    formulas : bool, optional
+        If ``True``, write an ``AVERAGE`` formula (with cached value) for the
+        mean of each run instead of only the value.
+
+    Returns
+    -------
+    path_helpers.path
+        Wrapped output path.
+    '''
+    output_path = ph.path(output_path)
+    fragments = skeleton.fragments
+    metadata = skeleton.metadata
+    style = {'header': metadata['header_style'],
+             'timestamp': metadata['timestamp_style']}
+    id_column = column_letters(skeleton
+                               .defined_names['PMTMeasurementIDEntries']
+                               ['min_col'])
+    mean_column = column_letters(skeleton.defined_names['PMTMeanEntries']
+                                 ['min_col'])
+
+    # Generate list of colors to use for plotting PMT measurements.  Randomize
+    # order (deterministically due to static seed) since default order is
+    # alphabetic.
+    random_state = np.random.RandomState(1)
+    colors = list(PRESET_COLORS)
+    random_state.shuffle(colors)
+
+    # Write to memory first so an existing report is only replaced if the
+    # report is assembled successfully.
+    buffer_ = io.BytesIO()
+    existing_titles = set(name_i.lower() for name_i, _ in skeleton.sheets)
+    workbook_rels = [tuple(rel_i) for rel_i in fragments['workbook_rels']]
+    results_rows = []
+    chart_series = []
+    content_types = []
+
+    def override(part_name, content_type):
+        content_types.append(u'<Override PartName="/%s" ContentType="%s%s"/>'
+                             % (part_name, CONTENT_TYPE, content_type))
+
+    with zipfile.ZipFile(buffer_, mode='w',
+                         compression=zipfile.ZIP_DEFLATED) as output:
+        for name_i, data_i in skeleton.parts.iteritems():
+            output.writestr(name_i, data_i)
+
+        # Write the data from each PMT measurement run to a separate:
+        #  1. **worksheet** (with chart); and
+        #  2. **row** in the PMT results information table in the `Assay
+        #     Info` worksheet.
+        for i, s_data_i in enumerate(pmt_data.iter_runs(data_files)):
+            k = i + 1
+            title_i = _sheet_title(s_data_i.name, existing_titles)
+            s_data_i.name = title_i
+            sheet_i = 'xl/worksheets/pmt%d.xml' % k
+            output.writestr(sheet_i, _data_sheet_xml(s_data_i, style)
+                            .encode('utf8'))
+            override(sheet_i, 'spreadsheetml.worksheet+xml')
+            output.writestr('xl/worksheets/_rels/pmt%d.xml.rels' % k,
+                            _rels_xml([('rId1', REL_TYPE + 'drawing',
+                                        '../drawings/pmt%d.xml' % k)]))
+            output.writestr('xl/drawings/pmt%d.xml' % k,
+                            _drawing_xml(3, 20, 10).encode('utf8'))
+            override('xl/drawings/pmt%d.xml' % k, 'drawing+xml')
+            output.writestr('xl/drawings/_rels/pmt%d.xml.rels' % k,
+                            _rels_xml([('rId1', REL_TYPE + 'chart',
+                                        '../charts/pmt%d.xml' % k)]))
+            series_i = (title_i, len(s_data_i), colors[i % len(colors)])
+            output.writestr('xl/charts/pmt%d.xml' % k,
+                            _chart_xml([series_i]).encode('utf8'))
+            override('xl/charts/pmt%d.xml' % k, 'drawingml.chart+xml')
+            workbook_rels.append(('rIdPmt%d' % k, REL_TYPE + 'worksheet',
+                                  'worksheets/pmt%d.xml' % k))
+            chart_series.append(series_i)
+
+            row = metadata['results_row'] + i
+            mean_i = pmt_data.run_statistics(s_data_i)['mean']
+            if formulas:
+                # Cached value is omitted if mean is not finite.
+                cached_i = (u'<v>%r</v>' % float(mean_i)
+                            if np.isfinite(mean_i) else u'')
+                mean_cell = (u'<c r="%s%d"><f>AVERAGE(%s!C2:C%d)</f>%s</c>'
+                             % (mean_column, row,
+                                escape(quote_sheetname(title_i)),
+                                1 + len(s_data_i), cached_i))
+            else:
+                mean_cell = _number_cell('%s%d' % (mean_column, row), mean_i)
+            # Cells must be in column order.
+            cells = sorted([(column_index(id_column),
+                             _inline_string('%s%d' % (id_column, row),
+                                            title_i)),
+                            (column_index(mean_column), mean_cell)])
+            results_rows.append(u'<row r="%d">%s</row>' %
+                                (row, u''.join(c for _, c in cells)))
+
+        # `Assay Info` worksheet, with common chart containing data from all
+        # PMT worksheets.
+        assay_path = metadata['assay_sheet_path']
+        last_row = metadata['results_row'] + len(results_rows) - 1
+        date_serial = (dt.datetime.utcnow().date() - EXCEL_EPOCH.date()).days
+        sheet_head = (fragments['sheet_head']
+                      .replace('@@DateEntry@@', unicode(date_serial))
+                      .replace('@@LaptopEntry@@',
+                               escape(unicode(socket.gethostname())))
+                      .replace('@@DIMENSION@@', u'A1:H%d' %
+                               max(last_row, metadata['results_row'] - 1)))
+        output.writestr(assay_path, (u''.join([XML_DECLARATION, sheet_head] +
+                                              results_rows +
+                                              [u'</sheetData>',
+                                               fragments['sheet_tail']])
+                                     .encode('utf8')))
+        assay_name = ph.path(assay_path).name
+        output.writestr('xl/worksheets/_rels/%s.rels' % assay_name,
+                        _rels_xml([('rId1', REL_TYPE + 'drawing',
+                                    '../drawings/assay.xml')]))
+        output.writestr('xl/drawings/assay.xml',
+                        _drawing_xml(8, 25, 20).encode('utf8'))
+        override('xl/drawings/assay.xml', 'drawing+xml')
+        output.writestr('xl/drawings/_rels/assay.xml.rels',
+                        _rels_xml([('rId1', REL_TYPE + 'chart',
+                                    '../charts/assay.xml')]))
+        output.writestr('xl/charts/assay.xml',
+                        _chart_xml(chart_series).encode('utf8'))
+        override('xl/charts/assay.xml', 'drawingml.chart+xml')
+
+        # Workbook
+        sheet_ids = [u'<sheet name=%s sheetId="%d" r:id="%s"/>' %
+                     (quoteattr(name_i), i + 1, rel_id_i)
+                     for i, (name_i, rel_id_i) in
+                     enumerate([(name_j, rel_j[0])
+                                for name_j, target_j in skeleton.sheets
+                                for rel_j in fragments['workbook_rels']
+                                if rel_j[2] == target_j] +
+                               [(title_j, 'rIdPmt%d' % (j + 1))
+                                for j, (title_j, _, _) in
+                                enumerate(chart_series)])]
+        output.writestr('xl/workbook.xml',
+                        (XML_DECLARATION + fragments['workbook_head'] +
+                         u'<sheets>' +
+                         u''.join(sheet_ids) + u'</sheets>' +
+                         fragments['workbook_tail']).encode('utf8'))
+        output.writestr('xl/_rels/workbook.xml.rels',
+                        _rels_xml(workbook_rels))
+
+        if metadata['has_app_properties']:
+            output.writestr('docProps/app.xml',
+                            (XML_DECLARATION +
+                             u'<Properties xmlns="http://schemas.'
+                             u'openxmlformats.org/officeDocument/2006/'
+                             u'extended-properties">'
+                             u'<Application>Microsoft Excel</Application>'
+                             u'</Properties>').encode('utf8'))
+
+        output.writestr('[Content_Types].xml',
+                        fragments['content_types']
+                        .replace(u'</Types>', u''.join(content_types) +
+                                 u'</Types>').encode('utf8'))
+
+    with output_path.open('wb') as output:
+        output.write(buffer_.getvalue())
+    return output_path
@@ -0,0 +1,127 @@
+'''
+Actuation of the DropBot pump reservoir channel.
+
+Auto pump routines actuate the pump reservoir electrode to measure its
+capacitance.  :class:`ReservoirActuator` caches the DropBot channel count
+and channel state vector, and skips high voltage settings which are already
+in effect.
+
+.. versionadded:: 0.26
+'''
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+#: Settings applied by the DropBot plugin at each protocol step (always
+#: resent, see :meth:`ReservoirActuator.actuate`).
+STEP_SETTINGS = ('voltage', 'state_of_channels')
+
+
+class ReservoirActuator(object):
+    '''
+    Write-through cache of DropBot high voltage settings used to actuate the
+    pump reservoir channel **(blocking)**.
+
+    A value is only cached after the corresponding DropBot request succeeds.
+    The DropBot plugin applies its own voltage and channel states at any time
+    during each protocol step, so :data:`STEP_SETTINGS` are always resent
+    (only the channel state vector is reused).
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    proxy : dropbot.SerialProxy
+        DropBot connection.
+    '''
+    def __init__(self, proxy):
+        self.proxy = proxy
+        self._number_of_channels = None
+        self._state = None
+        self._values = {}
+        self.sent_count = 0
+        self.skipped_count = 0
+
+    @property
+    def number_of_channels(self):
+        '''
+        Number of DropBot channels (only read once per connection).
+        '''
+        if self._number_of_channels is None:
+            self._number_of_channels = self.proxy.number_of_channels
+        return self._number_of_channels
+
+    def invalidate(self, keys=None):
+        '''
+        Discard cached values, e.g., after the DropBot plugin applies step
+        settings.
+
+        Parameters
+        ----------
+        keys : list, optional
+            Only discard values of settings with specified names (e.g.,
+            :data:`STEP_SETTINGS`).  By default, all values are discarded.
+        '''
+        if keys is None:
+            self._values.clear()
+        else:
+            for key_i in keys:
+                self._values.pop(key_i, None)
+
+    def _write(self, key, value, func, *args):
+        '''
+        Call ``func(*args)`` unless ``value`` is already cached for ``key``.
+
+        Returns
+        -------
+        bool
+            ``True`` if request was sent to the DropBot.
+        '''
+        if key in self._values and self._values[key] == value:
+            self.skipped_count += 1
+            logger.debug('Skip `%s = %s` (unchanged).', key, value)
+            return False
+        self._values.pop(key, None)
+        func(*args)
+        self._values[key] = value
+        self.sent_count += 1
+        return True
+
+    def _set(self, name, value):
+        return self._write(name, value, setattr, self.proxy, name, value)
+
+    def state_vector(self, channel):
+        '''
+        Returns
+        -------
+        numpy.ndarray
+            Channel state vector with only ``channel`` actuated (reused
+            until ``channel`` changes; do not modify).
+        '''
+        if self._state is None or self._state[1] != channel:
+            state = np.zeros(self.number_of_channels)
+            state[channel] = 1
+            self._state = (state, channel)
+        return self._state[0]
+
+    def actuate(self, channel, voltage):
+        '''
+        Turn on high voltage output and actuate reservoir channel.
+
+        Parameters
+        ----------
+        channel : int
+            Reservoir channel.
+        voltage : float
+            Actuation voltage.
+        '''
+        # The DropBot plugin may have applied its step settings since the
+        # previous actuation.
+        self.invalidate(STEP_SETTINGS)
+        self._set('hv_output_enabled', True)
+        self._set('hv_output_selected', True)
+        self._set('voltage', voltage)
+        self._write('state_of_channels', channel, setattr, self.proxy,
+                    'state_of_channels', self.state_vector(channel))
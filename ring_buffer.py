@@ -0,0 +1,119 @@
+'''
+Fixed-capacity ring buffer of live PMT samples.
+
+The buffer is preallocated once and shared between a single writer (the
+acquisition thread) and any number of readers (e.g., the GTK live view).
+Each sample is written twice, at positions ``i`` and ``i + capacity``, so the
+most recent ``n`` samples are always contiguous and can be read as a
+zero-copy :class:`numpy.ndarray` view.
+
+No lock is needed: the writer fills in the samples *before* publishing the
+new sample count, and readers only view samples up to the count they read.
+A reader which holds a view while the writer laps the buffer may see newer
+samples in place of older ones; use :meth:`RingBuffer.overwritten` to detect
+this if it matters (it does not for a live plot).
+
+.. versionadded:: 0.26
+'''
+import numpy as np
+
+LIVE_DTYPE = np.dtype([('time_s', '<f8'), ('value', '<f8')])
+
+
+class RingBuffer(object):
+    '''
+    Single-writer, multiple-reader ring buffer.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    capacity : int
+        Maximum number of samples held.
+    dtype : numpy.dtype, optional
+        Record type of samples.
+    '''
+    def __init__(self, capacity, dtype=LIVE_DTYPE):
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity, dtype=dtype)
+        # Total number of samples written.
+        self._count = 0
+
+    @property
+    def count(self):
+        return self._count
+
+    def extend(self, **columns):
+        '''
+        Append samples (writer thread only).
+
+        Example
+        -------
+
+        >>> ring_buffer.extend(time_s=time_s, value=values)
+
+        Parameters
+        ----------
+        **columns
+            Array of sample values for each record field.  If more than
+            :attr:`capacity` samples are given, only the most recent samples
+            are kept.
+        '''
+        capacity = self.capacity
+        n = min(len(v) for v in columns.values()) if columns else 0
+        offset = max(0, n - capacity)
+        count = self._count + offset
+        n -= offset
+        if n <= 0:
+            return
+        i = count % capacity
+        k1 = min(n, capacity - i)
+        k2 = n - k1
+        for name_j, values_j in columns.items():
+            values_j = values_j[offset:offset + n]
+            field_j = self._data[name_j]
+            field_j[i:i + k1] = values_j[:k1]
+            field_j[i + capacity:i + capacity + k1] = values_j[:k1]
+            if k2:
+                field_j[:k2] = values_j[k1:]
+                field_j[capacity:capacity + k2] = values_j[k1:]
+        # Publish samples (after they have been written).
+        self._count = count + n
+
+    def snapshot(self, n=None):
+        '''
+        Read most recent samples without copying.
+
+        Parameters
+        ----------
+        n : int, optional
+            Maximum number of samples.  By default, up to :attr:`capacity`
+            samples.
+
+        Returns
+        -------
+        count : int
+            Total number of samples written when snapshot was taken.
+        view : numpy.ndarray
+            Read-only view of (up to) ``n`` most recent samples, oldest
+            first.
+        '''
+        count = self._count
+        n = min(self.capacity if n is None else n, count, self.capacity)
+        end = count % self.capacity + self.capacity
+        view = self._data[end - n:end]
+        view.setflags(write=False)
+        return count, view
+
+    def overwritten(self, count, n):
+        '''
+        Returns
+        -------
+        bool
+            ``True`` if any of the ``n`` samples of a snapshot taken at
+            ``count`` may since have been overwritten.
+        '''
+        return self._count - count > self.capacity - n
+
+    def clear(self):
+        self._count = 0
@@ -0,0 +1,333 @@
+'''
+Cache of decoded PMT measurement runs for an experiment log directory.
+
+Decoding the new-line delimited JSON PMT data files is slow, so each run is
+decoded once and cached as a flat binary file of ``(time_ns, value)`` records
+alongside its summary statistics.  Cached runs are memory-mapped on load, so
+reading summary statistics or a decimated trace does not load whole runs into
+memory.
+
+Cache layout (in ``<log dir>/PMT_cache``)::
+
+    index.json                   # Source file sizes/mtimes, run metadata.
+    <source namebase>-<j>.bin    # Records of run ``j`` in source file.
+    PMT_stream-step####-<j>.bin  # Records streamed during acquisition.
+    PMT_raw-step####-<j>.bin     # Raw records of outlier-filtered runs.
+    pump_fill-step####-<j>.json  # Auto pump fill telemetry.
+
+.. versionadded:: 0.26
+'''
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+import path_helpers as ph
+
+from . import pmt_data
+
+logger = logging.getLogger(__name__)
+
+# Record layout of cached run data files.
+RECORD_DTYPE = np.dtype([('time_ns', '<i8'), ('value', '<f8')])
+
+CACHE_DIRNAME = 'PMT_cache'
+INDEX_FILENAME = 'index.json'
+STREAM_FILENAME = 'PMT_stream-step%04d-%02d.bin'
+RAW_FILENAME = 'PMT_raw-step%04d-%02d.bin'
+FILL_FILENAME = 'pump_fill-step%04d-%02d.json'
+
+
+def series_to_records(s_data):
+    '''
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    s_data : pandas.Series
+        Measured PMT data, indexed by sample time.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of :data:`RECORD_DTYPE` records.
+    '''
+    records = np.empty(len(s_data), dtype=RECORD_DTYPE)
+    records['time_ns'] = (s_data.index.values.astype('datetime64[ns]')
+                          .astype('<i8'))
+    records['value'] = np.asarray(s_data.values, dtype=float)
+    return records
+
+
+def records_to_series(records, name=None):
+    '''
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    records : numpy.ndarray
+        Array of :data:`RECORD_DTYPE` records.
+    name : str, optional
+        Series name.
+
+    Returns
+    -------
+    pandas.Series
+        Measured PMT data, indexed by sample time.
+    '''
+    index = pd.to_datetime(np.asarray(records['time_ns']), unit='ns')
+    return pd.Series(np.asarray(records['value']), index=index, name=name)
+
+
+class RecordWriter(object):
+    '''
+    Append-only writer of :data:`RECORD_DTYPE` records, e.g., to stream PMT
+    samples to disk as they are acquired.
+
+    Records are flushed after each append, so samples acquired before a
+    crash can be recovered with :func:`numpy.fromfile`.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    path : str
+        Output file path.
+    '''
+    def __init__(self, path):
+        self.path = ph.path(path)
+        self.path.parent.makedirs_p()
+        self._output = self.path.open('ab')
+        self.count = 0
+
+    def append(self, s_data):
+        '''
+        Parameters
+        ----------
+        s_data : pandas.Series
+            Measured PMT data, indexed by sample time.
+        '''
+        records = series_to_records(s_data)
+        records.tofile(self._output)
+        self._output.flush()
+        self.count += len(records)
+
+    def close(self):
+        self._output.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class RunStore(object):
+    '''
+    Cache of decoded PMT measurement runs for an experiment log directory.
+
+    .. versionadded:: 0.26
+
+    Parameters
+    ----------
+    log_dir : str
+        Experiment log directory containing ``PMT_readings-*.ndjson`` files.
+    '''
+    def __init__(self, log_dir):
+        self.log_dir = ph.path(log_dir)
+        self.cache_dir = self.log_dir.joinpath(CACHE_DIRNAME)
+
+    @property
+    def index_path(self):
+        return self.cache_dir.joinpath(INDEX_FILENAME)
+
+    def stream_path(self, step_number):
+        '''
+        .. versionadded:: 0.26
+
+        Parameters
+        ----------
+        step_number : int
+            Protocol step number.
+
+        Returns
+        -------
+        path_helpers.path
+            Path of next unused stream file for step (see
+            :class:`RecordWriter`).
+        '''
+        return self._next_path(STREAM_FILENAME, step_number)
+
+    def raw_path(self, step_number):
+        '''
+        .. versionadded:: 0.26
+
+        Parameters
+        ----------
+        step_number : int
+            Protocol step number.
+
+        Returns
+        -------
+        path_helpers.path
+            Path of next unused raw (i.e., unfiltered) stream file for step
+            (see :class:`RecordWriter` and
+            :class:`pmt_filter.FilteredDataFunc`).
+        '''
+        return self._next_path(RAW_FILENAME, step_number)
+
+    def _next_path(self, pattern, step_number):
+        for j in xrange(100):
+            path_j = self.cache_dir.joinpath(pattern % (step_number, j))
+            if not path_j.exists():
+                return path_j
+        raise IOError('Too many PMT streams for step %d.' % step_number)
+
+    def save_fill(self, step_number, fill):
+        '''
+        Write auto pump fill telemetry to the next unused fill file of step.
+
+        .. versionadded:: 0.26
+
+        Parameters
+        ----------
+        step_number : int
+            Protocol step number.
+        fill : dict
+            Fill telemetry (see :meth:`fill_telemetry.FillTelemetry.to_dict`).
+
+        Returns
+        -------
+        path_helpers.path
+            Path of fill file.
+        '''
+        self.cache_dir.makedirs_p()
+        for j in xrange(100):
+            path_j = self.cache_dir.joinpath(FILL_FILENAME % (step_number, j))
+            if not path_j.exists():
+                with path_j.open('w') as output:
+                    json.dump(fill, output)
+                return path_j
+        raise IOError('Too many pump fills for step %d.' % step_number)
+
+    def fills(self):
+        '''
+        Load auto pump fill telemetry of experiment.
+
+        .. versionadded:: 0.26
+
+        Returns
+        -------
+        list
+            Fill telemetry dictionaries (see :meth:`save_fill`), in order,
+            each with the name of its file (``file``).
+        '''
+        fills = []
+        if not self.cache_dir.isdir():
+            return fills
+        for path_i in sorted(self.cache_dir.files('pump_fill-*.json')):
+            with path_i.open('r') as input_:
+                fill_i = json.load(input_)
+            fill_i['file'] = path_i.name
+            fills.append(fill_i)
+        return fills
+
+    def _load_index(self):
+        try:
+            with self.index_path.open('r') as input_:
+                return json.load(input_)
+        except (IOError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        with self.index_path.open('w') as output:
+            json.dump(index, output, indent=1)
+
+    def runs(self):
+        '''
+        List cached runs, decoding any new or modified PMT data files.
+
+        Returns
+        -------
+        list
+            Run metadata dictionaries, in measurement order, each containing:
+
+             - ``name``: run (series) name;
+             - ``source``: name of the source ``ndjson`` file;
+             - ``data``: name of the cached data file; and
+             - ``stats``: summary statistics (see
+               :func:`pmt_data.run_statistics`).
+        '''
+        index = self._load_index()
+        updated = False
+        runs = []
+        data_files = sorted(self.log_dir.files('PMT_readings-*.ndjson'))
+        for data_file_i in data_files:
+            stat_i = data_file_i.stat()
+            key_i = data_file_i.name
+            entry_i = index.get(key_i)
+            if (entry_i is None or entry_i['size'] != stat_i.st_size or
+                    entry_i['mtime'] != stat_i.st_mtime):
+                entry_i = self._decode(data_file_i, stat_i)
+                index[key_i] = entry_i
+                updated = True
+            runs.extend(entry_i['runs'])
+
+        # Drop entries for source files that no longer exist.
+        names = set(data_file_i.name for data_file_i in data_files)
+        for key_i in set(index) - names:
+            del index[key_i]
+            updated = True
+
+        if updated:
+            self._save_index(index)
+        return runs
+
+    def _decode(self, data_file, stat):
+        '''
+        Decode runs from a PMT data file into the cache.
+        '''
+        logger.debug('Decode and cache PMT runs from `%s`', data_file)
+        self.cache_dir.makedirs_p()
+        runs = []
+        for j, s_data_j in enumerate(pmt_data.iter_runs([data_file])):
+            data_name_j = '%s-%02d.bin' % (data_file.namebase, j)
+            series_to_records(s_data_j).tofile(self.cache_dir
+                                               .joinpath(data_name_j))
+            stats_j = pmt_data.run_statistics(s_data_j)
+            runs.append({'name': unicode(s_data_j.name),
+                         'source': data_file.name, 'data': data_name_j,
+                         'stats': {k: (None if v != v else v)
+                                   for k, v in stats_j.iteritems()}})
+        return {'size': stat.st_size, 'mtime': stat.st_mtime, 'runs': runs}
+
+    def records(self, run):
+        '''
+        Parameters
+        ----------
+        run : dict
+            Run metadata (see :meth:`runs`).
+
+        Returns
+        -------
+        numpy.memmap
+            Memory-mapped, read-only :data:`RECORD_DTYPE` records of run.
+        '''
+        path = self.cache_dir.joinpath(run['data'])
+        if not path.getsize():
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(path, dtype=RECORD_DTYPE, mode='r')
+
+    def load(self, run):
+        '''
+        Parameters
+        ----------
+        run : dict
+            Run metadata (see :meth:`runs`).
+
+        Returns
+        -------
+        pandas.Series
+            Measured PMT data of run, indexed by sample time.
+        '''
+        return records_to_series(self.records(run), name=run['name'])